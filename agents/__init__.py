@@ -1,16 +1,24 @@
 """
 AI Travel Planner Agents Package
+
+Agents are imported on first access, so importing one submodule (e.g.
+``agents.places``) doesn't load every agent and SDK.
 """
-from agents.root import root_agent
-from agents.flights import flight_agent
-from agents.hotels import hotel_agent
-from agents.transport import transport_agent
-from agents.weather import weather_agent
+import importlib
+
+_AGENT_MODULES = {
+    'root_agent': 'agents.root',
+    'followup_agent': 'agents.root',
+    'flight_agent': 'agents.flights',
+    'hotel_agent': 'agents.hotels',
+    'transport_agent': 'agents.transport',
+    'weather_agent': 'agents.weather',
+}
+
+__all__ = list(_AGENT_MODULES)
+
 
-__all__ = [
-    'root_agent',
-    'flight_agent', 
-    'hotel_agent',
-    'transport_agent',
-    'weather_agent'
-]
+def __getattr__(name):
+    if name in _AGENT_MODULES:
+        return getattr(importlib.import_module(_AGENT_MODULES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
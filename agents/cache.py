@@ -0,0 +1,263 @@
+"""
+Caches shared by the agent tools: an in-process TTL/LRU cache and a
+stale-while-revalidate cache with in-memory or SQLite storage.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+_MISSING = object()
+
+# Every named cache, so metrics can report them without importing the modules that own them
+_caches = weakref.WeakValueDictionary()
+
+
+def cache_stats() -> list:
+    """``stats()`` of every live cache."""
+    return [c.stats() for c in list(_caches.values())]
+
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire after a per-entry TTL.
+
+    When ``maxsize`` is reached the least recently used entry is evicted.
+    Hit/miss/eviction counters are kept for ``stats()``.
+    """
+
+    def __init__(self, maxsize: int = 256, name: str = "cache"):
+        self.name = name
+        self.maxsize = maxsize
+        _caches[name] = self
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the cached value, or ``default`` if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float):
+        """Store ``value`` for ``ttl`` seconds, evicting the LRU entry if full."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Counters and size, for logging and metrics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class MemoryBackend:
+    """LRU-bounded in-process storage for ``SWRCache``: key -> (stored_at, value)."""
+
+    blocking = False
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, stored_at, value):
+        with self._lock:
+            self._data[key] = (stored_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """On-disk storage for ``SWRCache`` so entries survive restarts and are
+    shared by every worker on the host. Values must be JSON-serializable.
+    Calls block on disk, so ``SWRCache`` makes them from a worker thread.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, maxsize: int = 10000, table: str = "cache"):
+        self.path = path
+        self.maxsize = maxsize
+        self.table = table
+        self.evictions = 0
+        self._lock = threading.RLock()  # set() counts rows under the lock
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, stored_at REAL NOT NULL, accessed_at REAL NOT NULL, value TEXT NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT stored_at, value FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+        return row[0], json.loads(row[1])
+
+    def set(self, key, stored_at, value):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, stored_at, accessed_at, value) VALUES (?, ?, ?, ?)",
+                (key, stored_at, time.time(), json.dumps(value, separators=(',', ':')))
+            )
+            excess = len(self) - self.maxsize
+            if excess > 0:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)", (excess,)
+                )
+                self.evictions += excess
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class SWRCache:
+    """Stale-while-revalidate cache for async fetches.
+
+    Entries younger than ``ttl`` are served as-is. Entries older than ``ttl``
+    but younger than ``stale_ttl`` are served immediately while a single
+    background task refreshes them. Anything older is fetched inline.
+
+    Blocking backends (SQLite) are read and written through asyncio.to_thread,
+    so a cache lookup never stalls the event loop.
+    """
+
+    def __init__(self, backend, ttl: float, stale_ttl: float, name: str = "cache"):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.name = name
+        _caches[name] = self
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_errors = 0
+        self._refreshing = {}  # key -> background refresh task
+
+    async def _get(self, key):
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.backend.get, key)
+        return self.backend.get(key)
+
+    async def _set(self, key, value):
+        if self.backend.blocking:
+            await asyncio.to_thread(self.backend.set, key, time.time(), value)
+        else:
+            self.backend.set(key, time.time(), value)
+
+    async def get_or_fetch(self, key: str, fetch):
+        """Return the value for ``key``, calling ``fetch()`` (a coroutine function) when needed."""
+        entry = await self._get(key)
+        if entry is not None:
+            stored_at, value = entry
+            age = time.time() - stored_at
+            if age < self.ttl:
+                self.hits += 1
+                return value
+            if age < self.stale_ttl:
+                self.stale_hits += 1
+                self._refresh_in_background(key, fetch)
+                return value
+
+        self.misses += 1
+        value = await fetch()
+        await self._set(key, value)
+        return value
+
+    async def peek(self, key: str):
+        """Return a fresh-enough cached value without fetching, or None."""
+        entry = await self._get(key)
+        if entry is not None and time.time() - entry[0] < self.stale_ttl:
+            return entry[1]
+        return None
+
+    def _refresh_in_background(self, key, fetch):
+        if key in self._refreshing:
+            return
+
+        async def _refresh():
+            try:
+                await self._set(key, await fetch())
+            except Exception as e:
+                self.refresh_errors += 1
+                print(f"[!] Background refresh failed for {self.name} {key}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.get_running_loop().create_task(_refresh())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'name': self.name,
+            'size': len(self.backend),
+            'maxsize': self.backend.maxsize,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'evictions': self.backend.evictions,
+            'refresh_errors': self.refresh_errors,
+            'hit_rate': round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,252 @@
+"""
+Record/replay of upstream calls for load tests and regression runs.
+
+CASSETTE_MODE=record performs each outbound call as usual and saves the
+request/response pair. CASSETTE_MODE=replay serves saved responses and never
+touches the network; a request with no recording fails with CassetteMiss.
+Unset, the layer is off.
+
+Covered calls:
+- OpenWeather: get_weather and get_weather_many
+- Amadeus: every HTTP exchange of the pooled SDK clients, token included
+- Gemini: model calls made by the Runner, via agent callbacks
+  (CASSETTE_GEMINI=0 leaves the model live)
+
+Pairs are stored zlib-compressed in SQLite (CASSETTE_PATH), keyed by a hash of
+the normalized request. API keys, bearer tokens and function-call ids are not
+part of the key, so recordings replay across credentials and sessions.
+Replayed calls sleep for the recorded duration times CASSETTE_LATENCY (default
+0, i.e. instant). Set it to 1 for realistic timing in load tests.
+
+Record with non-streaming turns (/api/chat, main.py, batch). Only a streamed
+call's final response is saved.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextvars import ContextVar
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CASSETTE_MODE = os.getenv('CASSETTE_MODE', '').lower()
+CASSETTE_PATH = os.getenv('CASSETTE_PATH', 'cassettes.db')
+CASSETTE_LATENCY = float(os.getenv('CASSETTE_LATENCY', 0))
+CASSETTE_GEMINI = os.getenv('CASSETTE_GEMINI', '1').lower() not in ('0', 'false', 'no', 'off')
+
+# The Gemini request being recorded, from before_model to after_model
+_pending_llm = ContextVar('cassette_pending_llm', default=None)
+
+
+class CassetteMiss(LookupError):
+    """A request with no recording, in replay mode."""
+
+    def __init__(self, kind: str, request: dict):
+        summary = json.dumps(request, sort_keys=True, default=str)[:200]
+        super().__init__(f"No {kind} recording for {summary}; record it with CASSETTE_MODE=record")
+        self.kind = kind
+
+
+def _pack(value) -> bytes:
+    return zlib.compress(json.dumps(value, sort_keys=True, separators=(',', ':'), default=str).encode())
+
+
+def _unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob))
+
+
+def request_key(kind: str, request: dict) -> str:
+    canonical = json.dumps(request, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(f"{kind}\n{canonical}".encode()).hexdigest()
+
+
+class Cassette:
+    """SQLite store of (kind, normalized request) -> (response, seconds)."""
+
+    def __init__(self, path: str, mode: str, latency: float = 0.0):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"CASSETTE_MODE must be 'record' or 'replay', not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.recorded = {}
+        self.replayed = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cassette ("
+            "kind TEXT NOT NULL, key TEXT NOT NULL, request BLOB NOT NULL, response BLOB NOT NULL, "
+            "seconds REAL NOT NULL, recorded_at REAL NOT NULL, PRIMARY KEY (kind, key))"
+        )
+
+    def _count(self, counter: dict, kind: str):
+        with self._lock:
+            counter[kind] = counter.get(kind, 0) + 1
+
+    def lookup(self, kind: str, request: dict):
+        """(response, recorded seconds), or raises CassetteMiss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, seconds FROM cassette WHERE kind = ? AND key = ?",
+                (kind, request_key(kind, request))
+            ).fetchone()
+        if row is None:
+            self._count(self.misses, kind)
+            raise CassetteMiss(kind, request)
+        self._count(self.replayed, kind)
+        return _unpack(row[0]), row[1]
+
+    def store(self, kind: str, request: dict, response, seconds: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cassette (kind, key, request, response, seconds, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, request_key(kind, request), _pack(request), _pack(response), seconds, time.time())
+            )
+        self._count(self.recorded, kind)
+
+    def call_sync(self, kind: str, request: dict, fetch):
+        """Blocking variant of ``call`` for code running on worker threads (the Amadeus SDK)."""
+        if self.mode == 'replay':
+            response, seconds = self.lookup(kind, request)
+            if self.latency:
+                time.sleep(seconds * self.latency)
+            return response
+        started = time.perf_counter()
+        response = fetch()
+        self.store(kind, request, response, time.perf_counter() - started)
+        return response
+
+    async def call(self, kind: str, request: dict, fetch):
+        """Replay the recorded response to ``request``, or (recording) await ``fetch()`` and save it."""
+        if self.mode == 'replay':
+            response, seconds = self.lookup(kind, request)
+            if self.latency:
+                await asyncio.sleep(seconds * self.latency)
+            return response
+        started = time.perf_counter()
+        response = await fetch()
+        self.store(kind, request, response, time.perf_counter() - started)
+        return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = dict(self._conn.execute("SELECT kind, COUNT(*) FROM cassette GROUP BY kind").fetchall())
+            return {
+                'mode': self.mode,
+                'path': self.path,
+                'entries': entries,
+                'recorded': dict(self.recorded),
+                'replayed': dict(self.replayed),
+                'misses': dict(self.misses),
+            }
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    """The process's cassette, or None when CASSETTE_MODE is unset."""
+    global _cassette
+    if _cassette is None and CASSETTE_MODE:
+        with _cassette_lock:
+            if _cassette is None:
+                _cassette = Cassette(CASSETTE_PATH, CASSETTE_MODE, CASSETTE_LATENCY)
+    return _cassette
+
+
+def cassette_stats() -> dict:
+    """Cassette statistics, or {} when CASSETTE_MODE is unset."""
+    cassette = get_cassette()
+    return cassette.stats() if cassette is not None else {}
+
+
+def replaying(kind: str = None) -> bool:
+    """True when upstream calls (of ``kind``) are served from recordings, so no API key is needed."""
+    if CASSETTE_MODE != 'replay':
+        return False
+    return kind != 'gemini' or CASSETTE_GEMINI
+
+
+# -- Gemini ------------------------------------------------------------------
+
+def _llm_request(llm_request) -> dict:
+    """The parts of an LlmRequest that determine the model's answer, minus per-session ids."""
+    contents = []
+    for content in llm_request.contents or []:
+        data = content.model_dump(mode='json', exclude_none=True)
+        for part in data.get('parts') or []:
+            part.pop('thought_signature', None)
+            for field in ('function_call', 'function_response'):
+                if field in part:
+                    part[field].pop('id', None)
+        contents.append(data)
+    config = llm_request.config
+    system = getattr(config, 'system_instruction', None) if config else None
+    return {
+        'model': llm_request.model,
+        'system': hashlib.sha1(str(system).encode()).hexdigest() if system else None,
+        'tools': sorted(getattr(llm_request, 'tools_dict', None) or {}),
+        'contents': contents,
+    }
+
+
+async def replay_model(callback_context, llm_request):
+    """before_model_callback: answer from the cassette (replay) or remember the request (record)."""
+    cassette = get_cassette()
+    if cassette is None:
+        return None
+    request = _llm_request(llm_request)
+    if cassette.mode == 'record':
+        _pending_llm.set((request, time.perf_counter()))
+        return None
+    from google.adk.models.llm_response import LlmResponse
+    response, seconds = cassette.lookup('gemini', request)
+    if cassette.latency:
+        await asyncio.sleep(seconds * cassette.latency)
+    # Through JSON, so base64-encoded bytes (inline data, signatures) decode as they were dumped
+    return LlmResponse.model_validate_json(json.dumps(response))
+
+
+def record_model(callback_context, llm_response):
+    """after_model_callback: save the final response to the request seen by replay_model."""
+    pending = _pending_llm.get()
+    if pending is None or getattr(llm_response, 'partial', False):
+        return None
+    _pending_llm.set(None)
+    request, started = pending
+    if not getattr(llm_response, 'error_code', None):
+        get_cassette().store('gemini', request, llm_response.model_dump(mode='json', exclude_none=True),
+                             time.perf_counter() - started)
+    return None
+
+
+def _chain(existing, callback):
+    if existing is None:
+        return callback
+    if isinstance(existing, list):
+        return existing + [callback]
+    return [existing, callback]
+
+
+def install(agent):
+    """Add the Gemini cassette callbacks to an agent and its sub-agents (no-op unless CASSETTE_MODE is set).
+
+    Install before tracing, so a replayed call doesn't open an LLM span.
+    """
+    if get_cassette() is None or not CASSETTE_GEMINI:
+        return agent
+    agent.before_model_callback = _chain(agent.before_model_callback, replay_model)
+    agent.after_model_callback = _chain(agent.after_model_callback, record_model)
+    for sub_agent in getattr(agent, 'sub_agents', None) or []:
+        install(sub_agent)
+    return agent
@@ -0,0 +1,167 @@
+"""
+Bounded conversation context for the root agent.
+
+Installed as a ``before_model_callback``: before each LLM call, the request's
+history is cut down to a token budget. The last few turns are kept verbatim
+(bulky tool outputs in all but the current turn are truncated), and older
+turns are folded into a short extractive summary plus a structured trip-state
+record. Summaries are cached per session and only extended with newly
+compacted turns, so the prefix isn't rebuilt on every call. The stored
+session history is never modified, only the outgoing request.
+"""
+import json
+import os
+import re
+from google.genai import types
+from agents.cache import TTLCache
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', 8000))
+CONTEXT_KEEP_TURNS = int(os.getenv('CONTEXT_KEEP_TURNS', 3))
+CONTEXT_TOOL_OUTPUT_CHARS = int(os.getenv('CONTEXT_TOOL_OUTPUT_CHARS', 600))
+
+# Trip facts worth carrying forward, taken from tool-call arguments
+_TRIP_KEYS = ('destination_city', 'city', 'origin_city', 'destination_iata', 'origin_iata',
+              'city_code', 'departure_date', 'trip_days', 'forecast_days')
+_CURRENCY = re.compile(r'\b(INR|USD|EUR|GBP|rupees?|dollars?|euros?|pounds?)\b', re.I)
+_BUDGET = re.compile(r'\b(budget|cheap|luxury|mid-?range|backpack\w*)\b', re.I)
+_TRAVELERS = re.compile(r'\b(\d+)\s+(?:people|persons|travell?ers|adults|of us)\b', re.I)
+
+# session id -> {'upto': contents already summarized, 'lines': [...], 'state': {...}}
+_summaries = TTLCache(maxsize=2048, name="context_summaries")
+_SUMMARY_TTL = 6 * 3600
+
+
+def _part_tokens(part) -> int:
+    if getattr(part, 'text', None):
+        return len(part.text) // 4 + 1
+    if getattr(part, 'function_call', None):
+        return len(json.dumps(part.function_call.args or {}, default=str)) // 4 + 5
+    if getattr(part, 'function_response', None):
+        return len(json.dumps(part.function_response.response or {}, default=str)) // 4 + 5
+    return 1
+
+
+def _content_tokens(content) -> int:
+    return sum(_part_tokens(p) for p in content.parts or [])
+
+
+def _is_user_turn(content) -> bool:
+    """A new turn starts with a user message that has text (function responses are also role "user")."""
+    return content.role == 'user' and any(getattr(p, 'text', None) for p in content.parts or [])
+
+
+def _split_turns(contents) -> list:
+    turns, current = [], []
+    for content in contents:
+        if _is_user_turn(content) and current:
+            turns.append(current)
+            current = []
+        current.append(content)
+    if current:
+        turns.append(current)
+    return turns
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def _summarize_turn(turn, state: dict) -> str:
+    """One line per turn: what was asked, which tools ran, how the answer began."""
+    asked, tools, answer = [], [], []
+    for content in turn:
+        for part in content.parts or []:
+            if getattr(part, 'function_call', None):
+                args = part.function_call.args or {}
+                tools.append(part.function_call.name)
+                for key in _TRIP_KEYS:
+                    if args.get(key):
+                        state[key] = args[key]
+            elif getattr(part, 'text', None):
+                if content.role == 'user':
+                    asked.append(part.text)
+                    for pattern, key in ((_CURRENCY, 'currency'), (_BUDGET, 'budget'), (_TRAVELERS, 'travelers')):
+                        match = pattern.search(part.text)
+                        if match:
+                            state[key] = match.group(1)
+                else:
+                    answer.append(part.text)
+    line = f"- User: {_clip(' '.join(asked), 200)}"
+    if tools:
+        line += f" | Tools: {', '.join(tools)}"
+    if answer:
+        line += f" | Assistant: {_clip(' '.join(answer), 240)}"
+    return line
+
+
+def _truncate_tool_outputs(content):
+    """Copy of a content with long function responses clipped."""
+    parts = []
+    changed = False
+    for part in content.parts or []:
+        response = getattr(part, 'function_response', None)
+        if response is not None:
+            text = json.dumps(response.response or {}, default=str)
+            if len(text) > CONTEXT_TOOL_OUTPUT_CHARS:
+                part = types.Part(function_response=types.FunctionResponse(
+                    id=getattr(response, 'id', None),
+                    name=response.name,
+                    response={'result': text[:CONTEXT_TOOL_OUTPUT_CHARS] + '... [truncated]'}
+                ))
+                changed = True
+        parts.append(part)
+    return types.Content(role=content.role, parts=parts) if changed else content
+
+
+def _session_key(callback_context) -> str:
+    """The session id from the context's public ``session``; the invocation id on ADKs without it."""
+    session = getattr(callback_context, 'session', None)
+    return getattr(session, 'id', None) or callback_context.invocation_id
+
+
+def compact_context(callback_context, llm_request):
+    """before_model_callback: keep the request's history within CONTEXT_TOKEN_BUDGET."""
+    contents = llm_request.contents or []
+    if sum(_content_tokens(c) for c in contents) <= CONTEXT_TOKEN_BUDGET:
+        return None
+
+    turns = _split_turns(contents)
+    keep = min(CONTEXT_KEEP_TURNS, len(turns))
+    while True:
+        old_turns, recent = turns[:len(turns) - keep], turns[len(turns) - keep:]
+        # Tool outputs of earlier kept turns are clipped; the current turn stays intact
+        recent = [[_truncate_tool_outputs(c) for c in t] for t in recent[:-1]] + recent[-1:]
+        recent_tokens = sum(_content_tokens(c) for t in recent for c in t)
+        if keep <= 1 or recent_tokens <= CONTEXT_TOKEN_BUDGET * 0.8:
+            break
+        keep -= 1
+    if not old_turns:
+        return None
+
+    # Extend the cached summary with turns compacted since the last call
+    key = _session_key(callback_context)
+    cached = _summaries.get(key)
+    anchor = _summarize_turn(old_turns[0], {})
+    # Rebuild if the history was trimmed underneath us
+    if cached is None or cached['upto'] > len(old_turns) or cached['anchor'] != anchor:
+        cached = {'upto': 0, 'lines': [], 'state': {}, 'anchor': anchor}
+    for turn in old_turns[cached['upto']:]:
+        cached['lines'].append(_summarize_turn(turn, cached['state']))
+    cached['upto'] = len(old_turns)
+    _summaries.set(key, cached, _SUMMARY_TTL)
+
+    lines = cached['lines']
+    # Keep the summary itself within a fifth of the budget, dropping the oldest lines
+    while len(lines) > 1 and sum(len(l) for l in lines) // 4 > CONTEXT_TOKEN_BUDGET // 5:
+        lines = lines[1:]
+    state = "; ".join(f"{k}={v}" for k, v in cached['state'].items()) or "none recorded"
+    summary = (
+        f"[Earlier conversation, summarized - {len(old_turns)} turn(s)]\n"
+        f"Trip state: {state}\n" + "\n".join(lines) + "\n[End of summary]"
+    )
+
+    first = recent[0][0]
+    recent[0][0] = types.Content(role=first.role, parts=[types.Part(text=summary)] + list(first.parts or []))
+    llm_request.contents = [c for t in recent for c in t]
+    return None
@@ -1,43 +1,220 @@
-from google.adk.agents import Agent
-from agents.utils import get_amadeus_client
+import asyncio
+import functools
+import os
+from datetime import date, timedelta
+from agents.cache import MemoryBackend, SQLiteBackend, SWRCache
+from agents.places import normalize_iata
+from agents.records import FlightDay, FlightOffer, error, table, to_number
+from agents.singleflight import inflight
+from agents.utils import amadeus_request
 
-def search_flights(origin_iata: str, destination_iata: str, departure_date: str) -> str:
+# Flight offers: served fresh for FLIGHT_CACHE_TTL, then served stale (while a
+# background refresh runs) until FLIGHT_CACHE_STALE_TTL. Set FLIGHT_CACHE_DB to
+# a file path to share the cache between workers and keep it across restarts.
+FLIGHT_CACHE_TTL = int(os.getenv('FLIGHT_CACHE_TTL', 900))
+FLIGHT_CACHE_STALE_TTL = int(os.getenv('FLIGHT_CACHE_STALE_TTL', 6 * 3600))
+FLIGHT_CACHE_SIZE = int(os.getenv('FLIGHT_CACHE_SIZE', 2048))
+FLIGHT_CACHE_DB = os.getenv('FLIGHT_CACHE_DB')
+
+if FLIGHT_CACHE_DB:
+    _backend = SQLiteBackend(FLIGHT_CACHE_DB, maxsize=FLIGHT_CACHE_SIZE, table="flight_offers")
+else:
+    _backend = MemoryBackend(maxsize=FLIGHT_CACHE_SIZE)
+
+flight_cache = SWRCache(_backend, FLIGHT_CACHE_TTL, FLIGHT_CACHE_STALE_TTL, name="flights")
+
+# Flexible-date search: at most FLIGHT_GRID_CONCURRENCY uncached dates are queried
+# at once, over windows of up to FLIGHT_GRID_MAX_DAYS days each.
+FLIGHT_GRID_CONCURRENCY = int(os.getenv('FLIGHT_GRID_CONCURRENCY', 4))
+FLIGHT_GRID_MAX_DAYS = int(os.getenv('FLIGHT_GRID_MAX_DAYS', 14))
+
+
+def flight_cache_key(origin_iata: str, destination_iata: str, departure_date: str,
+                     adults: int = 1, max_offers: int = 5) -> str:
+    return f"{origin_iata.upper()}|{destination_iata.upper()}|{departure_date}|{adults}|{max_offers}"
+
+
+async def fetch_flight_offers(origin_iata: str, destination_iata: str, departure_date: str,
+                              adults: int = 1, max_offers: int = 5) -> list:
+    """Returns raw Amadeus flight offers for one route/date, via the flight cache."""
+    async def _fetch():
+        response = await amadeus_request('flight-offers', lambda amadeus: amadeus.shopping.flight_offers_search.get(
+            originLocationCode=origin_iata.upper(),
+            destinationLocationCode=destination_iata.upper(),
+            departureDate=departure_date,
+            adults=adults,
+            max=max_offers
+        ))
+        return response.data or []
+
+    key = flight_cache_key(origin_iata, destination_iata, departure_date, adults, max_offers)
+    return await flight_cache.get_or_fetch(key, lambda: inflight.do(("flights", key), _fetch))
+
+
+def flight_records(offers: list) -> tuple:
+    """Compact records for raw Amadeus offers, plus the currency they're priced in."""
+    records = []
+    currency = None
+    for offer in offers:
+        itinerary = offer['itineraries'][0]
+        currency = currency or offer['price'].get('currency')
+        records.append(FlightOffer(
+            airline=offer['validatingAirlineCodes'][0],
+            price=to_number(offer['price']['total']),
+            duration=itinerary['duration'][2:],  # Strip 'PT'
+            stops=len(itinerary['segments']) - 1
+        ))
+    return records, currency or 'EUR'
+
+
+async def search_flights(origin_iata: str, destination_iata: str, departure_date: str) -> dict:
     """
-    Searches for flights using Amadeus.
+    Searches for flights using Amadeus. Returns rows of airline, price, duration, stops.
     Args:
-        origin_iata: 3-letter IATA code (e.g., JFK).
-        destination_iata: 3-letter IATA code (e.g., LHR).
+        origin_iata: 3-letter IATA code (e.g., JFK) or city name.
+        destination_iata: 3-letter IATA code (e.g., LHR) or city name.
         departure_date: Date in YYYY-MM-DD format.
     """
+    # Resolve names and catch bad codes locally instead of via a failed Amadeus call
+    origin, err = normalize_iata(origin_iata)
+    if err:
+        return err
+    destination, err = normalize_iata(destination_iata)
+    if err:
+        return err
+
+    route = f"{origin}-{destination}"
     try:
-        amadeus = get_amadeus_client()
-        response = amadeus.shopping.flight_offers_search.get(
-            originLocationCode=origin_iata,
-            destinationLocationCode=destination_iata,
-            departureDate=departure_date,
-            adults=1,
-            max=5
-        )
-
-        if not response.data:
-            return f"No flights found from {origin_iata} to {destination_iata} on {departure_date}."
-
-        results = []
-        for offer in response.data:
-            price = offer['price']['total']
-            airline = offer['validatingAirlineCodes'][0]
-            segments = offer['itineraries'][0]['segments']
-            duration = offer['itineraries'][0]['duration'][2:] # Strip 'PT'
-            results.append(f"- Airline: {airline}, Price: {price} EUR, Duration: {duration}")
-            
-        return "\n".join(results)
+        offers = await fetch_flight_offers(origin, destination, departure_date)
+        records, currency = flight_records(offers)
+        return table(FlightOffer, records, route=route, date=departure_date, currency=currency)
 
+    except asyncio.TimeoutError:
+        return error("Flight search timed out. Please try again.", route=route, date=departure_date)
     except Exception as e:
-        return f"Flight search failed: {str(e)}"
-
-flight_agent = Agent(
-    name="flight_agent",
-    model="gemini-1.5-flash",
-    tools=[search_flights],
-    instruction="You find flight options based on IATA codes."
-)
\ No newline at end of file
+        return error(f"Flight search failed: {str(e)}", route=route, date=departure_date)
+
+def _date_window(start: str, end: str) -> list:
+    """ISO dates from start to end inclusive, skipping past days; raises ValueError on bad input."""
+    first = date.fromisoformat(start)
+    last = date.fromisoformat(end) if end else first
+    if last < first:
+        raise ValueError(f"window ends ({end}) before it starts ({start})")
+    if (last - first).days >= FLIGHT_GRID_MAX_DAYS:
+        raise ValueError(f"window is longer than {FLIGHT_GRID_MAX_DAYS} days")
+    first = max(first, date.today())
+    return [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+
+
+async def _cheapest_per_day(origin: str, destination: str, days: list, semaphore) -> tuple:
+    """Cheapest offer for each day, plus the currency and the days that failed."""
+    async def _day(day):
+        # Cached days are answered straight away; only upstream calls wait for a slot
+        if await flight_cache.peek(flight_cache_key(origin, destination, day)) is not None:
+            return await fetch_flight_offers(origin, destination, day)
+        async with semaphore:
+            return await fetch_flight_offers(origin, destination, day)
+
+    results = await asyncio.gather(*(_day(d) for d in days), return_exceptions=True)
+
+    rows, failed, currency = [], [], None
+    for day, offers in zip(days, results):
+        if isinstance(offers, BaseException):
+            failed.append(day)
+            continue
+        records, day_currency = flight_records(offers)
+        currency = currency or (day_currency if records else None)
+        best = min(records, key=lambda r: r.price if r.price is not None else float('inf'), default=None)
+        if best is None:
+            rows.append(FlightDay(day, None, None, None, None))
+        else:
+            rows.append(FlightDay(day, best.price, best.airline, best.duration, best.stops))
+    return rows, currency, failed
+
+
+async def search_flexible_flights(
+    origin_iata: str,
+    destination_iata: str,
+    depart_from: str,
+    depart_to: str,
+    return_from: str = "",
+    return_to: str = ""
+) -> dict:
+    """
+    Finds the cheapest flight on each day of a date window in one call (for "cheapest
+    day next week" style questions). With a return window, also prices the way back
+    and returns a depart x return matrix of combined prices.
+    Args:
+        origin_iata: 3-letter IATA code (e.g., DEL) or city name.
+        destination_iata: 3-letter IATA code (e.g., GOI) or city name.
+        depart_from: First departure date, YYYY-MM-DD.
+        depart_to: Last departure date, YYYY-MM-DD (max 14-day window).
+        return_from: First return date, YYYY-MM-DD; empty for one-way.
+        return_to: Last return date, YYYY-MM-DD; empty to use return_from only.
+    """
+    origin, err = normalize_iata(origin_iata)
+    if err:
+        return err
+    destination, err = normalize_iata(destination_iata)
+    if err:
+        return err
+
+    route = f"{origin}-{destination}"
+    try:
+        depart_days = _date_window(depart_from, depart_to)
+        return_days = _date_window(return_from, return_to) if return_from else []
+    except ValueError as e:
+        return error(f"Invalid date window: {str(e)}", route=route)
+    if not depart_days:
+        return error("The departure window is entirely in the past.", route=route)
+
+    semaphore = asyncio.Semaphore(FLIGHT_GRID_CONCURRENCY)
+    outbound, inbound = await asyncio.gather(
+        _cheapest_per_day(origin, destination, depart_days, semaphore),
+        _cheapest_per_day(destination, origin, return_days, semaphore),
+    )
+    out_rows, currency, failed = outbound
+    if len(failed) == len(depart_days):
+        return error("Flight search failed for every date in the window. Please try again.", route=route)
+
+    if not return_from:
+        return table(FlightDay, out_rows, route=route, currency=currency or 'EUR',
+                     failed=failed or None)
+
+    back_rows, back_currency, back_failed = inbound
+    # Round trips are priced as two one-way fares so every cell reuses the per-day cache
+    totals = [
+        [round(o.price + b.price, 2) if o.price is not None and b.price is not None and b.date >= o.date else None
+         for b in back_rows]
+        for o in out_rows
+    ]
+    return {
+        'route': route,
+        'currency': currency or back_currency or 'EUR',
+        'outbound': table(FlightDay, out_rows, failed=failed or None),
+        'return': table(FlightDay, back_rows, failed=back_failed or None),
+        'matrix': {
+            'depart': [o.date for o in out_rows],
+            'return': [b.date for b in back_rows],
+            'total': totals,
+        },
+    }
+
+
+@functools.cache
+def _build_agent():
+    from google.adk.agents import Agent
+    return Agent(
+        name="flight_agent",
+        model="gemini-1.5-flash",
+        tools=[search_flights, search_flexible_flights],
+        instruction="You find flight options based on IATA codes."
+    )
+
+
+def __getattr__(name):
+    # flight_agent is built on first access; the root agent calls these tools directly
+    if name == 'flight_agent':
+        return _build_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
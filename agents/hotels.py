@@ -1,76 +1,78 @@
-from google.adk.agents import Agent
-from agents.utils import get_amadeus_client
+import asyncio
+import functools
+from agents.places import normalize_iata
+from agents.records import HotelOffer, error, table, to_number
+from agents.singleflight import inflight
+from agents.utils import amadeus_request
 
-def search_hotels(city_code: str) -> str:
+async def search_hotels(city_code: str) -> dict:
     """
-    Finds hotels in a city using Amadeus API.
-    Args: city_code: IATA city code (e.g., DEL for Delhi, BOM for Mumbai, PAR for Paris).
+    Finds hotels in a city using Amadeus API. Returns rows of name, rating, price per night, currency.
+    Args: city_code: IATA city code (e.g., DEL for Delhi, BOM for Mumbai, PAR for Paris) or city name.
     """
+    # Airport codes and city names are mapped to the city code hotel search expects
+    code, err = normalize_iata(city_code, city=True)
+    if err:
+        return err
     try:
-        amadeus = get_amadeus_client()
-        
-        # Try hotel search by city code
-        response = amadeus.shopping.hotel_offers_search.get(
-            cityCode=city_code.upper(),
-            adults=1,
-            radius=50,
-            radiusUnit='KM',
-            ratings=['3', '4', '5'],
-            bestRateOnly=True
-        )
-
-        if not response.data:
-            return (
-                f"No hotels found for IATA code '{city_code}'. "
-                f"Common codes: DEL (Delhi), BOM (Mumbai), GOI (Goa), JAI (Jaipur), "
-                f"BLR (Bangalore), MAA (Chennai), CCU (Kolkata)."
+        # Try hotel search by city code (concurrent searches for one city share a request)
+        response = await inflight.do(("hotels", code), lambda: amadeus_request(
+            'hotel-offers', lambda amadeus: amadeus.shopping.hotel_offers_search.get(
+                cityCode=code,
+                adults=1,
+                radius=50,
+                radiusUnit='KM',
+                ratings=['3', '4', '5'],
+                bestRateOnly=True
             )
+        ))
 
-        results = []
-        for idx, offer in enumerate(response.data[:5], 1):
+        records = []
+        for offer in (response.data or [])[:5]:
             hotel_info = offer.get('hotel', {})
-            name = hotel_info.get('name', 'Unknown Hotel')
-            
-            # Get hotel details
-            rating = hotel_info.get('rating', 'N/A')
-            rating_str = f"{rating}/5" if rating != 'N/A' else 'Not rated'
+            rating = str(hotel_info.get('rating', ''))
             
-            # Get price from first offer
+            # Price from the first (best) offer
             offers = offer.get('offers', [])
-            if offers:
-                price_info = offers[0].get('price', {})
-                total = price_info.get('total', 'N/A')
-                currency = price_info.get('currency', 'USD')
-                price_str = f"{currency} {total}"
-            else:
-                price_str = "Price not available"
-            
-            results.append(f"{idx}. {name}\n   Rating: {rating_str} ⭐ | Price: {price_str}/night")
+            price_info = offers[0].get('price', {}) if offers else {}
+            records.append(HotelOffer(
+                name=hotel_info.get('name', 'Unknown Hotel'),
+                rating=int(rating) if rating.isdigit() else None,
+                price=to_number(price_info.get('total')),
+                currency=price_info.get('currency')
+            ))
 
-        header = f"🏨 Found {len(results)} hotel(s) in {city_code.upper()}:\n\n"
-        return header + "\n\n".join(results) + "\n\n📌 Book via: Amadeus, Booking.com, Hotels.com"
+        return table(HotelOffer, records, city=code)
 
+    except asyncio.TimeoutError:
+        return error("Hotel search timed out. Please try again.", city=code)
     except Exception as e:
         error_msg = str(e)
         if "404" in error_msg or "not found" in error_msg.lower():
-            return (
-                f"Invalid IATA code: '{city_code}'. Use 3-letter airport codes.\n"
-                f"Examples: DEL (Delhi), BOM (Mumbai), GOI (Goa), JAI (Jaipur), "
-                f"BLR (Bangalore), MAA (Chennai), HYD (Hyderabad)."
-            )
+            return error("Amadeus does not recognise this city code. Look it up with resolve_location.", city=code)
         elif "401" in error_msg or "authentication" in error_msg.lower():
-            return "Amadeus API authentication failed. Check your credentials in .env file."
+            return error("Amadeus API authentication failed. Check your credentials in .env file.", city=code)
         else:
-            return f"Hotel search error: {error_msg}"
+            return error(f"Hotel search error: {error_msg}", city=code)
 
-hotel_agent = Agent(
-    name="hotel_agent",
-    model="gemini-1.5-flash",
-    tools=[search_hotels],
-    instruction=(
-        "You search hotels using REAL Amadeus API data. "
-        "ALWAYS use proper IATA city codes (3 letters): DEL for Delhi, BOM for Mumbai, GOI for Goa, etc. "
-        "If user gives city name, convert it to IATA code first. "
-        "Present results with ratings and prices. NO fake data."
+
+@functools.cache
+def _build_agent():
+    from google.adk.agents import Agent
+    return Agent(
+        name="hotel_agent",
+        model="gemini-1.5-flash",
+        tools=[search_hotels],
+        instruction=(
+            "You search hotels using REAL Amadeus API data. "
+            "Pass the IATA city code or just the city name - names are resolved to codes automatically. "
+            "Present results with ratings and prices. NO fake data."
+        )
     )
-)
\ No newline at end of file
+
+
+def __getattr__(name):
+    # hotel_agent is built on first access; the root agent calls these tools directly
+    if name == 'hotel_agent':
+        return _build_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
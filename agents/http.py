@@ -0,0 +1,65 @@
+"""
+Shared, pooled aiohttp client for outbound API calls made by the agent tools.
+"""
+import asyncio
+import os
+from typing import TYPE_CHECKING
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    import aiohttp
+
+load_dotenv()
+
+# Connection pool limits (overridable from the environment)
+HTTP_POOL_LIMIT = int(os.getenv('HTTP_POOL_LIMIT', 100))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv('HTTP_POOL_LIMIT_PER_HOST', 20))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', 30))
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 10))
+
+_sessions = {}   # event loop -> its keep-alive session
+
+
+def get_http_session() -> 'aiohttp.ClientSession':
+    """Return the keep-alive session for the running event loop.
+
+    aiohttp sessions are bound to the loop they were created on, so each loop
+    (e.g. the CLI's ``asyncio.run`` versus the web server's shared loop) gets its
+    own. Call close_http_session() on a loop before it ends.
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        import aiohttp
+        _forget_closed_loops()
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=300,
+        )
+        session = _sessions[loop] = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+        )
+    return session
+
+
+def _forget_closed_loops():
+    """Drop sessions whose loop ended without close_http_session(); nothing can run on it any more."""
+    for loop in [loop for loop in _sessions if loop.is_closed()]:
+        print("[!] An HTTP session outlived its event loop; call close_http_session() before the loop ends")
+        _sessions.pop(loop).detach()
+
+
+async def close_http_session():
+    """Close the sessions of this loop and of other loops that are still running (call on shutdown)."""
+    current = asyncio.get_running_loop()
+    for loop, session in list(_sessions.items()):
+        if loop is current:
+            del _sessions[loop]
+            await session.close()
+        elif loop.is_running():
+            del _sessions[loop]
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
+    _forget_closed_loops()
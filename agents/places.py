@@ -0,0 +1,222 @@
+"""
+Local airport/city index - resolves place names to IATA codes without a model
+turn or an Amadeus round trip.
+
+Searches try, in order: an exact IATA code, an exact name/city/alias, a name
+prefix, then trigram similarity (for misspellings like "Banglore"). Only code
+and exact matches are resolved automatically; prefix and fuzzy matches are
+offered back as suggestions, so a town missing from the data never silently
+becomes another city. The index is built once per process from a bundled CSV
+(agents/data/airports.csv, or PLACES_FILE).
+"""
+import bisect
+import csv
+import os
+import re
+import threading
+import unicodedata
+from array import array
+from dataclasses import dataclass
+from typing import Optional
+from agents.records import Location, error, table
+
+PLACES_FILE = os.getenv('PLACES_FILE', os.path.join(os.path.dirname(__file__), 'data', 'airports.csv'))
+
+# Minimum trigram (Dice) similarity for a fuzzy match
+PLACES_FUZZY_THRESHOLD = float(os.getenv('PLACES_FUZZY_THRESHOLD', 0.45))
+
+_CODE = re.compile(r'^[A-Za-z]{3}$')
+
+
+@dataclass(slots=True)
+class Place:
+    code: str
+    kind: str       # 'airport' or 'city' (a metropolitan code covering several airports)
+    name: str
+    city: str
+    city_code: str
+    country: str
+    aliases: tuple = ()
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    return " ".join(re.sub(r'[^a-z0-9]+', ' ', text.lower()).split())
+
+
+def _trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PlaceIndex:
+    """In-memory lookup over places: code table, exact keys, sorted prefix keys and trigram postings."""
+
+    def __init__(self, places: list):
+        self.places = places
+        self._codes = {}
+        self._exact = {}
+
+        keys = set()
+        for i, place in enumerate(places):
+            self._codes.setdefault(place.code, i)
+            for name in (place.name, place.city, *place.aliases):
+                key = normalize(name)
+                if key:
+                    keys.add((key, i))
+                    self._exact.setdefault(key, []).append(i)
+
+        # Sorted (key, place) pairs: prefix matches are a contiguous range
+        ordered = sorted(keys)
+        self._keys = [k for k, _ in ordered]
+        self._key_places = array('I', (i for _, i in ordered))
+        self._key_grams = array('B', (min(len(_trigrams(k)), 255) for k in self._keys))
+
+        # Trigram -> key ids
+        self._grams = {}
+        for key_id, key in enumerate(self._keys):
+            for gram in _trigrams(key):
+                self._grams.setdefault(gram, array('I')).append(key_id)
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'PlaceIndex':
+        places = []
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                places.append(Place(
+                    code=row['code'].strip().upper(),
+                    kind=row['kind'].strip() or 'airport',
+                    name=row['name'].strip(),
+                    city=row['city'].strip(),
+                    city_code=(row.get('city_code') or row['code']).strip().upper(),
+                    country=row['country'].strip().upper(),
+                    aliases=tuple(a.strip() for a in (row.get('aliases') or '').split(';') if a.strip())
+                ))
+        return cls(places)
+
+    def by_code(self, code: str) -> Optional[Place]:
+        i = self._codes.get(code.strip().upper())
+        return self.places[i] if i is not None else None
+
+    def _ranked(self, ids) -> list:
+        # Metropolitan city codes first, then file order (major airports are listed first)
+        return sorted(set(ids), key=lambda i: (self.places[i].kind != 'city', i))
+
+    def search(self, query: str, limit: int = 5) -> list:
+        """Best matches for a code or place name, as (Place, how) pairs; how is code/exact/prefix/fuzzy."""
+        key = normalize(query)
+        if not key:
+            return []
+
+        results = []
+        seen = set()
+
+        def add(ids, how):
+            for i in self._ranked(ids):
+                if i not in seen and len(results) < limit:
+                    seen.add(i)
+                    results.append((self.places[i], how))
+
+        if _CODE.match(query.strip()) and key.upper() in self._codes:
+            add([self._codes[key.upper()]], 'code')
+        add(self._exact.get(key, ()), 'exact')
+
+        if len(results) < limit and len(key) >= 2:
+            lo = bisect.bisect_left(self._keys, key)
+            hi = bisect.bisect_left(self._keys, key + '\x7f')
+            add((self._key_places[k] for k in range(lo, hi)), 'prefix')
+
+        if len(results) < limit and len(key) >= 3:
+            grams = _trigrams(key)
+            shared = {}
+            for gram in grams:
+                for key_id in self._grams.get(gram, ()):
+                    shared[key_id] = shared.get(key_id, 0) + 1
+            best = {}
+            for key_id, n in shared.items():
+                score = 2 * n / (len(grams) + self._key_grams[key_id])
+                if score >= PLACES_FUZZY_THRESHOLD:
+                    i = self._key_places[key_id]
+                    best[i] = max(best.get(i, 0), score)
+            for i in sorted(best, key=lambda i: (-best[i], self.places[i].kind != 'city', i)):
+                add([i], 'fuzzy')
+
+        return results
+
+    def mentions(self, text: str, max_words: int = 4) -> list:
+        """
+        Places named in free text, as (Place, first word, end word) in reading order.
+        Longest names win ("new york" over "york"); keys under 3 characters are ignored.
+        """
+        words = normalize(text).split()
+        found = []
+        i = 0
+        while i < len(words):
+            for n in range(min(max_words, len(words) - i), 0, -1):
+                key = " ".join(words[i:i + n])
+                if len(key) >= 3 and key in self._exact:
+                    found.append((self.places[self._ranked(self._exact[key])[0]], i, i + n))
+                    i += n
+                    break
+            else:
+                i += 1
+        return found
+
+    def resolve(self, value: str, city: bool = False) -> Optional[str]:
+        """
+        IATA code for a known code or an exact place name, or None.
+        With city=True, airports are mapped to their city code (what hotel search expects).
+        Well-formed codes missing from the dataset are passed through unchanged. Prefix and
+        fuzzy matches are not resolved ("York" is not New York, DEN is not DPS).
+        """
+        matches = self.search(value, limit=1)
+        if matches and matches[0][1] in ('code', 'exact'):
+            place = matches[0][0]
+            return place.city_code if city else place.code
+        if _CODE.match(value.strip()):
+            return value.strip().upper()
+        return None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_place_index() -> PlaceIndex:
+    """Singleton accessor; the CSV is parsed on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = PlaceIndex.from_csv(PLACES_FILE)
+    return _index
+
+
+def normalize_iata(value: str, city: bool = False) -> tuple:
+    """
+    Validate a code or place name before an Amadeus call.
+    Returns (code, None) on success, or (None, error dict with suggestions).
+    """
+    code = get_place_index().resolve(value or '', city=city)
+    if code:
+        return code, None
+    suggestions = [f"{p.code} ({p.city})" for p, _ in get_place_index().search(value or '', limit=3)]
+    message = f"Unknown place '{value}'. Use a 3-letter IATA code"
+    message += f"; did you mean {', '.join(suggestions)}?" if suggestions else "."
+    return None, error(message, suggestions=suggestions or None)
+
+
+def resolve_location(query: str) -> dict:
+    """
+    Looks up IATA airport and city codes for a place name, code or common alias
+    (e.g., "Bangalore", "Bombay", "Heathrow"). Tolerates misspellings.
+    Args:
+        query: City, airport or region name, or an IATA code.
+    Returns rows of code, name, city, city_code (use for hotels), country.
+    """
+    matches = get_place_index().search(query)
+    if not matches:
+        return error(f"No airport or city found for '{query}'.", query=query)
+    records = [Location(p.code, p.name, p.city, p.city_code, p.country) for p, _ in matches]
+    return table(Location, records, query=query)
@@ -0,0 +1,66 @@
+"""
+Trip data prefetch - gathers weather, flights, hotels and ground transport in
+one tool call so the root agent doesn't need a model round trip per source.
+"""
+import asyncio
+import os
+from agents.flights import search_flights
+from agents.hotels import search_hotels
+from agents.records import error
+from agents.transport import search_ground_transport
+from agents.weather import get_weather
+
+# Per-source timeouts (seconds); a slow source is reported as unavailable
+# instead of holding up the others.
+TRIP_WEATHER_TIMEOUT = float(os.getenv('TRIP_WEATHER_TIMEOUT', 8))
+TRIP_FLIGHTS_TIMEOUT = float(os.getenv('TRIP_FLIGHTS_TIMEOUT', 20))
+TRIP_HOTELS_TIMEOUT = float(os.getenv('TRIP_HOTELS_TIMEOUT', 20))
+TRIP_TRANSPORT_TIMEOUT = float(os.getenv('TRIP_TRANSPORT_TIMEOUT', 10))
+
+
+async def _with_timeout(label: str, coro, timeout: float):
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        return error(f"{label} data unavailable (timed out after {timeout:g}s).")
+    except Exception as e:
+        return error(f"{label} data unavailable: {str(e)}")
+
+
+async def gather_trip_data(
+    origin_city: str,
+    destination_city: str,
+    origin_iata: str,
+    destination_iata: str,
+    departure_date: str,
+    trip_days: int = 3
+) -> dict:
+    """
+    Fetches everything needed for a full trip plan in parallel: destination weather,
+    flights, hotels and ground transport options, keyed by section.
+    Args:
+        origin_city: Departure city name (e.g., Delhi).
+        destination_city: Destination city name (e.g., Goa).
+        origin_iata: 3-letter IATA code of the departure city (e.g., DEL); empty to resolve origin_city.
+        destination_iata: 3-letter IATA code of the destination city (e.g., GOI); empty to resolve destination_city.
+        departure_date: Date in YYYY-MM-DD format.
+        trip_days: Length of the trip in days (used for the weather forecast, max 5).
+    """
+    # Codes are validated/resolved by the flight and hotel searches themselves
+    origin_iata = origin_iata or origin_city
+    destination_iata = destination_iata or destination_city
+
+    weather, flights, hotels, transport = await asyncio.gather(
+        _with_timeout("Weather", get_weather(destination_city, min(max(trip_days, 1), 5)), TRIP_WEATHER_TIMEOUT),
+        _with_timeout("Flight", search_flights(origin_iata, destination_iata, departure_date), TRIP_FLIGHTS_TIMEOUT),
+        _with_timeout("Hotel", search_hotels(destination_iata), TRIP_HOTELS_TIMEOUT),
+        _with_timeout("Ground transport", search_ground_transport(origin_city, destination_city, departure_date),
+                      TRIP_TRANSPORT_TIMEOUT),
+    )
+
+    return {
+        'weather': weather,
+        'flights': flights,
+        'hotels': hotels,
+        'ground_transport': transport,
+    }
@@ -0,0 +1,109 @@
+"""
+Compact result records for the tools.
+
+Tools return small dicts built from these records instead of formatted prose.
+The model gets a short, unambiguous payload. List results go out as one column
+header plus rows, so field names aren't repeated per item. The frontend renders
+the same payload.
+"""
+from dataclasses import dataclass, fields
+from typing import Optional
+
+
+@dataclass(slots=True)
+class FlightOffer:
+    airline: str
+    price: float
+    duration: str
+    stops: int
+
+
+@dataclass(slots=True)
+class FlightDay:
+    date: str
+    price: Optional[float]
+    airline: Optional[str]
+    duration: Optional[str]
+    stops: Optional[int]
+
+
+@dataclass(slots=True)
+class HotelOffer:
+    name: str
+    rating: Optional[int]
+    price: Optional[float]
+    currency: Optional[str]
+
+
+@dataclass(slots=True)
+class WeatherNow:
+    temp: float
+    feels_like: float
+    desc: str
+    humidity: int
+
+
+@dataclass(slots=True)
+class WeatherDay:
+    date: str
+    low: float
+    high: float
+    mean: float
+    pop: int        # highest chance of precipitation that day, %
+    desc: str       # dominant condition
+
+
+@dataclass(slots=True)
+class TransitOption:
+    depart: str
+    arrive: str         # "+1d" when it arrives on a later day
+    duration: str
+    changes: int
+    mode: str           # e.g. 'train' or 'bus+train'
+    operator: str
+    fare: Optional[float]   # None when the timetable has no fare for a leg
+    currency: Optional[str]
+    legs: str           # each leg: service, departure, arrival
+
+
+@dataclass(slots=True)
+class Location:
+    code: str
+    name: str
+    city: str
+    city_code: str
+    country: str
+
+
+def record(obj, **meta) -> dict:
+    """Serialize a single record, merged with metadata; None values are dropped."""
+    payload = {k: v for k, v in meta.items() if v is not None}
+    for f in fields(obj):
+        value = getattr(obj, f.name)
+        if value is not None:
+            payload[f.name] = value
+    return payload
+
+
+def table(cls, records, **meta) -> dict:
+    """Serialize records of one type as {'cols': [...], 'rows': [[...], ...]} plus metadata."""
+    names = [f.name for f in fields(cls)]
+    payload = {k: v for k, v in meta.items() if v is not None}
+    payload['cols'] = names
+    payload['rows'] = [[getattr(r, n) for n in names] for r in records]
+    return payload
+
+
+def error(message: str, **meta) -> dict:
+    """A tool failure, reported to the model rather than raised."""
+    payload = {k: v for k, v in meta.items() if v is not None}
+    payload['error'] = message
+    return payload
+
+
+def to_number(value) -> Optional[float]:
+    """Amadeus sends prices as strings; anything unparseable becomes None."""
+    try:
+        return round(float(value), 2)
+    except (TypeError, ValueError):
+        return None
@@ -1,17 +1,26 @@
 """
 Root Agent - TripWise AI Travel Planner
 """
+import os
 from google.adk.agents import Agent
-from agents.weather import get_weather
+from agents.context import compact_context
+from agents.flights import search_flexible_flights
+from agents.places import resolve_location
+from agents.planner import gather_trip_data
+from agents.transport import search_ground_transport
+from agents.weather import get_weather, get_weather_many
 
 root_agent = Agent(
     name="travel_planner_root",
     model="gemini-2.0-flash",
-    tools=[get_weather],
+    tools=[gather_trip_data, get_weather, get_weather_many, search_flexible_flights, search_ground_transport,
+           resolve_location],
+    # Keeps prompt size roughly flat on long sessions (see agents/context.py)
+    before_model_callback=compact_context,
     instruction="""You are TripWise - an AI travel planning assistant.
 
 RULES:
-1. ALWAYS call get_weather(city) first for weather data
+1. For a full trip plan, call gather_trip_data ONCE (origin, destination, IATA codes, date, trip length) - it returns weather, flights, hotels and ground transport together. For weather-only questions, call get_weather(city); for several cities (multi-city itineraries), call get_weather_many ONCE with all of them. Pass IATA codes when you know them, otherwise leave them empty and the city names are resolved; use resolve_location only if a place is ambiguous. For flexible dates ("cheapest day next week", "best dates in March"), call search_flexible_flights ONCE with the whole date window (and return window if any) instead of searching day by day. For bus/train-only questions, call search_ground_transport(origin, destination, date)
 2. Provide day-by-day itinerary for multi-day trips
 3. Include booking links as markdown: [Site Name](https://url.com)
 4. Show prices in user's preferred currency (ask if not specified)
@@ -36,4 +45,22 @@ INCLUDE IN TRAVEL PLANS:
 
 For follow-ups, give focused answers without repeating the full plan.
 Be helpful, specific, and include real place names and prices."""
-)
\ No newline at end of file
+)
+
+# Follow-ups ("what about day 2?", "in USD please") don't need the planner's model
+# or its long instruction. server/router.py sends them here. The shared name makes
+# the two agents' turns one continuous history.
+FOLLOWUP_MODEL = os.getenv('FOLLOWUP_MODEL', 'gemini-2.0-flash-lite')
+
+followup_agent = Agent(
+    name=root_agent.name,
+    model=FOLLOWUP_MODEL,
+    tools=[gather_trip_data, get_weather, get_weather_many, search_flexible_flights, search_ground_transport,
+           resolve_location],
+    before_model_callback=compact_context,
+    instruction="""You are TripWise, continuing a travel planning conversation.
+
+Answer the user's follow-up briefly, using the plan and tool results already in the conversation.
+Call a tool only when the answer needs data that isn't there yet: get_weather / get_weather_many for weather, search_flexible_flights for other flight dates, search_ground_transport for buses and trains, resolve_location for airport codes, gather_trip_data only for a different trip.
+Keep the markdown style used so far (tables for prices, [Site Name](https://url.com) links) and don't repeat the full plan."""
+)
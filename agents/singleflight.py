@@ -0,0 +1,55 @@
+"""
+Request coalescing ("single-flight") for outbound lookups made by the tools.
+
+Concurrent calls with the same key share one in-flight request: the first
+caller starts it and everyone else awaits the same result (or exception).
+"""
+import asyncio
+from collections import defaultdict
+
+
+class SingleFlight:
+    """Deduplicates concurrent coroutine calls by key. Keys are tuples whose
+    first element names the source (e.g. ``("weather", "goa", 1)``) so
+    counters can be reported per source.
+    """
+
+    def __init__(self):
+        self._inflight = {}  # key -> asyncio.Task
+        self.calls = defaultdict(int)
+        self.deduplicated = defaultdict(int)
+
+    async def do(self, key: tuple, func):
+        """Await ``func()`` (a coroutine function), sharing it with concurrent callers of ``key``."""
+        source = key[0]
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls[source] += 1
+            task = asyncio.get_running_loop().create_task(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.deduplicated[source] += 1
+        # Shield so one caller giving up doesn't cancel the request for the others
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    def stats(self) -> dict:
+        """Upstream calls made and calls deduplicated, per source."""
+        return {
+            source: {
+                'calls': self.calls[source],
+                'deduplicated': self.deduplicated[source],
+                'in_flight': sum(1 for k in self._inflight if k[0] == source),
+            }
+            for source in sorted(set(self.calls) | set(self.deduplicated))
+        }
+
+
+# Shared by get_weather, search_flights and search_hotels
+inflight = SingleFlight()
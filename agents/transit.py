@@ -0,0 +1,589 @@
+"""
+Ground-transport timetable engine (GTFS).
+
+Rail and bus timetables in GTFS format are compiled once into a flat binary
+index. TRANSIT_FEEDS lists the feeds as comma-separated directories or .zip
+files. The index is written to TRANSIT_INDEX and rebuilt when a feed changes.
+Each worker memory-maps it, so all workers on a host share one copy of its
+pages.
+
+The hot data is stored as parallel int32 arrays:
+- connections (one vehicle hop between consecutive stops), sorted by departure
+- trips, services and calendar exceptions
+- footpaths between the stops of a station, and from transfers.txt
+
+Names and fares are only needed to describe results, so they sit in a small
+JSON section.
+
+Journeys are found with the Connection Scan Algorithm. One pass runs over the
+connections leaving after the requested time, in departure order, keeping the
+earliest time each stop can be reached. Changing vehicles takes
+TRANSIT_MIN_TRANSFER seconds at the same stop, or the footpath time to another
+stop. Trips running past midnight, and onward trips on the following days, are
+scanned too. Repeating the scan from just after each journey's departure gives
+the day's non-dominated options.
+
+Places are matched to stops by name (and the optional non-standard stops.txt
+``city`` column), including the aliases known to agents/places.py ("Bombay").
+
+Build ahead of deployment with ``python -m agents.transit FEED... --out transit.idx``,
+or let the first query build it.
+"""
+import argparse
+import bisect
+import csv
+import io
+import json
+import mmap
+import os
+import sys
+import threading
+import zipfile
+from array import array
+from datetime import date
+from dotenv import load_dotenv
+from agents.places import get_place_index, normalize
+from agents.records import TransitOption, error, table
+
+load_dotenv()
+
+TRANSIT_FEEDS = [p.strip() for p in os.getenv('TRANSIT_FEEDS', '').split(',') if p.strip()]
+TRANSIT_INDEX = os.getenv('TRANSIT_INDEX', 'transit.idx')
+# Seconds needed to change vehicles at one stop / to walk between the stops of a station
+TRANSIT_MIN_TRANSFER = int(os.getenv('TRANSIT_MIN_TRANSFER', 300))
+TRANSIT_STATION_WALK = int(os.getenv('TRANSIT_STATION_WALK', 300))
+TRANSIT_MAX_OPTIONS = int(os.getenv('TRANSIT_MAX_OPTIONS', 5))
+# Journeys taking longer than this are not searched for
+TRANSIT_MAX_HOURS = int(os.getenv('TRANSIT_MAX_HOURS', 48))
+
+_MAGIC = b'GTFSIDX1'
+_VERSION = 1
+_DAY = 86400
+_INF = 2 ** 31 - 1
+_WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+
+def _mode(route_type: int) -> str:
+    """Travel mode for a GTFS route_type (basic or extended)."""
+    if route_type == 2 or 100 <= route_type < 200:
+        return 'train'
+    if route_type in (3, 11) or 200 <= route_type < 300 or 700 <= route_type < 800:
+        return 'bus'
+    if route_type == 4 or 1000 <= route_type < 1100 or 1200 <= route_type < 1300:
+        return 'ferry'
+    return 'metro'
+
+
+# -- Building ----------------------------------------------------------------
+
+def _rows(feed: str, name: str):
+    """Rows of one GTFS file as dicts of stripped values; nothing if the file is absent."""
+    def clean(reader):
+        for row in reader:
+            yield {k.strip(): (v or '').strip() for k, v in row.items() if k}
+
+    if feed.endswith('.zip'):
+        with zipfile.ZipFile(feed) as z:
+            if name in z.namelist():
+                with z.open(name) as raw:
+                    yield from clean(csv.DictReader(io.TextIOWrapper(raw, 'utf-8-sig', newline='')))
+    else:
+        path = os.path.join(feed, name)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8-sig', newline='') as f:
+                yield from clean(csv.DictReader(f))
+
+
+def _seconds(value: str):
+    """GTFS time ("25:10:00" is 1:10 the next morning) to seconds after the service day's start."""
+    if not value:
+        return None
+    h, m, s = value.split(':')
+    return int(h) * 3600 + int(m) * 60 + int(s)
+
+
+def _ordinal(value: str) -> int:
+    return date(int(value[:4]), int(value[4:6]), int(value[6:8])).toordinal()
+
+
+def _fingerprint(feeds: list) -> list:
+    """Path, size and mtime of every feed file, to detect a stale index."""
+    result = []
+    for feed in feeds:
+        feed = os.path.abspath(feed)
+        paths = [feed] if os.path.isfile(feed) else sorted(
+            os.path.join(feed, n) for n in os.listdir(feed) if n.endswith('.txt')
+        )
+        for path in paths:
+            st = os.stat(path)
+            result.append([path, st.st_size, st.st_mtime_ns])
+    return result
+
+
+def build(feeds: list, out_path: str, station_walk: int = TRANSIT_STATION_WALK) -> dict:
+    """Compile GTFS feeds into an index file at ``out_path``; returns its counts."""
+    agencies, stops, routes, trips = [], [], [], []
+    stop_parent, trip_route, trip_service = [], [], []
+    services = {}       # key -> index
+    calendar = []       # per service: [start ordinal, end ordinal, weekday bitmask]
+    exceptions = []     # (date ordinal, service, 1 added / 2 removed)
+    transfers = {}      # (from stop, to stop) -> seconds
+    fares, feed_fares = {}, {}
+    stop_times = {}     # trip -> [(sequence, arrival, departure, stop)]
+
+    def service(key):
+        if key not in services:
+            services[key] = len(calendar)
+            calendar.append([0, 0, 0])
+        return services[key]
+
+    for f, feed in enumerate(feeds):
+        agency_ids = {}
+        for row in _rows(feed, 'agency.txt'):
+            agency_ids[row.get('agency_id', '')] = len(agencies)
+            agencies.append(row.get('agency_name', ''))
+        default_agency = next(iter(agency_ids.values()), None)
+
+        stop_ids, parents = {}, {}
+        for row in _rows(feed, 'stops.txt'):
+            stop_ids[row['stop_id']] = len(stops)
+            parents[len(stops)] = row.get('parent_station', '')
+            stops.append([row.get('stop_name', ''), row.get('city', ''), row.get('zone_id', '')])
+            stop_parent.append(-1)
+        for i, parent in parents.items():
+            stop_parent[i] = stop_ids.get(parent, -1)
+
+        route_ids = {}
+        for row in _rows(feed, 'routes.txt'):
+            route_ids[row['route_id']] = len(routes)
+            agency = agency_ids.get(row.get('agency_id', ''), default_agency)
+            routes.append([row.get('route_short_name', ''), row.get('route_long_name', ''),
+                           agency, int(row.get('route_type') or 3), f])
+
+        for row in _rows(feed, 'calendar.txt'):
+            mask = sum(1 << d for d, name in enumerate(_WEEKDAYS) if row.get(name) == '1')
+            calendar[service((f, row['service_id']))] = [_ordinal(row['start_date']), _ordinal(row['end_date']), mask]
+        for row in _rows(feed, 'calendar_dates.txt'):
+            exceptions.append((_ordinal(row['date']), service((f, row['service_id'])), int(row['exception_type'])))
+
+        trip_ids = {}
+        for row in _rows(feed, 'trips.txt'):
+            if row['route_id'] not in route_ids:
+                continue
+            trip_ids[row['trip_id']] = len(trips)
+            trips.append([row.get('trip_short_name', ''), row.get('trip_headsign', '')])
+            trip_route.append(route_ids[row['route_id']])
+            trip_service.append(service((f, row['service_id'])))
+
+        for row in _rows(feed, 'stop_times.txt'):
+            trip, stop = trip_ids.get(row['trip_id']), stop_ids.get(row['stop_id'])
+            arrival = _seconds(row.get('arrival_time'))
+            departure = _seconds(row.get('departure_time'))
+            if trip is None or stop is None or (arrival is None and departure is None):
+                continue  # untimed stops are skipped; the hop spans them
+            stop_times.setdefault(trip, []).append((
+                int(row['stop_sequence']), arrival if arrival is not None else departure,
+                departure if departure is not None else arrival, stop
+            ))
+
+        for row in _rows(feed, 'transfers.txt'):
+            a, b = stop_ids.get(row.get('from_stop_id')), stop_ids.get(row.get('to_stop_id'))
+            if a is None or b is None or row.get('transfer_type') == '3':  # 3: not possible
+                continue
+            seconds = int(row.get('min_transfer_time') or 0) or (TRANSIT_MIN_TRANSFER if a == b else station_walk)
+            transfers[a, b] = min(seconds, transfers.get((a, b), _INF))
+
+        prices = {}
+        for row in _rows(feed, 'fare_attributes.txt'):
+            prices[row['fare_id']] = [float(row['price']), row.get('currency_type', '')]
+        for row in _rows(feed, 'fare_rules.txt'):
+            if row['fare_id'] not in prices:
+                continue
+            rule = [row.get('origin_id', ''), row.get('destination_id', ''), *prices[row['fare_id']]]
+            if row.get('route_id'):
+                if row['route_id'] in route_ids:
+                    fares.setdefault(str(route_ids[row['route_id']]), []).append(rule)
+            else:
+                feed_fares.setdefault(str(f), []).append(rule)
+
+    # Connections: consecutive timed stops of each trip, sorted by departure
+    connections = []
+    for trip, times in stop_times.items():
+        times.sort()
+        for (_, _, dep, a), (_, arr, _, b) in zip(times, times[1:]):
+            connections.append((dep, arr, a, b, trip))
+    connections.sort()
+
+    # Footpaths: between all stops of a station (and same-named stops of different feeds),
+    # plus transfers.txt; same-stop entries set a change time
+    members = {}
+    for i, parent in enumerate(stop_parent):
+        if parent >= 0:
+            members.setdefault(parent, {parent}).add(i)
+    for i, (name, _, _) in enumerate(stops):
+        if stop_parent[i] < 0 and normalize(name):
+            members.setdefault(normalize(name), set()).add(i)
+    for group in members.values():
+        for a in group:
+            for b in group:
+                if a != b:
+                    transfers[a, b] = min(transfers.get((a, b), _INF), station_walk)
+    self_transfer = array('i', [-1]) * len(stops)
+    foot_start, foot_to, foot_secs = array('i', [0]) * (len(stops) + 1), array('i'), array('i')
+    for (a, b), seconds in sorted(transfers.items()):
+        if a == b:
+            self_transfer[a] = seconds
+            continue
+        foot_start[a + 1] += 1
+        foot_to.append(b)
+        foot_secs.append(seconds)
+    for i in range(len(stops)):
+        foot_start[i + 1] += foot_start[i]
+
+    exceptions.sort()
+    sections = {
+        'conn_dep': array('i', (c[0] for c in connections)),
+        'conn_arr': array('i', (c[1] for c in connections)),
+        'conn_from': array('i', (c[2] for c in connections)),
+        'conn_to': array('i', (c[3] for c in connections)),
+        'conn_trip': array('i', (c[4] for c in connections)),
+        'trip_route': array('i', trip_route),
+        'trip_service': array('i', trip_service),
+        'stop_parent': array('i', stop_parent),
+        'self_transfer': self_transfer,
+        'foot_start': foot_start,
+        'foot_to': foot_to,
+        'foot_secs': foot_secs,
+        'svc_start': array('i', (c[0] for c in calendar)),
+        'svc_end': array('i', (c[1] for c in calendar)),
+        'svc_days': array('B', (c[2] for c in calendar)),
+        'exc_date': array('i', (e[0] for e in exceptions)),
+        'exc_service': array('i', (e[1] for e in exceptions)),
+        'exc_type': array('B', (e[2] for e in exceptions)),
+    }
+    meta = {'agencies': agencies, 'stops': stops, 'routes': routes, 'trips': trips,
+            'fares': fares, 'feed_fares': feed_fares}
+
+    # Layout: magic, header offset, 8-byte aligned arrays, JSON header
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as out:
+        out.write(_MAGIC + bytes(8))
+        layout = {}
+        for name, values in sections.items():
+            out.write(bytes(-out.tell() % 8))
+            layout[name] = [out.tell(), values.typecode, len(values)]
+            values.tofile(out)
+        header_at = out.tell()
+        out.write(json.dumps({
+            'version': _VERSION,
+            'byteorder': sys.byteorder,
+            'fingerprint': _fingerprint(feeds),
+            'sections': layout,
+            'meta': meta,
+        }, separators=(',', ':')).encode())
+        out.seek(len(_MAGIC))
+        out.write(header_at.to_bytes(8, 'little'))
+    os.replace(tmp, out_path)
+    return {'stops': len(stops), 'trips': len(trips), 'connections': len(connections),
+            'footpaths': len(foot_to), 'services': len(calendar)}
+
+
+# -- Querying ----------------------------------------------------------------
+
+class TransitIndex:
+    """Read-only view of a compiled index; the arrays are memoryviews over a shared mmap."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path} is not a transit index")
+        header_at = int.from_bytes(self._mm[len(_MAGIC):len(_MAGIC) + 8], 'little')
+        self.header = json.loads(self._mm[header_at:])
+        if self.header['version'] != _VERSION or self.header['byteorder'] != sys.byteorder:
+            raise ValueError(f"{path} was built by another version or platform")
+        view = memoryview(self._mm)
+        for name, (offset, typecode, count) in self.header['sections'].items():
+            size = array(typecode).itemsize
+            setattr(self, name, view[offset:offset + count * size].cast(typecode))
+        meta = self.header['meta']
+        self.agencies, self.stops, self.routes = meta['agencies'], meta['stops'], meta['routes']
+        self.trips, self.fares, self.feed_fares = meta['trips'], meta['fares'], meta['feed_fares']
+        self._active = {}
+        self._lock = threading.Lock()
+
+        # Stop lookup by name word, and station -> its stops
+        self._stop_words = {}
+        self._stop_keys = []
+        self._children = {}
+        for i, (name, city, _) in enumerate(self.stops):
+            key = f" {normalize(name)} "
+            self._stop_keys.append((key, normalize(city)))
+            for word in set(key.split()) | set(normalize(city).split()):
+                self._stop_words.setdefault(word, []).append(i)
+            if self.stop_parent[i] >= 0:
+                self._children.setdefault(self.stop_parent[i], []).append(i)
+
+    def stats(self) -> dict:
+        return {'stops': len(self.stops), 'trips': len(self.trips), 'connections': len(self.conn_dep),
+                'bytes': len(self._mm)}
+
+    def stops_for(self, query: str) -> set:
+        """Stops serving a place: stop names containing the place's name or an alias, and their stations."""
+        names = {normalize(query)}
+        for place, how in get_place_index().search(query, limit=1):
+            if how in ('code', 'exact'):
+                names.update(normalize(n) for n in (place.city, *place.aliases))
+        found = set()
+        for name in filter(None, names):
+            for i in self._stop_words.get(name.split()[0], ()):
+                key, city = self._stop_keys[i]
+                if city == name or f" {name} " in key:
+                    found.add(i)
+        for i in list(found):
+            found.update(self._children.get(i, ()))
+        return found
+
+    def active_services(self, day: int) -> bytearray:
+        """1 for each service running on a date (ordinal), from calendar.txt and calendar_dates.txt."""
+        with self._lock:
+            active = self._active.get(day)
+        if active is not None:
+            return active
+        bit = 1 << date.fromordinal(day).weekday()
+        start, end, days = self.svc_start, self.svc_end, self.svc_days
+        active = bytearray(start[s] <= day <= end[s] and bool(days[s] & bit) for s in range(len(start)))
+        lo = bisect.bisect_left(self.exc_date, day)
+        hi = bisect.bisect_right(self.exc_date, day)
+        for j in range(lo, hi):
+            active[self.exc_service[j]] = self.exc_type[j] == 1
+        with self._lock:
+            if len(self._active) > 64:
+                self._active.clear()
+            self._active[day] = active
+        return active
+
+    def _scan(self, sources: set, targets: set, day: int, start: int):
+        """Earliest-arrival connection scan leaving at or after ``start`` (seconds after the day's midnight).
+
+        Returns legs as (boarding connection, alighting connection, day offset), or None.
+        """
+        dep, arr_time, frm, to, trip_of = self.conn_dep, self.conn_arr, self.conn_from, self.conn_to, self.conn_trip
+        service_of, self_transfer = self.trip_service, self.self_transfer
+        foot_start, foot_to, foot_secs = self.foot_start, self.foot_to, self.foot_secs
+        m, n = len(dep), len(self.stops)
+
+        ready = [_INF] * n      # earliest time a vehicle can be boarded at each stop
+        arrival = [_INF] * n    # earliest vehicle arrival at each stop
+        ready_via = {}          # stop -> None (start), itself (arrived by vehicle) or the stop walked from
+        in_leg = {}             # stop -> (boarding connection, alighting connection, day offset)
+        for s in sources:
+            ready[s], ready_via[s] = start, None
+            for j in range(foot_start[s], foot_start[s + 1]):
+                if foot_to[j] not in sources:
+                    ready[foot_to[j]], ready_via[foot_to[j]] = start + foot_secs[j], None
+
+        # One stream of connections per service day: the previous day's after-midnight trips, then onward.
+        # Each is [next departure, position, day offset, active services, trips boarded].
+        horizon = start + TRANSIT_MAX_HOURS * 3600
+        n_trips = len(self.trips)
+        streams = []
+        for k in range(-1, horizon // _DAY + 1):
+            active = self.active_services(day + k)
+            pos = bisect.bisect_left(dep, start - k * _DAY)
+            if pos < m and any(active):
+                streams.append([dep[pos] + k * _DAY, pos, k, active, bytearray(n_trips)])
+
+        board_at = {}   # (trip, day offset) -> boarding connection
+        best, best_stop = _INF, None
+        stop_at = horizon + 1
+        while streams:
+            # Scan the earliest stream until it passes the next one's head
+            streams.sort(key=lambda s: s[0])
+            if streams[0][0] >= stop_at:
+                break
+            stream = streams[0]
+            _, first, k, active, on_trip = stream
+            offset = k * _DAY
+            until = streams[1][0] if len(streams) > 1 else _INF
+            pos = m
+            for i in range(first, m):
+                t = dep[i] + offset
+                if t > until or t >= stop_at:
+                    pos = i
+                    break
+                trip = trip_of[i]
+                if not on_trip[trip]:
+                    if ready[frm[i]] > t or not active[service_of[trip]]:
+                        continue
+                    on_trip[trip] = 1
+                    board_at[trip, k] = i
+                a, stop = arr_time[i] + offset, to[i]
+                if a >= arrival[stop]:
+                    continue
+                arrival[stop] = a
+                in_leg[stop] = (board_at[trip, k], i, k)
+                if stop in targets:
+                    if a < best:
+                        best, best_stop = a, stop
+                        stop_at = min(best, stop_at)
+                    continue
+                change = self_transfer[stop] if self_transfer[stop] >= 0 else TRANSIT_MIN_TRANSFER
+                if a + change < ready[stop]:
+                    ready[stop], ready_via[stop] = a + change, stop
+                for j in range(foot_start[stop], foot_start[stop + 1]):
+                    w = foot_to[j]
+                    if a + foot_secs[j] < ready[w]:
+                        ready[w], ready_via[w] = a + foot_secs[j], stop
+            if pos >= m:
+                streams.pop(0)
+            else:
+                stream[0], stream[1] = dep[pos] + offset, pos
+
+        if best_stop is None:
+            return None
+        legs, stop = [], best_stop
+        for _ in range(64):
+            board, alight, k = in_leg[stop]
+            legs.append((board, alight, k))
+            stop = ready_via.get(frm[board])
+            if stop is None:
+                break
+        return legs[::-1]
+
+    def journeys(self, sources: set, targets: set, day: int, limit: int = TRANSIT_MAX_OPTIONS) -> list:
+        """Non-dominated journeys departing on ``day``: each later option also arrives later."""
+        options, start = [], 0
+        for _ in range(limit * 4):
+            legs = self._scan(sources, targets, day, start)
+            if legs is None:
+                break
+            depart = self.conn_dep[legs[0][0]] + legs[0][2] * _DAY
+            arrive = self.conn_arr[legs[-1][1]] + legs[-1][2] * _DAY
+            if depart >= _DAY:
+                break
+            if options and options[-1][1] == arrive:
+                options[-1] = (depart, arrive, legs)  # same arrival, later departure: strictly better
+            elif len(options) < limit:
+                options.append((depart, arrive, legs))
+            else:
+                break
+            start = depart + 1
+        return [self.describe(*option) for option in options]
+
+    def _fare(self, route: int, origin: int, destination: int):
+        rules = self.fares.get(str(route)) or self.feed_fares.get(str(self.routes[route][4])) or ()
+        origin_zone, destination_zone = self.stops[origin][2], self.stops[destination][2]
+        for from_zone, to_zone, price, currency in rules:
+            if from_zone in ('', origin_zone) and to_zone in ('', destination_zone):
+                return price, currency
+        return None, None
+
+    def describe(self, depart: int, arrive: int, legs: list) -> TransitOption:
+        modes, operators, parts = [], [], []
+        total, currencies = 0.0, set()
+        for board, alight, k in legs:
+            trip = self.conn_trip[board]
+            route = self.trip_route[trip]
+            short, long, agency, route_type, _ = self.routes[route]
+            number, headsign = self.trips[trip]
+            mode = _mode(route_type)
+            operator = self.agencies[agency] if agency is not None else ''
+            if mode not in modes:
+                modes.append(mode)
+            if operator and operator not in operators:
+                operators.append(operator)
+            origin, destination = self.conn_from[board], self.conn_to[alight]
+            price, currency = self._fare(route, origin, destination)
+            if total is not None:
+                total = total + price if price is not None else None
+                currencies.add(currency)
+            service = " ".join(p for p in (number, long or short or headsign) if p) or mode
+            parts.append(f"{service}: {self.stops[origin][0]} {_clock(self.conn_dep[board] + k * _DAY)}"
+                         f" → {self.stops[destination][0]} {_clock(self.conn_arr[alight] + k * _DAY)}")
+        minutes = (arrive - depart) // 60
+        one_currency = total is not None and len(currencies) == 1
+        return TransitOption(
+            depart=_clock(depart),
+            arrive=_clock(arrive),
+            duration=f"{minutes // 60}h {minutes % 60:02d}m",
+            changes=len(legs) - 1,
+            mode="+".join(modes),
+            operator=", ".join(operators),
+            fare=round(total, 2) if one_currency else None,
+            currency=next(iter(currencies)) if one_currency else None,
+            legs="; ".join(parts)
+        )
+
+
+def _clock(seconds: int) -> str:
+    """Seconds after the travel date's midnight as HH:MM, with +Nd for later days."""
+    days, rest = divmod(seconds, _DAY)
+    text = f"{rest // 3600:02d}:{rest % 3600 // 60:02d}"
+    return f"{text} +{days}d" if days else text
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_transit_index():
+    """Singleton accessor; None without TRANSIT_FEEDS. Builds (or rebuilds) the index file when stale."""
+    global _index
+    if _index is None and TRANSIT_FEEDS:
+        with _index_lock:
+            if _index is None:
+                index = None
+                try:
+                    index = TransitIndex(TRANSIT_INDEX)
+                    if index.header['fingerprint'] != _fingerprint(TRANSIT_FEEDS):
+                        index = None
+                except (OSError, ValueError):
+                    index = None
+                if index is None:
+                    counts = build(TRANSIT_FEEDS, TRANSIT_INDEX)
+                    print(f"[*] Built transit index {TRANSIT_INDEX}: {counts}")
+                    index = TransitIndex(TRANSIT_INDEX)
+                _index = index
+    return _index
+
+
+def transit_stats() -> dict:
+    """Index size, or {} before it is loaded."""
+    return _index.stats() if _index is not None else {}
+
+
+def find_journeys(origin: str, destination: str, departure_date: str, limit: int = TRANSIT_MAX_OPTIONS) -> dict:
+    """Bus/train options between two places on a date (YYYY-MM-DD), as a TransitOption table."""
+    index = get_transit_index()
+    if index is None:
+        return error("No ground transport timetables are loaded (TRANSIT_FEEDS is not set).")
+    try:
+        day = date.fromisoformat(departure_date).toordinal()
+    except ValueError:
+        return error(f"Invalid date '{departure_date}'. Use YYYY-MM-DD.")
+    sources, targets = index.stops_for(origin), index.stops_for(destination)
+    if not sources or not targets:
+        missing = origin if not sources else destination
+        return error(f"No bus or train station found for '{missing}' in the timetables.")
+    options = index.journeys(sources, targets, day, limit)
+    if not options:
+        return error(f"No bus or train connections from {origin} to {destination} on {departure_date}.",
+                     origin=origin, destination=destination)
+    return table(TransitOption, options, origin=origin, destination=destination, date=departure_date)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compile GTFS feeds into a transit index, or query one.")
+    parser.add_argument('feeds', nargs='*', default=TRANSIT_FEEDS, help="GTFS directories or .zip files")
+    parser.add_argument('--out', default=TRANSIT_INDEX, help="Index file to write")
+    parser.add_argument('--query', nargs=3, metavar=('ORIGIN', 'DESTINATION', 'DATE'),
+                        help="Query the index at --out instead of building it")
+    args = parser.parse_args()
+    if args.query:
+        index = _index = TransitIndex(args.out)
+        print(json.dumps(find_journeys(*args.query), indent=2, ensure_ascii=False))
+    elif not args.feeds:
+        parser.error("no feeds given (pass them or set TRANSIT_FEEDS)")
+    else:
+        print(json.dumps(build(args.feeds, args.out)))
@@ -1,47 +1,68 @@
 """
-Ground Transportation Agent - Uses Gemini's Google Search grounding for REAL data.
-Note: There's no reliable free API for Indian bus/train data. 
-For production, integrate: Rome2Rio API, 12Go API, or IRCTC API (trains).
+Ground Transportation Agent - buses and trains from local GTFS timetables.
+
+Journeys are planned by agents/transit.py over the feeds listed in
+TRANSIT_FEEDS (e.g. an IRCTC/Indian Railways export and state bus operators'
+feeds), with no model call or network round trip. Results are cached per
+route and date.
 """
-from google.adk.agents import Agent
+import asyncio
+import functools
+import os
+from agents.cache import TTLCache
+from agents.places import normalize
+from agents.transit import find_journeys
+
+# Timetables only change when the feeds are rebuilt
+TRANSIT_CACHE_TTL = int(os.getenv('TRANSIT_CACHE_TTL', 3600))
+transit_cache = TTLCache(maxsize=1024, name="transit")
 
 
-def search_ground_transport(origin_city: str, destination_city: str, departure_date: str) -> str:
+async def search_ground_transport(origin_city: str, destination_city: str, departure_date: str) -> dict:
     """
-    Returns a prompt for AI to search for real bus/train data online.
-    
+    Finds bus and train journeys (with changes) between two places from the loaded timetables.
+
     Args:
-        origin_city: Departure city name.
-        destination_city: Destination city name.
+        origin_city: Departure city or station name.
+        destination_city: Destination city or station name.
         departure_date: Date in YYYY-MM-DD format.
-    
+
     Returns:
-        Instruction for AI to search online for real transportation data.
+        Rows of depart, arrive, duration, changes, mode, operator, fare, currency and legs,
+        ordered by departure; later options arrive later.
     """
-    return (
-        f"USE GOOGLE SEARCH NOW to find REAL bus and train options from {origin_city} to {destination_city} "
-        f"departing on or around {departure_date}. "
-        f"Search these sites: RedBus.in, MakeMyTrip.com, IRCTC.co.in (trains), 12Go.asia, Rome2rio.com. "
-        f"Extract ACTUAL prices, operators, timings, and durations from the search results. "
-        f"Format as: Type | Operator | Price | Duration | Departure Time. "
-        f"ONLY return data you found online - NO made-up information!"
-    )
+    key = (normalize(origin_city), normalize(destination_city), departure_date)
+    cached = transit_cache.get(key)
+    if cached is not None:
+        return cached
+    # The first query may load (or build) the index; keep it off the event loop
+    result = await asyncio.to_thread(find_journeys, origin_city, destination_city, departure_date)
+    if 'error' not in result:
+        transit_cache.set(key, result, TRANSIT_CACHE_TTL)
+    return result
 
 
-# Create the Ground Transport Agent  
-transport_agent = Agent(
-    name="transport_agent",
-    model="gemini-2.0-flash-lite-preview-02-05",  # Has Google Search grounding
-    tools=[search_ground_transport],
-    instruction=(
-        "You search for REAL bus and train data using Google Search. "
-        "When search_ground_transport is called: "
-        "1. Use your Google Search capability to find current information "
-        "2. Look at RedBus.in, MakeMyTrip, IRCTC, 12Go, Rome2rio "
-        "3. Extract ONLY real data from search results "
-        "4. Present options with: Operator, Price (in INR), Duration, Timings "
-        "5. If no results found, say 'Unable to find current data, check [websites]' "
-        "\n"
-        "NEVER make up data. Only use what you find via search."
+@functools.cache
+def _build_agent():
+    from google.adk.agents import Agent
+    return Agent(
+        name="transport_agent",
+        model="gemini-2.0-flash-lite-preview-02-05",
+        tools=[search_ground_transport],
+        instruction=(
+            "You find bus and train options with search_ground_transport. "
+            "Present each option with: Departure, Arrival, Duration, Changes, Operator, Fare. "
+            "Fares are per person in the listed currency; say 'fare not listed' when missing. "
+            "If no connections are found, suggest checking RedBus.in or IRCTC.co.in. "
+            "\n"
+            "NEVER make up data. Only use what the tool returns."
+        )
     )
-)
+
+
+def __getattr__(name):
+    # transport_agent is built on first access; the root agent calls these tools directly
+    if name == 'transport_agent':
+        return _build_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
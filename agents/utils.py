@@ -1,22 +1,425 @@
+"""
+Amadeus access layer.
+
+The amadeus SDK is blocking, so its calls run on a dedicated, bounded thread
+pool instead of the event loop. Each call borrows a client from a pool sized to
+that thread pool, so no two threads share a client. The clients share one OAuth
+token, which a background thread renews before it expires, so no user request
+waits for a token refresh. HTTP goes through keep-alive connections (one per
+host and thread) instead of a new TLS handshake per call. Latency and error
+counts are kept per endpoint. With CASSETTE_MODE set, HTTP exchanges are
+recorded or replayed by agents.cassette.
+"""
+import asyncio
+import http.client
+import json
 import os
-from amadeus import Client
+import threading
+import time
+import urllib.parse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from dotenv import load_dotenv
+from agents.cassette import get_cassette, replaying
 
 load_dotenv()
 
-_amadeus_client = None
-
-def get_amadeus_client() -> Client:
-    """Singleton accessor for Amadeus client to prevent multiple authentications."""
-    global _amadeus_client
-    if _amadeus_client:
-        return _amadeus_client
-        
-    client_id = os.getenv('AMADEUS_CLIENT_ID')
-    client_secret = os.getenv('AMADEUS_CLIENT_SECRET')
-    
-    if not client_id or not client_secret:
-        raise ValueError("❌ Amadeus credentials missing! Check your .env file.")
-
-    _amadeus_client = Client(client_id=client_id, client_secret=client_secret)
-    return _amadeus_client
\ No newline at end of file
+# Extra calls queue until a thread (and with it a client) is free.
+AMADEUS_MAX_CONCURRENCY = int(os.getenv('AMADEUS_MAX_CONCURRENCY', 8))
+AMADEUS_TIMEOUT = float(os.getenv('AMADEUS_TIMEOUT', 20))
+# Renew the shared token this many seconds before it expires (tokens last ~30 minutes)
+AMADEUS_TOKEN_REFRESH_MARGIN = float(os.getenv('AMADEUS_TOKEN_REFRESH_MARGIN', 300))
+
+_amadeus_executor = ThreadPoolExecutor(
+    max_workers=AMADEUS_MAX_CONCURRENCY,
+    thread_name_prefix="amadeus"
+)
+
+
+class _Response:
+    """A fully read HTTP response with the urlopen-style accessors the SDK uses."""
+
+    def __init__(self, status: int, reason: str, headers, body: bytes):
+        self.status = self.code = status
+        self.reason = reason
+        self.headers = headers
+        self._body = body
+
+    @classmethod
+    def from_record(cls, data: dict):
+        headers = http.client.HTTPMessage()
+        for name, value in data['headers'].items():
+            headers[name] = value
+        return cls(data['status'], data['reason'], headers, data['body'].encode())
+
+    def to_record(self, request) -> dict:
+        body = self._body.decode('utf-8', 'replace')
+        if request.data is not None and self.status == 200 and _is_token_request(request):
+            # Don't write live tokens to disk; any token does for replay
+            token = json.loads(body)
+            token['access_token'] = 'cassette'
+            body = json.dumps(token)
+        return {
+            'status': self.status,
+            'reason': self.reason,
+            'headers': {'Content-Type': self.headers.get('Content-Type', 'application/json')},
+            'body': body,
+        }
+
+    def getcode(self):
+        return self.status
+
+    def read(self, *args):
+        return self._body
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+    def getheaders(self):
+        return list(self.headers.items())
+
+    def info(self):
+        return self.headers
+
+
+class KeepAliveOpener:
+    """``urlopen`` replacement for the SDK's ``http`` option that keeps one connection per host and thread."""
+
+    def __init__(self, timeout: float = AMADEUS_TIMEOUT):
+        self.timeout = timeout
+        self._local = threading.local()
+        self.connections_opened = 0
+
+    def __call__(self, request, *args, **kwargs):
+        cassette = get_cassette()
+        if cassette is None:
+            return self._send(request)
+        live = []
+
+        def fetch():
+            live.append(self._send(request))
+            return live[0].to_record(request)
+
+        recorded = cassette.call_sync('amadeus', _cassette_request(request), fetch)
+        # While recording, the SDK gets the live response (the recording has its token redacted)
+        return live[0] if live else _Response.from_record(recorded)
+
+    def _send(self, request):
+        url = urllib.parse.urlsplit(request.full_url)
+        path = url.path + (f"?{url.query}" if url.query else "")
+        headers = dict(request.header_items())
+        if request.data is not None and not any(h.lower() == 'content-type' for h in headers):
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'  # as urlopen would add
+        connections = self._local.__dict__.setdefault('connections', {})
+        key = (url.scheme, url.netloc)
+
+        for attempt in (1, 2):
+            conn = connections.get(key)
+            reused = conn is not None
+            if conn is None:
+                cls = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+                conn = connections[key] = cls(url.netloc, timeout=self.timeout)
+                self.connections_opened += 1
+            try:
+                conn.request(request.get_method(), path, body=request.data, headers=headers)
+                response = conn.getresponse()
+                body = response.read()  # drained, so the connection can be reused
+                if response.will_close:
+                    conn.close()
+                    del connections[key]
+                return _Response(response.status, response.reason, response.headers, body)
+            except (http.client.HTTPException, ConnectionError):
+                conn.close()
+                connections.pop(key, None)
+                # The server may have dropped an idle connection; retry once on a fresh one
+                if not reused or attempt == 2:
+                    raise
+            except Exception:
+                conn.close()
+                connections.pop(key, None)
+                raise
+
+
+def _is_token_request(request) -> bool:
+    return urllib.parse.urlsplit(request.full_url).path.endswith('/oauth2/token')
+
+
+def _cassette_request(request) -> dict:
+    """A request's recording key: method, path and sorted query, but no credentials."""
+    url = urllib.parse.urlsplit(request.full_url)
+    key = {
+        'method': request.get_method(),
+        'path': url.path,
+        'query': sorted(urllib.parse.parse_qsl(url.query, keep_blank_values=True)),
+    }
+    # The token request's body is the client credentials; other bodies are part of the request
+    if request.data is not None and not _is_token_request(request):
+        data = request.data
+        key['body'] = data.decode('utf-8', 'replace') if isinstance(data, bytes) else str(data)
+    return key
+
+
+# The SDK (tested with amadeus 12.0) keeps its token in an AccessToken object
+# (access_token, expires_at), created on a client's first request and refreshed
+# inline when it is about to expire. These are SDK internals: if a client doesn't
+# expose them, the pool leaves token handling to the SDK instead of sharing one.
+def _token_holder(client):
+    """The client's AccessToken, or None if this SDK version keeps its token elsewhere."""
+    holder = getattr(client, 'access_token', None)
+    if holder is None:
+        create = getattr(client, '_HTTP__access_token', None)
+        holder = create() if callable(create) else None
+    if holder is None or not callable(getattr(holder, '_bearer_token', None)) \
+            or not hasattr(holder, 'access_token') or not hasattr(holder, 'expires_at'):
+        return None
+    return holder
+
+
+def _fetch_token(client):
+    """A new (access token, expires_at), or None when the SDK's token can't be shared."""
+    holder = _token_holder(client)
+    if holder is None:
+        return None
+    holder.expires_at = 0  # force a refresh
+    holder._bearer_token()
+    return holder.access_token, holder.expires_at
+
+
+def _set_token(client, token: tuple):
+    holder = _token_holder(client)
+    if holder is not None:
+        holder.access_token, holder.expires_at = token
+
+
+class AmadeusPool:
+    """Lock-protected pool of SDK clients sharing one proactively refreshed token."""
+
+    def __init__(self, client_id: str, client_secret: str, size: int = AMADEUS_MAX_CONCURRENCY,
+                 refresh_margin: float = AMADEUS_TOKEN_REFRESH_MARGIN, **options):
+        self.size = size
+        self.refresh_margin = refresh_margin
+        self.opener = KeepAliveOpener()
+        self._credentials = {'client_id': client_id, 'client_secret': client_secret}
+        self._options = options
+        self._idle = []
+        self._created = 0
+        self._available = threading.Condition()
+        self._token = None          # (access token, expires_at)
+        self.shared_token = True    # False once the SDK turned out not to expose its token
+        self._auth_client = None
+        self._auth_lock = threading.Lock()
+        self._refresher = None
+        self._stopped = threading.Event()
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self._stats_lock = threading.Lock()
+        self._endpoints = {}        # endpoint -> counters and recent latencies
+
+    def _new_client(self):
+        # Imported here so a process that never searches flights or hotels doesn't load the SDK
+        from amadeus import Client
+        return Client(**self._credentials, http=self.opener, **self._options)
+
+    @contextmanager
+    def client(self):
+        """Borrow a client for one call; blocks while all ``size`` clients are in use."""
+        with self._available:
+            while not self._idle and self._created >= self.size:
+                self._available.wait()
+            if self._idle:
+                client = self._idle.pop()
+            else:
+                self._created += 1
+                client = None
+        if client is None:
+            try:
+                client = self._new_client()
+            except BaseException:
+                with self._available:
+                    self._created -= 1
+                    self._available.notify()
+                raise
+        if self._token:
+            _set_token(client, self._token)
+        try:
+            yield client
+        finally:
+            with self._available:
+                self._idle.append(client)
+                self._available.notify()
+
+    def authenticate(self, force: bool = True):
+        """Fetch a new token and hand it to every client; starts the background refresher.
+
+        With ``force=False`` nothing happens if a token is already held. If the SDK
+        doesn't expose its token, each client authenticates itself as the SDK does
+        by default, and no refresher runs.
+        """
+        with self._auth_lock:
+            if not self.shared_token or (not force and self._token is not None):
+                return
+            if self._auth_client is None:
+                self._auth_client = self._new_client()
+            started = time.perf_counter()
+            try:
+                token = _fetch_token(self._auth_client)
+            except Exception:
+                self._record('token', time.perf_counter() - started, failed=True)
+                raise
+            self._record('token', time.perf_counter() - started)
+            if token is None:
+                self.shared_token = False
+                print("[!] This amadeus SDK version doesn't expose its access token; "
+                      "clients will authenticate individually")
+                return
+            with self._available:
+                self._token = token
+                idle = list(self._idle)
+            # Borrowed clients pick the token up when they are next lent out
+            for client in idle:
+                _set_token(client, token)
+            self.refreshes += 1
+            self._ensure_refresher()
+
+    def _ensure_refresher(self):
+        if self._refresher is None or not self._refresher.is_alive():
+            self._refresher = threading.Thread(target=self._refresh_forever, name="amadeus-token", daemon=True)
+            self._refresher.start()
+
+    def _refresh_forever(self):
+        delay, failures = self._next_refresh(), 0
+        while not self._stopped.wait(delay):
+            try:
+                self.authenticate()
+                delay, failures = self._next_refresh(), 0
+            except Exception as e:
+                self.refresh_errors += 1
+                failures += 1
+                delay = min(60.0, 5.0 * 2 ** failures)
+                print(f"[!] Amadeus token refresh failed (retrying in {delay:.0f}s): {e}")
+
+    def _next_refresh(self) -> float:
+        expires_at = self._token[1] if self._token else 0
+        return max(expires_at - self.refresh_margin - time.time(), 5.0)
+
+    def call(self, endpoint: str, func):
+        """Run ``func(client)`` on a borrowed client, recording latency and errors under ``endpoint``."""
+        if self._token is None and self.shared_token:
+            self.authenticate(force=False)
+        with self.client() as client:
+            started = time.perf_counter()
+            try:
+                result = func(client)
+            except Exception:
+                self._record(endpoint, time.perf_counter() - started, failed=True)
+                raise
+            self._record(endpoint, time.perf_counter() - started)
+            return result
+
+    def _record(self, endpoint: str, seconds: float, failed: bool = False):
+        with self._stats_lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'calls': 0, 'errors': 0, 'seconds': 0.0, 'recent': deque(maxlen=200)
+            })
+            stats['calls'] += 1
+            stats['errors'] += failed
+            stats['seconds'] += seconds
+            stats['recent'].append(seconds)
+
+    def stats(self) -> dict:
+        """Pool usage, token state and per-endpoint counters (p50/p95 over the last 200 calls)."""
+        def pct(values, p):
+            return round(values[min(len(values) - 1, int(p * len(values)))], 3) if values else 0.0
+
+        with self._stats_lock:
+            endpoints = {}
+            for name, s in self._endpoints.items():
+                recent = sorted(s['recent'])
+                endpoints[name] = {
+                    'calls': s['calls'],
+                    'errors': s['errors'],
+                    'seconds': round(s['seconds'], 3),
+                    'p50': pct(recent, 0.50),
+                    'p95': pct(recent, 0.95),
+                }
+        with self._available:
+            in_use = self._created - len(self._idle)
+            clients = self._created
+        return {
+            'clients': clients,
+            'in_use': in_use,
+            'size': self.size,
+            'connections_opened': self.opener.connections_opened,
+            'shared_token': self.shared_token,
+            'token_expires_in': round(self._token[1] - time.time()) if self._token else None,
+            'token_refreshes': self.refreshes,
+            'token_refresh_errors': self.refresh_errors,
+            'endpoints': endpoints,
+        }
+
+    def close(self):
+        self._stopped.set()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_amadeus_pool() -> AmadeusPool:
+    """Singleton accessor; credentials are checked (and the pool built) once, under a lock."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                client_id = os.getenv('AMADEUS_CLIENT_ID')
+                client_secret = os.getenv('AMADEUS_CLIENT_SECRET')
+                if replaying() and not (client_id and client_secret):
+                    # Recordings don't depend on the credentials
+                    client_id = client_secret = 'replay'
+
+                if not client_id or not client_secret:
+                    raise ValueError("❌ Amadeus credentials missing! Check your .env file.")
+
+                # AMADEUS_HOST points the SDK at another server (e.g. the offline benchmark fakes)
+                options = {}
+                if os.getenv('AMADEUS_HOST'):
+                    options['host'] = os.getenv('AMADEUS_HOST')
+                    options['port'] = int(os.getenv('AMADEUS_PORT', 443))
+                    options['ssl'] = os.getenv('AMADEUS_SSL', 'true').lower() != 'false'
+
+                _pool = AmadeusPool(client_id, client_secret, **options)
+    return _pool
+
+
+def amadeus_stats() -> dict:
+    """Pool statistics, or {} before the first Amadeus call."""
+    return _pool.stats() if _pool is not None else {}
+
+
+async def run_amadeus(func, *args, timeout: float = None, **kwargs):
+    """
+    Runs a blocking Amadeus SDK call on the bounded Amadeus thread pool.
+    Raises asyncio.TimeoutError if it takes longer than `timeout` seconds
+    (AMADEUS_TIMEOUT by default), including time spent waiting for a free thread.
+    """
+    loop = asyncio.get_running_loop()
+    return await asyncio.wait_for(
+        loop.run_in_executor(_amadeus_executor, partial(func, *args, **kwargs)),
+        timeout or AMADEUS_TIMEOUT
+    )
+
+
+async def amadeus_request(endpoint: str, func, timeout: float = None):
+    """
+    Runs ``func(client)`` with a pooled client on the Amadeus thread pool, e.g.
+    ``await amadeus_request('flight-offers', lambda c: c.shopping.flight_offers_search.get(...))``.
+    """
+    pool = get_amadeus_pool()
+    return await run_amadeus(pool.call, endpoint, func, timeout=timeout)
+
+
+async def authenticate_amadeus():
+    """Fetch the shared token now instead of on the first search (used by the warm-up)."""
+    await run_amadeus(get_amadeus_pool().authenticate)
@@ -1,71 +1,194 @@
+import asyncio
+import functools
 import os
+from array import array
+from collections import Counter
+from dataclasses import fields
+from datetime import datetime, timezone
 import aiohttp
-from google.adk.agents import Agent
+from agents.cache import TTLCache
+from agents.cassette import get_cassette, replaying
+from agents.http import get_http_session
+from agents.records import WeatherDay, WeatherNow, error, record, table
+from agents.singleflight import inflight
 
-async def get_weather(city: str, forecast_days: int = 1) -> str:
+OPENWEATHER_BASE_URL = os.getenv('OPENWEATHER_BASE_URL', 'https://api.openweathermap.org/data/2.5')
+
+# Current conditions change quickly; forecasts are only refreshed every few hours upstream.
+WEATHER_CURRENT_TTL = int(os.getenv('WEATHER_CURRENT_TTL', 600))
+WEATHER_FORECAST_TTL = int(os.getenv('WEATHER_FORECAST_TTL', 3600))
+
+weather_cache = TTLCache(maxsize=int(os.getenv('WEATHER_CACHE_SIZE', 512)), name="weather")
+
+# Upper bound on cities per get_weather_many call
+WEATHER_MANY_MAX = int(os.getenv('WEATHER_MANY_MAX', 10))
+
+
+def _cache_key(city: str, forecast_days: int) -> tuple:
+    """Normalize city name and day count so equivalent requests share an entry."""
+    days = 1 if forecast_days <= 1 else min(forecast_days, 5)
+    return (" ".join(city.lower().split()), days)
+
+
+async def get_weather(city: str, forecast_days: int = 1) -> dict:
     """
-    Fetches weather for a city. 
-    If forecast_days > 1, returns a multi-day forecast.
+    Fetches weather for a city (temperatures in °C).
+    If forecast_days > 1, returns a daily forecast as rows of date, low, high, mean,
+    pop (chance of precipitation, %) and desc (dominant condition).
     Max forecast_days is 5 (free tier limit).
     """
-    api_key = os.getenv('OPENWEATHER_API_KEY')
+    # Replayed recordings don't need a real key
+    api_key = os.getenv('OPENWEATHER_API_KEY') or (replaying() and 'replay')
     if not api_key:
-        return "Error: OpenWeatherMap API key is missing."
+        return error("OpenWeatherMap API key is missing.")
+
+    key = _cache_key(city, forecast_days)
+    cached = weather_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Concurrent lookups for the same city/days share one upstream request
+    return await inflight.do(("weather",) + key, lambda: _fetch_weather(city, forecast_days, api_key, key))
 
+
+async def _openweather(endpoint: str, city: str, api_key: str) -> tuple:
+    """(status, JSON body or None) of one OpenWeather call, through the cassette when CASSETTE_MODE is set."""
+    async def fetch():
+        params = {'q': city, 'appid': api_key, 'units': 'metric'}
+        async with get_http_session().get(f"{OPENWEATHER_BASE_URL}/{endpoint}", params=params) as resp:
+            return {'status': resp.status, 'body': await resp.json() if resp.status == 200 else None}
+
+    cassette = get_cassette()
+    if cassette is None:
+        response = await fetch()
+    else:
+        # The API key is not part of the recording's key
+        response = await cassette.call('openweather', {'endpoint': endpoint, 'q': city, 'units': 'metric'}, fetch)
+    return response['status'], response['body']
+
+
+async def _fetch_weather(city: str, forecast_days: int, api_key: str, key: tuple) -> dict:
     try:
-        async with aiohttp.ClientSession() as session:
-            if forecast_days <= 1:
-                # Current weather
-                url = "https://api.openweathermap.org/data/2.5/weather"
-                params = {'q': city, 'appid': api_key, 'units': 'metric'}
-                
-                async with session.get(url, params=params) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        desc = data['weather'][0]['description']
-                        temp = data['main']['temp']
-                        feels = data['main']['feels_like']
-                        humidity = data['main']['humidity']
-                        return f"Current weather in {city}: {temp}°C (feels like {feels}°C), {desc}, humidity {humidity}%"
-                    return f"Could not fetch weather for {city}. (Status: {resp.status})"
-            else:
-                # 5-day forecast (3-hour intervals)
-                url = "https://api.openweathermap.org/data/2.5/forecast"
-                params = {'q': city, 'appid': api_key, 'units': 'metric'}
-                
-                async with session.get(url, params=params) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        forecasts = []
-                        days_seen = set()
-                        
-                        for item in data['list']:
-                            date = item['dt_txt'].split(' ')[0]
-                            if date not in days_seen and len(days_seen) < min(forecast_days, 5):
-                                days_seen.add(date)
-                                temp = item['main']['temp']
-                                desc = item['weather'][0]['description']
-                                forecasts.append(f"{date}: {temp}°C, {desc}")
-                        
-                        forecast_text = "\n".join(forecasts)
-                        return f"Weather forecast for {city}:\n{forecast_text}"
-                    return f"Could not fetch forecast for {city}. (Status: {resp.status})"
-                
+        if forecast_days <= 1:
+            # Current weather
+            status, data = await _openweather('weather', city, api_key)
+            if status == 200:
+                now = WeatherNow(
+                    temp=data['main']['temp'],
+                    feels_like=data['main']['feels_like'],
+                    desc=data['weather'][0]['description'],
+                    humidity=data['main']['humidity']
+                )
+                result = record(now, city=city)
+                weather_cache.set(key, result, WEATHER_CURRENT_TTL)
+                return result
+            return error(f"Could not fetch weather (status {status}).", city=city)
+        else:
+            # 5-day forecast (3-hour intervals)
+            status, data = await _openweather('forecast', city, api_key)
+            if status == 200:
+                forecasts = aggregate_forecast(data, min(forecast_days, 5))
+                result = table(WeatherDay, forecasts, city=city)
+                weather_cache.set(key, result, WEATHER_FORECAST_TTL)
+                return result
+            return error(f"Could not fetch forecast (status {status}).", city=city)
+
     except aiohttp.ClientError as e:
-        return f"Weather API connection issue: {str(e)}"
+        return error(f"Weather API connection issue: {str(e)}", city=city)
     except Exception as e:
-        return f"An unexpected error occurred: {str(e)}"
-
-
-# Create Weather Agent
-weather_agent = Agent(
-    name="weather_agent",
-    model="gemini-1.5-flash",
-    tools=[get_weather],
-    instruction=(
-        "You provide weather information for travel destinations. "
-        "Use the get_weather tool to fetch real-time weather data. "
-        "For multi-day trips, use forecast_days parameter (max 5). "
-        "Present the information clearly with temperature and conditions."
+        return error(f"An unexpected error occurred: {str(e)}", city=city)
+
+
+def aggregate_forecast(data: dict, days: int) -> list:
+    """
+    Reduce OpenWeather's 3-hourly /forecast series to one WeatherDay per local date.
+
+    The slots are unpacked once into flat columns (temperature, precipitation
+    probability, condition); each day is then a contiguous slice of those arrays,
+    reduced with min/max/sum rather than walked item by item.
+    """
+    items = data.get('list') or []
+    offset = (data.get('city') or {}).get('timezone', 0)  # seconds east of UTC
+
+    temps = array('d', (item['main']['temp'] for item in items))
+    pops = array('d', (item.get('pop', 0.0) for item in items))
+    mains = [item['weather'][0]['main'] for item in items]
+    descs = [item['weather'][0]['description'] for item in items]
+    dates = [datetime.fromtimestamp(item['dt'] + offset, timezone.utc).date().isoformat() for item in items]
+
+    # Slots are time-ordered, so each date is one run: [starts[i], starts[i + 1])
+    starts = [i for i in range(len(dates)) if i == 0 or dates[i] != dates[i - 1]] + [len(dates)]
+
+    result = []
+    for lo, hi in list(zip(starts, starts[1:]))[:days]:
+        day_temps = temps[lo:hi]
+        # Dominant condition group (Rain, Clouds, ...), described by its most common wording
+        main = Counter(mains[lo:hi]).most_common(1)[0][0]
+        desc = Counter(d for m, d in zip(mains[lo:hi], descs[lo:hi]) if m == main).most_common(1)[0][0]
+        result.append(WeatherDay(
+            date=dates[lo],
+            low=round(min(day_temps), 1),
+            high=round(max(day_temps), 1),
+            mean=round(sum(day_temps) / len(day_temps), 1),
+            pop=round(max(pops[lo:hi]) * 100),
+            desc=desc
+        ))
+    return result
+
+
+async def get_weather_many(cities: list[str], forecast_days: int = 1) -> dict:
+    """
+    Fetches weather for several cities at once (for multi-city itineraries).
+    Returns one table: rows of city + current conditions, or city + daily forecast
+    (date, low, high, mean, pop, desc) when forecast_days > 1. Max 10 cities, 5 days.
+    Args:
+        cities: City names, e.g. ["Delhi", "Jaipur", "Agra"].
+        forecast_days: 1 for current weather, up to 5 for a daily forecast.
+    """
+    unique = list(dict.fromkeys(c.strip() for c in cities if c and c.strip()))[:WEATHER_MANY_MAX]
+    if not unique:
+        return error("No cities given.")
+
+    # Each lookup goes through the cache, in-flight dedup and the shared HTTP session
+    results = await asyncio.gather(*(get_weather(city, forecast_days) for city in unique))
+
+    failed = {city: r['error'] for city, r in zip(unique, results) if 'error' in r}
+    rows = []
+    for city, r in zip(unique, results):
+        if 'error' in r:
+            continue
+        if 'rows' in r:
+            rows.extend([city] + row for row in r['rows'])
+        else:
+            rows.append([city] + [r.get(f.name) for f in fields(WeatherNow)])
+
+    cls = WeatherDay if forecast_days > 1 else WeatherNow
+    payload = {'cols': ['city'] + [f.name for f in fields(cls)], 'rows': rows}
+    if failed:
+        payload['errors'] = failed
+    return payload
+
+
+@functools.cache
+def _build_agent():
+    from google.adk.agents import Agent
+    return Agent(
+        name="weather_agent",
+        model="gemini-1.5-flash",
+        tools=[get_weather, get_weather_many],
+        instruction=(
+            "You provide weather information for travel destinations. "
+            "Use the get_weather tool to fetch real-time weather data. "
+            "For multi-day trips, use forecast_days parameter (max 5). "
+            "For several cities, use get_weather_many with all of them in one call. "
+            "Present the information clearly with temperature and conditions."
+        )
     )
-)
\ No newline at end of file
+
+
+def __getattr__(name):
+    # weather_agent is built on first access; the root agent calls these tools directly
+    if name == 'weather_agent':
+        return _build_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
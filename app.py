@@ -1,15 +1,32 @@
 """
 Flask Web Server for AI Travel Planner with REST API endpoints.
 """
+from server import startup  # first, so STARTUP_REPORT=1 can time every import below
 import asyncio
+import hmac
+import json
+import random
+import threading
+import time
 import uuid
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session
 from flask_cors import CORS
 from dotenv import load_dotenv
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.genai import types
-from agents.root import root_agent
+from agents.cache import cache_stats
+from agents.cassette import cassette_stats, install as install_cassette, replaying
+from agents.http import close_http_session
+from agents.singleflight import inflight
+from agents.transit import transit_stats
+from agents.utils import amadeus_stats
+from server.admission import AdmissionController, Overloaded, is_rate_limit, retry_after_seconds
+from server.batch import parse_items, run_batch, summarize
+from server.jobs import JobFailed, JobManager, JobRejected
+from server.loop import iterate_sync, on_shutdown, run_sync
+from server.plan_cache import PlanCache
+from server.router import Route, Router
+from server.sessions import LazySessionService, SessionStore
+from server.tracing import instrument, llm_usage, record_agent_error, record_event, trace, upstream_status
+from server import metrics
 import os
 from functools import wraps
 
@@ -23,58 +40,223 @@ app.config['TEMPLATES_AUTO_RELOAD'] = True  # Force template reload
 app.config['DEBUG'] = True  # Enable debug mode
 CORS(app)
 
-# Initialize the runner with root agent
-session_service = InMemorySessionService()
-runner = Runner(
-    app_name="travel_planner",
-    agent=root_agent,
-    session_service=session_service
-)
+# SQLite-backed sessions when SESSION_DB is set; created (with the ADK) on first use
+session_service = LazySessionService()
 
-# Store active sessions
-active_sessions = {}
+# Runners per route (and with them the agents, their tools and the SDKs) are built on first use
+_runners = {}
+_runner_lock = threading.Lock()
+_ROUTE_AGENTS = {'plan': 'root_agent', 'followup': 'followup_agent'}
+# Name shared by both route agents (agents/root.py); lookup answers are authored under it
+AGENT_NAME = "travel_planner_root"
+
+# Store active sessions (bounded: idle TTL, LRU cap, per-session history budget)
+session_store = SessionStore(session_service, app_name="travel_planner")
+
+# First-turn plan responses, reused for equivalent requests (opt-in: PLAN_CACHE=1)
+plan_cache = PlanCache(session_service, app_name="travel_planner")
+
+# Per-turn routing to the planner, the light follow-up agent or a direct tool call (opt-in: ROUTING=1)
+router = Router(session_service, app_name="travel_planner")
+
+# Gemini admission control (per-model RPM/TPM budgets, fair wait queue)
+admission = AdmissionController()
+# Fixed prompt overhead per turn (system instruction, tool schemas) for budget estimates
+TURN_TOKEN_ESTIMATE = int(os.getenv('TURN_TOKEN_ESTIMATE', 2000))
+
+# Background agent runs for /api/jobs (set JOBS_DB to share job state between workers)
+jobs = JobManager(db_path=os.getenv('JOBS_DB'))
+
+# Batch plan generation (/api/plan/batch) is only enabled when a token is configured
+BATCH_API_TOKEN = os.getenv('BATCH_API_TOKEN')
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 200))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 4))
+
+# Close pooled upstream connections when the worker's loop shuts down
+on_shutdown(close_http_session)
+
+
+def get_runner(route='plan'):
+    """The ADK runner for a route's agent, imported and built on its first turn (or by warm_up)."""
+    runner = _runners.get(route)
+    if runner is None:
+        with _runner_lock:
+            runner = _runners.get(route)
+            if runner is None:
+                with startup.timed(f'runner.{route}'):
+                    import agents
+                    from google.adk.runners import Runner
+                    runner = _runners[route] = Runner(
+                        app_name="travel_planner",
+                        agent=instrument(install_cassette(getattr(agents, _ROUTE_AGENTS[route]))),
+                        session_service=session_service.get()
+                    )
+    return runner
+
+
+def warm_up():
+    """Build the runners and warm upstream connections and caches before taking traffic."""
+    get_runner()
+    if router.enabled:
+        get_runner('followup')
+    try:
+        results = run_sync(startup.warm_up(), timeout=startup.WARMUP_TIMEOUT)
+    except Exception as e:
+        results = {'error': f"warm-up incomplete: {e}"}
+    print(f"[*] Warm-up: {results}")
+    return results
 
 
 def async_route(f):
-    """Decorator to handle async routes in Flask with proper cleanup."""
+    """Decorator to run async routes on the worker's shared event loop."""
     @wraps(f)
     def wrapper(*args, **kwargs):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            return loop.run_until_complete(f(*args, **kwargs))
-        finally:
-            # Cancel all pending tasks to avoid warnings
-            pending = asyncio.all_tasks(loop)
-            for task in pending:
-                task.cancel()
-            # Allow cancelled tasks to complete
-            if pending:
-                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
-            loop.close()
+        return run_sync(f(*args, **kwargs))
     return wrapper
 
 
-async def retry_async(func, max_retries=3, delay=1):
-    """Retry an async function with exponential backoff."""
+async def retry_async(func, max_retries=3, delay=1, retry_if=None, on_retry=None):
+    """Retry an async function with jittered exponential backoff.
+    
+    Only errors accepted by `retry_if` (all errors if None) are retried. A
+    server-suggested delay (e.g. Gemini's retryDelay on a 429) replaces the
+    backoff step; `on_retry(error, wait)` is called before each wait.
+    """
     last_error = None
     for attempt in range(max_retries):
         try:
             return await func()
         except Exception as e:
             last_error = e
+            if retry_if is not None and not retry_if(e):
+                raise
             if attempt < max_retries - 1:
-                await asyncio.sleep(delay * (2 ** attempt))
-                print(f"[!] Retry attempt {attempt + 1}/{max_retries} after error: {str(e)}")
+                wait = (retry_after_seconds(e) or delay * (2 ** attempt)) + random.uniform(0, delay)
+                if on_retry:
+                    on_retry(e, wait)
+                print(f"[!] Retry attempt {attempt + 1}/{max_retries} in {wait:.1f}s after error: {str(e)}")
+                await asyncio.sleep(wait)
     raise last_error
 
 
+async def run_turn(client_id, user_id, session_id, message, run_config=None):
+    """Run one agent turn under admission control, yielding the runner's events.
+    
+    The turn waits for the model's request/token budget first. Rate-limited
+    attempts are retried (honoring retry-after) as long as nothing has been
+    yielded yet; the budget is then corrected with the turn's actual usage.
+    An equivalent first turn answered recently is replayed from the plan cache
+    without admission or a model call. With ROUTING=1, follow-ups run on the
+    light follow-up agent and data lookups are answered by their tool alone.
+    """
+    started = time.perf_counter()
+    route = await router.route(user_id, session_id, message)
+    if route.name == 'lookup':
+        answered = await router.answer(route, AGENT_NAME, user_id, session_id, message)
+        if answered is not None:
+            for event in answered:
+                yield event
+            router.observe('lookup', time.perf_counter() - started, 0)
+            return
+        route = Route(route.fallback)
+    runner = get_runner(route.name)
+    model = runner.agent.model
+    plan_key = await plan_cache.key_for(model, user_id, session_id, message) if route.name == 'plan' else None
+    if plan_key is not None:
+        cached = await plan_cache.replay(plan_key, user_id, session_id, message)
+        if cached is not None:
+            for event in cached:
+                yield event
+            router.observe('plan_cache', time.perf_counter() - started, 0)
+            return
+    entry = session_store.get(client_id)
+    prompt_text = ''.join(p.text or '' for p in message.parts)
+    estimate = TURN_TOKEN_ESTIMATE + (entry['bytes'] if entry else 0) // 4 + len(prompt_text) // 4
+    
+    async def start():
+        ticket = await admission.admit(client_id, model, estimate)
+        kwargs = {'run_config': run_config} if run_config else {}
+        events = runner.run_async(user_id=user_id, session_id=session_id, new_message=message, **kwargs)
+        try:
+            first = await events.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except Exception:
+            ticket.settle(1, 0)
+            await events.aclose()
+            raise
+        return ticket, events, first
+    
+    ticket, events, first = await retry_async(
+        start,
+        retry_if=is_rate_limit,
+        on_retry=lambda e, wait: admission.penalize(model, wait)
+    )
+    produced = []
+    try:
+        if first is not None:
+            produced.append(first)
+            yield first
+            async for event in events:
+                produced.append(event)
+                yield event
+        if plan_key is not None:
+            plan_cache.store(plan_key, produced)
+    finally:
+        usage = llm_usage()
+        if usage:
+            ticket.settle(*usage)
+        router.observe(route.name, time.perf_counter() - started, usage[1] if usage else 0)
+
+
 @app.route('/')
 def index():
     """Serve the main web interface."""
     return render_template('index.html')
 
 
+async def get_or_create_session():
+    """Map the browser's client id to an ADK (user_id, session_id) pair, creating it if needed."""
+    client_id = session.get('client_id')
+    if not client_id:
+        client_id = str(uuid.uuid4())
+        session['client_id'] = client_id
+    
+    entry = session_store.get(client_id)
+    if entry is None and session.get('adk_session'):
+        # Another worker may have started this conversation in the shared session DB
+        entry = await session_store.adopt(client_id, *session['adk_session'])
+    if entry is None:
+        user_id = "user_" + str(uuid.uuid4())
+        session_id = "session_" + str(uuid.uuid4())
+        
+        # Create the session
+        entry = await session_store.create(client_id, user_id, session_id)
+        session['adk_session'] = [user_id, session_id]
+    
+    return client_id, entry['user_id'], entry['session_id']
+
+
+def user_content(text):
+    """A user message for the runner (google.genai is imported on the first turn)."""
+    from google.genai import types
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def friendly_error(error_msg):
+    """Turn an agent execution error into a message that can be shown to the user."""
+    # Handle rate limit errors specifically
+    if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg or "rate" in error_msg.lower():
+        return "I'm currently experiencing high demand. Please wait 30 seconds and try again. (Rate limit reached)"
+    # Provide more helpful error message
+    elif "model" in error_msg.lower() or "not found" in error_msg.lower():
+        return "Sorry, there's an issue with the AI model configuration. Please check the server logs."
+    elif "api" in error_msg.lower() or "key" in error_msg.lower() or "auth" in error_msg.lower():
+        return "API authentication issue. Please check your GOOGLE_API_KEY in the .env file."
+    else:
+        return f"I encountered an issue: {error_msg}. Please try rephrasing your query."
+
+
 @app.route('/api/chat', methods=['POST'])
 @async_route
 async def chat():
@@ -86,66 +268,39 @@ async def chat():
         if not user_message:
             return jsonify({'error': 'Message is required'}), 400
         
-        # Get or create session for this user
-        client_id = session.get('client_id')
-        if not client_id:
-            client_id = str(uuid.uuid4())
-            session['client_id'] = client_id
-        
-        # Get or create session IDs
-        if client_id not in active_sessions:
-            user_id = "user_" + str(uuid.uuid4())
-            session_id = "session_" + str(uuid.uuid4())
-            
-            # Create the session
-            await session_service.create_session(
-                app_name="travel_planner",
-                user_id=user_id,
-                session_id=session_id
-            )
-            
-            active_sessions[client_id] = {
-                'user_id': user_id,
-                'session_id': session_id
-            }
-        
-        user_id = active_sessions[client_id]['user_id']
-        session_id = active_sessions[client_id]['session_id']
+        client_id, user_id, session_id = await get_or_create_session()
         
         # Create message content
-        message = types.Content(
-            role="user",
-            parts=[types.Part(text=user_message)]
-        )
+        message = user_content(user_message)
         
         # Run the agent and collect response
         response_text = []
-        try:
-            async for event in runner.run_async(
-                user_id=user_id,
-                session_id=session_id,
-                new_message=message
-            ):
-                if hasattr(event, 'content') and event.content:
-                    for part in event.content.parts:
-                        if hasattr(part, 'text') and part.text:
-                            response_text.append(part.text)
-        except Exception as e:
-            error_msg = str(e)
-            print(f"[!] Agent execution error: {error_msg}")
-            import traceback
-            traceback.print_exc()
+        tool_results = []
+        with trace('chat', client_id=client_id):
+            try:
+                async for event in run_turn(client_id, user_id, session_id, message):
+                    record_event(event)
+                    if hasattr(event, 'content') and event.content:
+                        for part in event.content.parts:
+                            if hasattr(part, 'text') and part.text:
+                                response_text.append(part.text)
+                            elif getattr(part, 'function_response', None):
+                                tool_results.append(tool_result(part.function_response))
+            except Overloaded as e:
+                return jsonify({
+                    'error': overloaded_message(e),
+                    'queue_position': e.position,
+                    'retry_after': round(e.retry_after, 1)
+                }), 429, {'Retry-After': str(max(int(e.retry_after), 1))}
+            except Exception as e:
+                error_msg = str(e)
+                print(f"[!] Agent execution error: {error_msg}")
+                import traceback
+                traceback.print_exc()
+                record_agent_error(error_msg)
+                response_text = [friendly_error(error_msg)]
             
-            # Handle rate limit errors specifically
-            if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg or "rate" in error_msg.lower():
-                response_text = ["I'm currently experiencing high demand. Please wait 30 seconds and try again. (Rate limit reached)"]
-            # Provide more helpful error message
-            elif "model" in error_msg.lower() or "not found" in error_msg.lower():
-                response_text = ["Sorry, there's an issue with the AI model configuration. Please check the server logs."]
-            elif "api" in error_msg.lower() or "key" in error_msg.lower() or "auth" in error_msg.lower():
-                response_text = ["API authentication issue. Please check your GOOGLE_API_KEY in the .env file."]
-            else:
-                response_text = [f"I encountered an issue: {error_msg}. Please try rephrasing your query."]
+            await session_store.enforce_limits(client_id)
         
         full_response = ''.join(response_text)
         
@@ -154,6 +309,7 @@ async def chat():
         
         return jsonify({
             'response': full_response,
+            'tool_results': tool_results,
             'session_id': client_id
         })
     
@@ -162,31 +318,111 @@ async def chat():
         return jsonify({'error': 'An error occurred processing your request.'}), 500
 
 
+def overloaded_message(e):
+    """User-facing text for a turn rejected by admission control."""
+    return (f"We're handling a lot of requests right now. You're number {e.position} in line - "
+            f"please try again in about {max(int(e.retry_after), 1)} seconds.")
+
+
+def tool_result(function_response):
+    """The structured result of a tool call, as sent to the frontend for rendering."""
+    return {'name': function_response.name, 'data': function_response.response or {}}
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream the agent's reply as Server-Sent Events while the runner produces it.
+
+    Events: ``session`` (client id), ``token`` (text chunk), ``tool_start`` (tool
+    call) and ``tool_end`` (tool name and structured result), then a final
+    ``done`` or ``error``.
+    """
+    data = request.json or {}
+    user_message = data.get('message', '').strip()
+    
+    if not user_message:
+        return jsonify({'error': 'Message is required'}), 400
+    
+    try:
+        client_id, user_id, session_id = run_sync(get_or_create_session())
+    except Exception as e:
+        print(f"Error in chat stream endpoint: {str(e)}")
+        return jsonify({'error': 'An error occurred processing your request.'}), 500
+    
+    message = user_content(user_message)
+    
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    
+    def generate():
+        with trace('chat_stream', client_id=client_id):
+            yield sse_event('session', {'session_id': client_id})
+            # Partial events carry the text as it is generated; the final
+            # aggregated event repeats it, so only forward text we haven't streamed.
+            streamed_partial = False
+            try:
+                events = run_turn(
+                    client_id, user_id, session_id, message,
+                    run_config=RunConfig(streaming_mode=StreamingMode.SSE)
+                )
+                for event in iterate_sync(events):
+                    record_event(event)
+                    if not (hasattr(event, 'content') and event.content and event.content.parts):
+                        continue
+                    partial = bool(getattr(event, 'partial', False))
+                    for part in event.content.parts:
+                        if getattr(part, 'function_call', None):
+                            yield sse_event('tool_start', {
+                                'name': part.function_call.name,
+                                'args': part.function_call.args or {}
+                            })
+                        elif getattr(part, 'function_response', None):
+                            yield sse_event('tool_end', tool_result(part.function_response))
+                        elif getattr(part, 'text', None):
+                            if partial:
+                                streamed_partial = True
+                                yield sse_event('token', {'text': part.text})
+                            elif not streamed_partial:
+                                yield sse_event('token', {'text': part.text})
+                    if not partial:
+                        streamed_partial = False
+                yield sse_event('done', {'session_id': client_id})
+            except Overloaded as e:
+                yield sse_event('error', {
+                    'message': overloaded_message(e),
+                    'queue_position': e.position,
+                    'retry_after': round(e.retry_after, 1)
+                })
+            except Exception as e:
+                error_msg = str(e)
+                print(f"[!] Agent execution error: {error_msg}")
+                record_agent_error(error_msg)
+                yield sse_event('error', {'message': friendly_error(error_msg)})
+            finally:
+                run_sync(session_store.enforce_limits(client_id))
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/api/reset', methods=['POST'])
 @async_route
 async def reset_session():
     """Reset the current chat session."""
     try:
         client_id = session.get('client_id')
-        if client_id and client_id in active_sessions:
-            # Get session info before deleting
-            user_id = active_sessions[client_id]['user_id']
-            session_id = active_sessions[client_id]['session_id']
-            
-            # Clean up ADK session (if method exists)
-            try:
-                if hasattr(session_service, 'delete_session'):
-                    await session_service.delete_session(
-                        app_name="travel_planner",
-                        user_id=user_id,
-                        session_id=session_id
-                    )
-            except Exception as cleanup_error:
-                print(f"Session cleanup note: {cleanup_error}")
-            
-            # Remove from active sessions
-            del active_sessions[client_id]
+        if client_id:
+            # Remove from active sessions and clean up the ADK session
+            await session_store.remove(client_id)
             session.pop('client_id', None)
+            session.pop('adk_session', None)
         
         return jsonify({'message': 'Session reset successfully', 'status': 'fresh'})
     except Exception as e:
@@ -194,17 +430,288 @@ async def reset_session():
         return jsonify({'error': str(e)}), 500
 
 
+async def run_chat_job(job, user_id, session_id, message):
+    """Job body for /api/jobs: one agent turn, reporting tool calls and text as progress events."""
+    response_text = []
+    tool_results = []
+    with trace('chat_job', client_id=job.client_id, job_id=job.id):
+        try:
+            async for event in run_turn(job.client_id, user_id, session_id, message):
+                record_event(event)
+                if not (hasattr(event, 'content') and event.content and event.content.parts):
+                    continue
+                for part in event.content.parts:
+                    if getattr(part, 'function_call', None):
+                        job.emit('tool_start', {
+                            'name': part.function_call.name,
+                            'args': part.function_call.args or {}
+                        })
+                    elif getattr(part, 'function_response', None):
+                        result = tool_result(part.function_response)
+                        tool_results.append(result)
+                        job.emit('tool_end', result)
+                    elif getattr(part, 'text', None):
+                        response_text.append(part.text)
+                        job.emit('text', {'text': part.text})
+        except Overloaded as e:
+            raise JobFailed(overloaded_message(e), queue_position=e.position, retry_after=round(e.retry_after, 1))
+        except Exception as e:
+            error_msg = str(e)
+            print(f"[!] Agent execution error: {error_msg}")
+            record_agent_error(error_msg)
+            raise JobFailed(friendly_error(error_msg))
+        finally:
+            await session_store.enforce_limits(job.client_id)
+
+    return {
+        'response': ''.join(response_text) or "I couldn't generate a response. Please try again with a different query.",
+        'tool_results': tool_results
+    }
+
+
+@app.route('/api/jobs', methods=['POST'])
+@async_route
+async def submit_job():
+    """Start an agent turn in the background and return its job id immediately."""
+    data = request.json or {}
+    user_message = data.get('message', '').strip()
+    if not user_message:
+        return jsonify({'error': 'Message is required'}), 400
+
+    try:
+        client_id, user_id, session_id = await get_or_create_session()
+        message = user_content(user_message)
+        job = await jobs.submit(client_id, run_chat_job, user_id, session_id, message)
+    except JobRejected as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        print(f"Error in job submit endpoint: {str(e)}")
+        return jsonify({'error': 'An error occurred processing your request.'}), 500
+
+    snapshot = await jobs.get(job.id, client_id)
+    return jsonify({
+        'job_id': job.id,
+        'status': snapshot['status'],
+        'position': snapshot['position'],
+        'session_id': client_id
+    }), 202, {'Location': f"/api/jobs/{job.id}"}
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@async_route
+async def get_job(job_id):
+    """Job status, progress events after ``?after=<seq>`` and the result once done.
+
+    ``?wait=<seconds>`` (max 25) long-polls until there is something new.
+    """
+    after = request.args.get('after', 0, type=int)
+    wait = min(max(request.args.get('wait', 0, type=float), 0), 25)
+    client_id = session.get('client_id')
+    if wait:
+        snapshot = await jobs.wait(job_id, client_id, after, timeout=wait)
+    else:
+        snapshot = await jobs.get(job_id, client_id, after)
+    if snapshot is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(snapshot)
+
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+@async_route
+async def cancel_job(job_id):
+    """Cancel a queued or running job."""
+    snapshot = await jobs.cancel(job_id, session.get('client_id'))
+    if snapshot is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(snapshot)
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Subscribe to a job's progress as Server-Sent Events, ending with ``done``, ``error`` or ``cancelled``."""
+    client_id = session.get('client_id')
+    after = request.args.get('after', 0, type=int)
+    if run_sync(jobs.get(job_id, client_id)) is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def generate():
+        cursor = after
+        while True:
+            snapshot = run_sync(jobs.wait(job_id, client_id, cursor, timeout=15))
+            if snapshot is None:
+                yield sse_event('error', {'message': 'Job not found'})
+                return
+            for item in snapshot['events']:
+                cursor = item['seq']
+                yield sse_event(item['event'], dict(item['data'], seq=item['seq']))
+            if snapshot['status'] in ('done', 'error', 'cancelled'):
+                yield sse_event(snapshot['status'], {
+                    'job_id': job_id,
+                    'result': snapshot['result'],
+                    'error': snapshot['error']
+                })
+                return
+            if not snapshot['events']:
+                yield ": keep-alive\n\n"
+
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+async def batch_turn(user_id, session_id, message):
+    """One batch turn, traced on its own and admitted under a shared 'batch' client.
+
+    Sharing one admission client keeps a large batch from crowding out chat users.
+    """
+    with trace('batch_turn', client_id='batch', session_id=session_id):
+        async for event in run_turn('batch', user_id, session_id, message):
+            record_event(event)
+            yield event
+
+
+@app.route('/api/plan/batch', methods=['POST'])
+def plan_batch():
+    """Run a JSONL batch of trip requests, streaming one JSONL result line per item as it finishes.
+
+    Body: one item per line (see server/batch.py). ``?skip=id1,id2`` skips items an
+    interrupted call already returned; ``?concurrency=N`` lowers the parallelism.
+    The last line is ``{"summary": {...}}``. Needs ``Authorization: Bearer $BATCH_API_TOKEN``.
+    """
+    if not BATCH_API_TOKEN:
+        return jsonify({'error': 'Batch API is disabled. Set BATCH_API_TOKEN to enable it.'}), 403
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {BATCH_API_TOKEN}"):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    try:
+        items = parse_items(request.get_data(as_text=True).splitlines())
+    except ValueError as e:
+        return jsonify({'error': f"Invalid batch: {str(e)}"}), 400
+    skip = set(filter(None, request.args.get('skip', '').split(',')))
+    items = [item for item in items if item['id'] not in skip]
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f"Too many items ({len(items)}); the limit is {BATCH_MAX_ITEMS} per call."}), 413
+    concurrency = min(max(request.args.get('concurrency', BATCH_CONCURRENCY, type=int), 1), BATCH_CONCURRENCY)
+
+    def generate():
+        results = []
+        started = time.perf_counter()
+        # run_turn already retries rate limits, so the batch doesn't add its own layer
+        for result in iterate_sync(run_batch(items, batch_turn, session_service, "travel_planner", concurrency,
+                                             retries=0)):
+            results.append(result)
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+        yield json.dumps({'summary': summarize(results, time.perf_counter() - started)}) + "\n"
+
+    return Response(
+        generate(),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+# Gauges read at scrape time
+metrics.Gauge("travel_live_sessions", "Chat sessions held by this worker",
+              lambda: session_store.stats()['live_sessions'])
+metrics.Gauge("travel_session_bytes", "Approximate bytes of session history held",
+              lambda: session_store.stats()['approx_bytes'])
+metrics.Gauge("travel_cache_lookups_total", "Tool cache lookups by cache and result",
+              lambda: {
+                  (c['name'], result): c[result]
+                  for c in cache_stats()
+                  for result in ('hits', 'misses')
+              },
+              labels=("cache", "result"), kind="counter")
+metrics.Gauge("travel_upstream_requests_total", "Outbound lookups made vs deduplicated, by source",
+              lambda: {
+                  (source, kind): counts[kind]
+                  for source, counts in inflight.stats().items()
+                  for kind in ('calls', 'deduplicated')
+              },
+              labels=("source", "kind"), kind="counter")
+metrics.Gauge("travel_amadeus_requests_total", "Amadeus API calls by endpoint and result",
+              lambda: {
+                  (endpoint, result): s['errors'] if result == 'error' else s['calls'] - s['errors']
+                  for endpoint, s in amadeus_stats().get('endpoints', {}).items()
+                  for result in ('ok', 'error')
+              },
+              labels=("endpoint", "result"), kind="counter")
+metrics.Gauge("travel_amadeus_request_seconds_total", "Time spent in Amadeus API calls by endpoint",
+              lambda: {(endpoint,): s['seconds'] for endpoint, s in amadeus_stats().get('endpoints', {}).items()},
+              labels=("endpoint",), kind="counter")
+
+metrics.Gauge("travel_admission_waiting", "Turns waiting for Gemini budget",
+              lambda: admission.waiting())
+metrics.Gauge("travel_admission_total", "Turns admitted, queued and rejected by admission control",
+              lambda: {(k,): admission.stats()[k] for k in ('admitted', 'queued', 'rejected')},
+              labels=("result",), kind="counter")
+metrics.Gauge("travel_jobs", "Background jobs held by this worker, by status",
+              lambda: {(k,): jobs.stats()[k] for k in ('queued', 'running', 'retained')},
+              labels=("status",))
+metrics.Gauge("travel_jobs_total", "Background jobs by outcome",
+              lambda: {(k,): jobs.stats()[k] for k in ('submitted', 'rejected', 'completed', 'failed', 'cancelled')},
+              labels=("result",), kind="counter")
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus metrics for agent turns, LLM calls and tool calls."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/health')
 def health():
-    """Health check endpoint."""
-    return jsonify({'status': 'healthy', 'service': 'AI Travel Planner'})
+    """Readiness probe: required keys configured and no upstream failing since its last success."""
+    required_keys = {
+        'gemini': ['GOOGLE_API_KEY'],
+        'amadeus': ['AMADEUS_CLIENT_ID', 'AMADEUS_CLIENT_SECRET'],
+        'openweather': ['OPENWEATHER_API_KEY'],
+    }
+    upstreams = {}
+    for name, keys in required_keys.items():
+        status = upstream_status.get(name, {})
+        last_ok, last_error = status.get('last_ok'), status.get('last_error')
+        if replaying(name):
+            state = 'replay'
+        elif not all(os.getenv(k) for k in keys):
+            state = 'not_configured'
+        elif last_error and (not last_ok or last_error > last_ok):
+            state = 'degraded'
+        elif last_ok:
+            state = 'ok'
+        else:
+            state = 'unknown'
+        upstreams[name] = {'status': state, 'error': status.get('error') if state == 'degraded' else None}
+    
+    # Gemini is required to answer anything; other upstreams only degrade answers
+    ready = upstreams['gemini']['status'] != 'not_configured'
+    return jsonify({
+        'status': 'healthy' if ready else 'unavailable',
+        'service': 'AI Travel Planner',
+        'upstreams': upstreams,
+        'sessions': session_store.stats(),
+        'upstream_calls': inflight.stats(),
+        'amadeus': amadeus_stats(),
+        'admission': admission.stats(),
+        'jobs': jobs.stats(),
+        'plan_cache': plan_cache.stats(),
+        'routing': router.stats(),
+        'transit': transit_stats(),
+        'cassette': cassette_stats(),
+        'startup': startup.report(top=5)
+    }), 200 if ready else 503
 
 
 if __name__ == '__main__':
     # Check environment variables
     required_keys = ['GOOGLE_API_KEY', 'AMADEUS_CLIENT_ID', 'AMADEUS_CLIENT_SECRET', 'OPENWEATHER_API_KEY']
     missing_keys = [key for key in required_keys if not os.getenv(key)]
-    
+    if replaying():
+        # Replayed upstreams need no keys (Gemini still does with CASSETTE_GEMINI=0)
+        missing_keys = [key for key in missing_keys if key == 'GOOGLE_API_KEY' and not replaying('gemini')]
+
     if missing_keys:
         print("[X] Error: Missing required API keys:")
         for key in missing_keys:
@@ -212,6 +719,10 @@ if __name__ == '__main__':
         print("\nPlease check your .env file.")
     else:
         print("[*] Starting AI Travel Planner Web Server...")
+        if startup.WARMUP:
+            warm_up()
+        if startup.STARTUP_REPORT:
+            startup.print_report()
         port = int(os.getenv('PORT', 5000))
         print(f"[*] Open your browser at: http://localhost:{port}")
         app.run(debug=False, host='0.0.0.0', port=port, use_reloader=False)
@@ -0,0 +1,3 @@
+"""
+Offline benchmark harness: local fake upstreams and a load driver.
+"""
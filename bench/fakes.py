@@ -0,0 +1,258 @@
+"""
+Local stand-ins for the three upstream APIs, so the app can be exercised
+without network access or API keys:
+
+- a fake Gemini REST backend (generateContent / streamGenerateContent) with
+  configurable per-token latency, which calls the agent's tools once per turn
+- a fake Amadeus server (OAuth token, flight offers, hotel offers)
+- a fake OpenWeather server (current weather and 5-day forecast)
+
+Run standalone to point a separately started server at them:
+
+    python -m bench.fakes --port 8900
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from aiohttp import web
+
+WORDS = (
+    "explore the old town markets then head to the beach for sunset "
+    "try local seafood and book a heritage walk in the morning"
+).split()
+
+
+class FakeUpstreams:
+    """One aiohttp app serving all three fakes (Amadeus at the root, since
+    its SDK only lets us change host and port; Gemini and OpenWeather under
+    path prefixes)."""
+
+    def __init__(self, token_latency: float = 0.01, reply_tokens: int = 120,
+                 upstream_latency: float = 0.05):
+        self.token_latency = token_latency
+        self.reply_tokens = reply_tokens
+        self.upstream_latency = upstream_latency
+        self.calls = Counter()
+        self.tokens = Counter()
+        self._runner = None
+        self.port = None
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def make_app(self) -> web.Application:
+        app = web.Application(client_max_size=32 * 1024 * 1024)
+        app.router.add_post('/gemini/{version}/models/{action}', self.gemini)
+        app.router.add_post('/v1/security/oauth2/token', self.amadeus_token)
+        app.router.add_get('/v2/shopping/flight-offers', self.amadeus_flights)
+        app.router.add_get('/v3/shopping/hotel-offers', self.amadeus_hotels)
+        app.router.add_get('/weather/weather', self.weather_current)
+        app.router.add_get('/weather/forecast', self.weather_forecast)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0):
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def env(self, host: str = '127.0.0.1') -> dict:
+        """Environment variables that point the app at these fakes."""
+        return {
+            'GOOGLE_API_KEY': 'fake-key',
+            'GOOGLE_GENAI_USE_VERTEXAI': 'false',
+            'GOOGLE_GEMINI_BASE_URL': f'http://{host}:{self.port}/gemini/',
+            'AMADEUS_CLIENT_ID': 'fake-id',
+            'AMADEUS_CLIENT_SECRET': 'fake-secret',
+            'AMADEUS_HOST': f'{host}',
+            'AMADEUS_PORT': str(self.port),
+            'AMADEUS_SSL': 'false',
+            'OPENWEATHER_API_KEY': 'fake-key',
+            'OPENWEATHER_BASE_URL': f'http://{host}:{self.port}/weather',
+        }
+
+    # -- Gemini ------------------------------------------------------------
+
+    async def gemini(self, request):
+        model, _, method = request.match_info['action'].partition(':')
+        body = await request.json()
+        self.calls[f'gemini:{model}'] += 1
+        prompt_tokens = len(json.dumps(body)) // 4
+        self.tokens['prompt'] += prompt_tokens
+
+        part = self._next_part(body)
+        if 'text' in part:
+            words = [random.choice(WORDS) for _ in range(self.reply_tokens)]
+        else:
+            words = []
+        self.tokens['output'] += len(words) or 10
+
+        def payload(parts, done):
+            candidate = {'content': {'role': 'model', 'parts': parts}, 'index': 0}
+            if done:
+                candidate['finishReason'] = 'STOP'
+            return {
+                'candidates': [candidate],
+                'usageMetadata': {
+                    'promptTokenCount': prompt_tokens,
+                    'candidatesTokenCount': len(words) or 10,
+                    'totalTokenCount': prompt_tokens + (len(words) or 10),
+                },
+                'modelVersion': model,
+            }
+
+        if method == 'streamGenerateContent':
+            resp = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+            await resp.prepare(request)
+            if not words:
+                await asyncio.sleep(self.token_latency * 10)
+                await resp.write(f"data: {json.dumps(payload([part], True))}\r\n\r\n".encode())
+            else:
+                for i in range(0, len(words), 10):
+                    chunk = words[i:i + 10]
+                    await asyncio.sleep(self.token_latency * len(chunk))
+                    text = ' '.join(chunk) + ' '
+                    done = i + 10 >= len(words)
+                    await resp.write(f"data: {json.dumps(payload([{'text': text}], done))}\r\n\r\n".encode())
+            await resp.write_eof()
+            return resp
+
+        await asyncio.sleep(self.token_latency * (len(words) or 10))
+        if words:
+            part = {'text': ' '.join(words)}
+        return web.json_response(payload([part], True))
+
+    def _next_part(self, body) -> dict:
+        """Call one tool on the user's turn, then answer in text once it has responded."""
+        contents = body.get('contents') or []
+        last_parts = contents[-1].get('parts', []) if contents else []
+        if any('functionResponse' in p for p in last_parts):
+            return {'text': ''}
+
+        tools = {
+            decl['name']
+            for tool in body.get('tools') or []
+            for decl in tool.get('functionDeclarations') or []
+        }
+        message = ' '.join(p.get('text', '') for p in last_parts)
+        city = (re.findall(r'\bto ([A-Z][a-z]+)', message) or re.findall(r'\bin ([A-Z][a-z]+)', message) or ['Goa'])[0]
+        date = (datetime.utcnow() + timedelta(days=30)).strftime('%Y-%m-%d')
+
+        if 'gather_trip_data' in tools and re.search(r'\b(plan|trip)\b', message, re.I):
+            return {'functionCall': {'name': 'gather_trip_data', 'args': {
+                'origin_city': 'Delhi', 'destination_city': city,
+                'origin_iata': 'DEL', 'destination_iata': city[:3].upper(),
+                'departure_date': date, 'trip_days': 3,
+            }}}
+        if 'get_weather' in tools and re.search(r'weather', message, re.I):
+            return {'functionCall': {'name': 'get_weather', 'args': {'city': city}}}
+        return {'text': ''}
+
+    # -- Amadeus -----------------------------------------------------------
+
+    def _amadeus_json(self, data) -> web.Response:
+        return web.Response(body=json.dumps(data).encode(),
+                            headers={'Content-Type': 'application/vnd.amadeus+json'})
+
+    async def amadeus_token(self, request):
+        self.calls['amadeus:token'] += 1
+        return self._amadeus_json({
+            'type': 'amadeusOAuth2Token', 'access_token': 'fake-token',
+            'token_type': 'Bearer', 'expires_in': 1799, 'state': 'approved',
+        })
+
+    async def amadeus_flights(self, request):
+        self.calls['amadeus:flight-offers'] += 1
+        await asyncio.sleep(self.upstream_latency)
+        q = request.query
+        offers = [{
+            'type': 'flight-offer', 'id': str(i),
+            'price': {'currency': 'EUR', 'total': f'{80 + 17 * i:.2f}'},
+            'validatingAirlineCodes': [random.choice(['AI', '6E', 'UK', 'SG'])],
+            'itineraries': [{
+                'duration': f'PT{2 + i}H{5 * i}M',
+                'segments': [{
+                    'departure': {'iataCode': q.get('originLocationCode'), 'at': f"{q.get('departureDate')}T0{6 + i}:00:00"},
+                    'arrival': {'iataCode': q.get('destinationLocationCode'), 'at': f"{q.get('departureDate')}T1{i}:00:00"},
+                    'carrierCode': 'AI', 'number': str(100 + i),
+                }],
+            }],
+        } for i in range(int(q.get('max', 5)))]
+        return self._amadeus_json({'meta': {'count': len(offers)}, 'data': offers})
+
+    async def amadeus_hotels(self, request):
+        self.calls['amadeus:hotel-offers'] += 1
+        await asyncio.sleep(self.upstream_latency)
+        city = request.query.get('cityCode', 'XXX')
+        hotels = [{
+            'type': 'hotel-offers',
+            'hotel': {'hotelId': f'{city}{i:04d}', 'name': f'{city.title()} Hotel {i}',
+                      'rating': str(3 + i % 3), 'cityCode': city},
+            'offers': [{'price': {'currency': 'EUR', 'total': f'{60 + 25 * i:.2f}'}}],
+        } for i in range(8)]
+        return self._amadeus_json({'data': hotels})
+
+    # -- OpenWeather -------------------------------------------------------
+
+    async def weather_current(self, request):
+        self.calls['openweather:weather'] += 1
+        await asyncio.sleep(self.upstream_latency)
+        return web.json_response({
+            'name': request.query.get('q', ''),
+            'weather': [{'main': 'Clear', 'description': 'clear sky'}],
+            'main': {'temp': 28.4, 'feels_like': 30.1, 'humidity': 62},
+        })
+
+    async def weather_forecast(self, request):
+        self.calls['openweather:forecast'] += 1
+        await asyncio.sleep(self.upstream_latency)
+        start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        items = []
+        for i in range(40):
+            t = start + timedelta(hours=3 * i)
+            items.append({
+                'dt': int(t.timestamp()),
+                'dt_txt': t.strftime('%Y-%m-%d %H:%M:%S'),
+                'main': {'temp': 22 + 6 * ((i % 8) / 7), 'temp_min': 21, 'temp_max': 29, 'humidity': 60},
+                'weather': [{'main': 'Rain' if i % 5 == 0 else 'Clouds',
+                             'description': 'light rain' if i % 5 == 0 else 'scattered clouds'}],
+                'pop': 0.4 if i % 5 == 0 else 0.1,
+            })
+        return web.json_response({'cnt': len(items), 'list': items,
+                                  'city': {'name': request.query.get('q', ''), 'timezone': 19800}})
+
+
+async def _serve(args):
+    fakes = await FakeUpstreams(args.token_latency, args.reply_tokens, args.upstream_latency).start(args.host, args.port)
+    print(f"[*] Fake upstreams listening on http://{args.host}:{fakes.port}")
+    print("[*] Export these before starting app.py / main.py:")
+    for key, value in fakes.env(args.host).items():
+        print(f"export {key}={value}")
+    try:
+        while True:
+            await asyncio.sleep(60)
+            print(f"[*] Upstream calls so far: {dict(fakes.calls)}")
+    finally:
+        await fakes.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve fake Gemini, Amadeus and OpenWeather APIs.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--token-latency', type=float, default=0.01, help="Seconds per generated token")
+    parser.add_argument('--reply-tokens', type=int, default=120, help="Tokens per text reply")
+    parser.add_argument('--upstream-latency', type=float, default=0.05, help="Seconds per Amadeus/OpenWeather call")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
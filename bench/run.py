@@ -0,0 +1,228 @@
+"""
+Load driver for the offline benchmark.
+
+Starts the fake upstreams (bench/fakes.py), then replays multi-turn
+conversations either against ``/api/chat`` (the Flask app served in-process,
+or any running server via ``--url``) or against the ``main.py`` CLI loop, and
+reports latency percentiles, throughput, memory growth per session and
+upstream call counts.
+
+    python -m bench.run --mode web --sessions 50 --concurrency 8
+    python -m bench.run --mode cli --sessions 8 --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import aiohttp
+from bench.fakes import FakeUpstreams
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CONVERSATIONS = os.path.join(ROOT, 'bench', 'conversations.jsonl')
+
+
+def load_conversations(path: str) -> list:
+    with open(path) as f:
+        return [json.loads(line)['turns'] for line in f if line.strip()]
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def rss_bytes(pid: str = 'self') -> int:
+    """Current resident set size (Linux), falling back to peak RSS."""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def start_in_background(coro_factory):
+    """Run an asyncio loop in a daemon thread; returns (loop, result of coro)."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="bench-fakes", daemon=True).start()
+    return loop, asyncio.run_coroutine_threadsafe(coro_factory(), loop).result()
+
+
+# -- web mode --------------------------------------------------------------
+
+def start_web_app(port: int = 0):
+    """Import app.py (after the fake env is set) and serve it on a thread."""
+    from werkzeug.serving import make_server
+    import app as web_app
+    server = make_server('127.0.0.1', port, web_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-web", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", web_app
+
+
+async def run_web_conversation(base_url: str, turns: list, latencies: list, errors: list):
+    # One cookie jar per conversation = one chat session on the server
+    async with aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True)) as http:
+        for turn in turns:
+            start = time.perf_counter()
+            try:
+                async with http.post(f"{base_url}/api/chat", json={'message': turn}) as resp:
+                    body = await resp.json()
+                    if resp.status != 200 or 'error' in body:
+                        errors.append(body.get('error', resp.status))
+            except Exception as e:
+                errors.append(str(e))
+            latencies.append(time.perf_counter() - start)
+
+
+# -- CLI mode --------------------------------------------------------------
+
+async def _read_until(stream, marker: bytes, buffer: bytearray):
+    while marker not in buffer:
+        chunk = await stream.read(4096)
+        if not chunk:
+            raise EOFError("CLI exited early")
+        buffer.extend(chunk)
+    del buffer[:buffer.index(marker) + len(marker)]
+
+
+async def run_cli_conversation(turns: list, latencies: list, errors: list, rss: list, env: dict):
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(ROOT, 'main.py'),
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL, cwd=ROOT, env=env
+    )
+    buffer = bytearray()
+    try:
+        await _read_until(proc.stdout, b'You: ', buffer)
+        for turn in turns:
+            start = time.perf_counter()
+            proc.stdin.write(turn.encode() + b'\n')
+            await proc.stdin.drain()
+            await _read_until(proc.stdout, b'You: ', buffer)
+            latencies.append(time.perf_counter() - start)
+        rss.append(rss_bytes(str(proc.pid)))
+        proc.stdin.write(b'quit\n')
+        await proc.stdin.drain()
+    except Exception as e:
+        errors.append(str(e))
+    finally:
+        try:
+            await asyncio.wait_for(proc.wait(), 10)
+        except asyncio.TimeoutError:
+            proc.kill()
+
+
+# -- driver ----------------------------------------------------------------
+
+async def drive(args, conversations, fakes) -> dict:
+    latencies, errors, rss = [], [], []
+    semaphore = asyncio.Semaphore(args.concurrency)
+    web_app = None
+    env = dict(os.environ, PYTHONUNBUFFERED='1', **fakes.env())
+
+    if args.mode == 'web':
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            os.environ.update(fakes.env())
+            base_url, web_app = start_web_app()
+        # Warm up once so import/first-connection cost isn't billed to the run
+        await run_web_conversation(base_url, conversations[0][:1], [], [])
+
+    rss_start = rss_bytes()
+    calls_start = fakes.calls.copy()
+
+    async def one(i):
+        turns = conversations[i % len(conversations)]
+        async with semaphore:
+            if args.mode == 'web':
+                await run_web_conversation(base_url, turns, latencies, errors)
+            else:
+                await run_cli_conversation(turns, latencies, errors, rss, env)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+
+    result = {
+        'mode': args.mode,
+        'sessions': args.sessions,
+        'concurrency': args.concurrency,
+        'turns': len(latencies),
+        'errors': len(errors),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_turns_per_s': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'latency_s': {
+            'p50': round(percentile(latencies, 50), 4),
+            'p95': round(percentile(latencies, 95), 4),
+            'p99': round(percentile(latencies, 99), 4),
+            'max': round(max(latencies, default=0.0), 4),
+        },
+        'upstream_calls': dict(fakes.calls - calls_start),
+        'model_tokens': dict(fakes.tokens),
+    }
+    if args.mode == 'web' and web_app is not None:
+        result['memory'] = {
+            'rss_growth_bytes': rss_bytes() - rss_start,
+            'rss_growth_per_session_bytes': (rss_bytes() - rss_start) // max(args.sessions, 1),
+            'sessions': web_app.session_store.stats(),
+        }
+    elif args.mode == 'cli' and rss:
+        result['memory'] = {'cli_rss_per_session_bytes': sum(rss) // len(rss)}
+    if errors:
+        result['sample_errors'] = [str(e) for e in errors[:5]]
+    return result
+
+
+def print_report(result: dict):
+    lat = result['latency_s']
+    print(f"\n=== Benchmark ({result['mode']}) ===")
+    print(f"Sessions: {result['sessions']}  Concurrency: {result['concurrency']}  "
+          f"Turns: {result['turns']}  Errors: {result['errors']}")
+    print(f"Latency  p50 {lat['p50'] * 1000:.1f} ms | p95 {lat['p95'] * 1000:.1f} ms | "
+          f"p99 {lat['p99'] * 1000:.1f} ms | max {lat['max'] * 1000:.1f} ms")
+    print(f"Throughput: {result['throughput_turns_per_s']} turns/s over {result['elapsed_s']} s")
+    for key, value in result.get('memory', {}).items():
+        print(f"Memory {key}: {value}")
+    print("Upstream calls:")
+    for name, count in sorted(result['upstream_calls'].items()):
+        print(f"  {name:<28} {count}")
+    for error in result.get('sample_errors', []):
+        print(f"[!] {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load benchmark for the AI Travel Planner.")
+    parser.add_argument('--mode', choices=['web', 'cli'], default='web')
+    parser.add_argument('--url', help="Benchmark an already running server instead of app.py in-process")
+    parser.add_argument('--conversations', default=DEFAULT_CONVERSATIONS, help="JSONL file of {\"turns\": [...]}")
+    parser.add_argument('--sessions', type=int, default=20, help="Conversations to replay")
+    parser.add_argument('--concurrency', type=int, default=4, help="Conversations in flight at once")
+    parser.add_argument('--token-latency', type=float, default=0.01, help="Fake model seconds per token")
+    parser.add_argument('--reply-tokens', type=int, default=120, help="Fake model tokens per text reply")
+    parser.add_argument('--upstream-latency', type=float, default=0.05, help="Fake Amadeus/OpenWeather latency")
+    parser.add_argument('--fakes-port', type=int, default=0, help="Port for the fake upstreams (0 = random)")
+    parser.add_argument('--json', help="Also write the report to this file")
+    args = parser.parse_args()
+
+    conversations = load_conversations(args.conversations)
+    fakes = FakeUpstreams(args.token_latency, args.reply_tokens, args.upstream_latency)
+    start_in_background(lambda: fakes.start(port=args.fakes_port))
+    print(f"[*] Fake upstreams on port {fakes.port}")
+
+    result = asyncio.run(drive(args, conversations, fakes))
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+Gunicorn settings for running the Flask app with several workers.
+
+Each worker process owns one long-lived asyncio loop (see server/loop.py);
+request threads hand their async work to that loop.
+
+    gunicorn -c gunicorn.conf.py app:app
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+# Several workers only make sense when they share a cookie key and conversation store;
+# otherwise a follow-up landing on another worker loses its session.
+_shared_state = bool(os.getenv('SECRET_KEY') and os.getenv('SESSION_DB'))
+workers = int(os.getenv('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 4) if _shared_state else 1))
+# Job polls can land on any worker, so several workers need the shared job store (server/jobs.py)
+if workers > 1:
+    os.environ.setdefault('JOBS_DB', '/tmp/travel_planner_jobs.db')
+worker_class = "gthread"
+threads = int(os.getenv('WEB_THREADS', 8))
+timeout = int(os.getenv('WEB_TIMEOUT', 120))
+keepalive = 5
+
+
+def post_worker_init(worker):
+    """Warm the worker up before it accepts requests (WARMUP=1) and print its startup report."""
+    from server import startup
+    if startup.WARMUP:
+        from app import warm_up
+        warm_up()
+    if startup.STARTUP_REPORT:
+        startup.print_report()
+
+
+def worker_exit(server, worker):
+    """Stop the worker's shared event loop cleanly."""
+    from server.loop import shutdown
+    shutdown()
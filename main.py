@@ -1,21 +1,27 @@
 """
 Main entry point for the AI Travel Planner application.
 """
+import argparse
 import asyncio
+import json
 import os
+import time
 import uuid
 from dotenv import load_dotenv
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from google.genai import types
+from agents.cassette import install as install_cassette, replaying
+from agents.http import close_http_session
 from agents.root import root_agent
+from server.batch import completed_ids, parse_items, run_batch, summarize
+from server.session_db import create_session_service
 
 # Load environment variables
 load_dotenv()
 
 async def main():
     # 1. Validation
-    if not os.getenv("GOOGLE_API_KEY"):
+    if not (os.getenv("GOOGLE_API_KEY") or replaying("gemini")):
         print("❌ Error: GOOGLE_API_KEY not found in .env")
         return
 
@@ -24,9 +30,9 @@ async def main():
     # 2. Initialize the Runner
     # FIX: Added 'app_name="travel_planner"' which caused the previous error
     runner = Runner(
-        agent=root_agent,
+        agent=install_cassette(root_agent),
         app_name="travel_planner", 
-        session_service=InMemorySessionService()
+        session_service=create_session_service()
     )
 
     # 3. Session Setup
@@ -76,5 +82,61 @@ async def main():
         except Exception as e:
             print(f"\n❌ Runtime Error: {e}")
 
+async def batch(args):
+    """Pre-generate plans: run every item of a JSONL file and append results to --out."""
+    if not (os.getenv("GOOGLE_API_KEY") or replaying("gemini")):
+        print("❌ Error: GOOGLE_API_KEY not found in .env")
+        return
+
+    with open(args.batch, encoding="utf-8") as f:
+        items = parse_items(f)
+
+    # The output file is the checkpoint: with --resume, items already done are skipped
+    done = set()
+    if args.resume and os.path.exists(args.out):
+        with open(args.out, encoding="utf-8") as f:
+            done = completed_ids(f)
+    pending = [item for item in items if item['id'] not in done]
+    print(f"✈️  Batch: {len(items)} item(s), {len(done)} already done, {len(pending)} to run "
+          f"({args.concurrency} at a time)")
+
+    session_service = create_session_service()
+    runner = Runner(agent=install_cassette(root_agent), app_name="travel_planner", session_service=session_service)
+
+    def turn(user_id, session_id, message):
+        return runner.run_async(user_id=user_id, session_id=session_id, new_message=message)
+
+    results = []
+    started = time.perf_counter()
+    with open(args.out, "a" if args.resume else "w", encoding="utf-8") as out:
+        async for result in run_batch(pending, turn, session_service, "travel_planner", args.concurrency):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            results.append(result)
+            mark = "✅" if result['status'] == 'ok' else "❌"
+            print(f"{mark} [{len(results)}/{len(pending)}] {result['id']} in {result['seconds']:.1f}s")
+
+    print(json.dumps(summarize(results, time.perf_counter() - started), indent=2))
+
+
+async def run(args):
+    """Chat or batch, then close pooled upstream connections before the loop ends."""
+    try:
+        await (batch(args) if args.batch else main())
+    finally:
+        await close_http_session()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="AI Travel Planner - interactive chat, or batch plan generation")
+    parser.add_argument("--batch", metavar="REQUESTS.jsonl", help="run trip requests from a JSONL file instead of chatting")
+    parser.add_argument("--out", default="plans.jsonl", help="JSONL output for --batch (default: plans.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BATCH_CONCURRENCY", 4)),
+                        help="items run at once (default: BATCH_CONCURRENCY or 4)")
+    parser.add_argument("--resume", action="store_true", help="append to --out, skipping items already done")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("\n👋 Interrupted.")
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""
+Web server infrastructure for the AI Travel Planner (event loop, sessions, ...).
+"""
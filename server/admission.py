@@ -0,0 +1,243 @@
+"""
+Admission control for Gemini calls.
+
+Every agent turn must be admitted before ``runner.run_async`` starts. Each
+model has a token-bucket budget for requests per minute and tokens per
+minute; turns that don't fit wait in a bounded queue that is served
+round-robin across sessions, so one chatty session can't starve the others.
+When the queue is full, or the expected wait is too long, the turn is
+rejected immediately with its queue position and a retry-after hint. A 429
+from Gemini pauses that model's budget for the server-suggested delay.
+"""
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict, deque
+
+GEMINI_RPM = float(os.getenv('GEMINI_RPM', 15))
+GEMINI_TPM = float(os.getenv('GEMINI_TPM', 1_000_000))
+# Per-model overrides, e.g. "gemini-2.0-flash=15:1000000,gemini-1.5-flash=15:250000"
+GEMINI_MODEL_LIMITS = os.getenv('GEMINI_MODEL_LIMITS', '')
+ADMISSION_QUEUE_MAX = int(os.getenv('ADMISSION_QUEUE_MAX', 50))
+ADMISSION_MAX_WAIT = float(os.getenv('ADMISSION_MAX_WAIT', 30))
+
+
+class Overloaded(Exception):
+    """Raised when a turn can't be admitted in time."""
+
+    def __init__(self, position, retry_after):
+        super().__init__(f"Server busy: position {position} in queue, retry in {retry_after:.0f}s")
+        self.position = position
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills continuously at ``per_minute / 60`` per second up to ``per_minute``.
+    The level may go negative when actual usage exceeds the estimate taken."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+
+class ModelBudget:
+    def __init__(self, model: str, rpm: float, tpm: float):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.paused_until = 0.0
+
+    def wait_time(self, tokens: float) -> float:
+        pause = max(0.0, self.paused_until - time.monotonic())
+        return max(pause, self.requests.wait_time(1), self.tokens.wait_time(tokens))
+
+    def take(self, requests: float, tokens: float):
+        self.requests.take(requests)
+        self.tokens.take(tokens)
+
+
+class Ticket:
+    """An admitted turn; ``settle`` corrects the budget with actual usage."""
+
+    def __init__(self, budget, tokens):
+        self.budget = budget
+        self.tokens = tokens
+        self.admitted_at = time.monotonic()
+
+    def settle(self, llm_calls: int, tokens: int):
+        self.budget.take(max(llm_calls - 1, 0), tokens - self.tokens)
+
+
+class _Waiter:
+    def __init__(self, future, tokens):
+        self.future = future
+        self.tokens = tokens
+
+
+class AdmissionController:
+    """Per-model budgets with a bounded, session-fair wait queue.
+
+    Must be used from a single event loop (the worker's shared loop).
+    """
+
+    def __init__(self, rpm=GEMINI_RPM, tpm=GEMINI_TPM, limits=GEMINI_MODEL_LIMITS,
+                 max_queue=ADMISSION_QUEUE_MAX, max_wait=ADMISSION_MAX_WAIT):
+        self.default_limits = (rpm, tpm)
+        self.model_limits = _parse_limits(limits)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._budgets = {}
+        self._queues = {}  # model -> OrderedDict(session -> deque[_Waiter])
+        self._dispatchers = {}
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    def budget(self, model: str) -> ModelBudget:
+        if model not in self._budgets:
+            rpm, tpm = self.model_limits.get(model, self.default_limits)
+            self._budgets[model] = ModelBudget(model, rpm, tpm)
+        return self._budgets[model]
+
+    def waiting(self, model: str = None) -> int:
+        queues = [self._queues.get(model, {})] if model else self._queues.values()
+        return sum(len(q) for sessions in queues for q in sessions.values())
+
+    async def admit(self, session_key: str, model: str, tokens: float) -> Ticket:
+        """Wait for budget for one turn of ``model`` estimated at ``tokens`` tokens."""
+        budget = self.budget(model)
+        sessions = self._queues.setdefault(model, OrderedDict())
+
+        # Fast path: nobody waiting and the budget has room
+        if not sessions and budget.wait_time(tokens) == 0:
+            budget.take(1, tokens)
+            self.admitted += 1
+            return Ticket(budget, tokens)
+
+        position = self.waiting(model) + 1
+        expected_wait = budget.wait_time(tokens) + (position - 1) * 60.0 / budget.requests.capacity
+        if position > self.max_queue or expected_wait > self.max_wait:
+            self.rejected += 1
+            raise Overloaded(position, expected_wait)
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), tokens)
+        sessions.setdefault(session_key, deque()).append(waiter)
+        self.queued += 1
+        self._ensure_dispatcher(model)
+        try:
+            # asyncio.timeout, unlike wait_for on 3.11, never swallows a cancellation that races the dispatch
+            async with asyncio.timeout(self.max_wait):
+                await asyncio.shield(waiter.future)
+        except TimeoutError:
+            self._remove(model, session_key, waiter)
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.admitted += 1
+                return Ticket(budget, tokens)
+            self.rejected += 1
+            raise Overloaded(self.position(model, session_key) or 1, budget.wait_time(tokens))
+        except asyncio.CancelledError:
+            self._remove(model, session_key, waiter)
+            if waiter.future.done() and not waiter.future.cancelled():
+                budget.take(-1, -tokens)  # dispatched, but the turn won't run: refund it
+            raise
+        self.admitted += 1
+        return Ticket(budget, tokens)
+
+    def position(self, model: str, session_key: str) -> int:
+        """1-based position of a session's first waiting turn under round-robin, or 0."""
+        sessions = self._queues.get(model, {})
+        if session_key not in sessions:
+            return 0
+        return list(sessions).index(session_key) + 1
+
+    def penalize(self, model: str, retry_after: float):
+        """Pause a model's budget after a 429 so queued turns don't hit it again."""
+        budget = self.budget(model)
+        budget.paused_until = max(budget.paused_until, time.monotonic() + retry_after)
+        budget.requests.level = min(budget.requests.level, 0)
+
+    def _remove(self, model, session_key, waiter):
+        sessions = self._queues.get(model, {})
+        queue = sessions.get(session_key)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del sessions[session_key]
+
+    def _ensure_dispatcher(self, model):
+        task = self._dispatchers.get(model)
+        if task is None or task.done():
+            self._dispatchers[model] = asyncio.get_running_loop().create_task(self._dispatch(model))
+
+    async def _dispatch(self, model):
+        budget = self.budget(model)
+        sessions = self._queues[model]
+        while sessions:
+            # Round-robin: serve the head of the least recently served session
+            session_key, queue = next(iter(sessions.items()))
+            waiter = queue[0]
+            wait = budget.wait_time(waiter.tokens)
+            if wait > 0:
+                await asyncio.sleep(min(wait, 1.0))
+                continue
+            queue.popleft()
+            del sessions[session_key]
+            if queue:
+                sessions[session_key] = queue  # back of the rotation
+            if not waiter.future.done():
+                budget.take(1, waiter.tokens)
+                waiter.future.set_result(True)
+
+    def stats(self) -> dict:
+        return {
+            'admitted': self.admitted,
+            'queued': self.queued,
+            'rejected': self.rejected,
+            'waiting': self.waiting(),
+            'models': {
+                model: {
+                    'requests_available': round(b.requests.level, 2),
+                    'tokens_available': round(b.tokens.level),
+                    'paused_for': round(max(0.0, b.paused_until - time.monotonic()), 1),
+                }
+                for model, b in self._budgets.items()
+            },
+        }
+
+
+def _parse_limits(spec: str) -> dict:
+    limits = {}
+    for item in filter(None, (s.strip() for s in spec.split(','))):
+        model, _, values = item.partition('=')
+        rpm, _, tpm = values.partition(':')
+        limits[model.strip()] = (float(rpm), float(tpm or GEMINI_TPM))
+    return limits
+
+
+def is_rate_limit(error) -> bool:
+    message = str(error)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message or "rate limit" in message.lower()
+
+
+def retry_after_seconds(error):
+    """Server-suggested delay from a Gemini 429 ("retryDelay": "23s" / "retry in 23.4s"), if any."""
+    match = re.search(r"retry(?:Delay|[ _-]?after)?[\"':\s]*(?:in\s*)?([\d.]+)\s*s", str(error), re.I)
+    return float(match.group(1)) if match else None
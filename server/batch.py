@@ -0,0 +1,149 @@
+"""
+Batch plan generation, e.g. nightly pre-generation of itineraries.
+
+Input is JSONL. Each line is one item: ``{"id": "goa-dec", "turns": ["Plan a 3 day trip
+to Goa", "Suggest budget hotels"]}``; ``"message"`` may replace ``"turns"`` for a single
+turn. Any other keys are copied to the output as ``meta``.
+
+Each item gets its own fresh session. At most ``concurrency`` items run at once,
+and a result line (responses plus per-turn and per-item timing) is produced as
+soon as an item finishes. An existing output file doubles as a checkpoint: items
+already recorded as ``ok`` are skipped on resume.
+"""
+import asyncio
+import json
+import time
+import uuid
+from server.admission import is_rate_limit, retry_after_seconds
+
+BATCH_USER_ID = "batch"
+
+
+def parse_items(lines) -> list:
+    """Items from JSONL lines; ids default to the line number."""
+    items = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"line {number}: invalid JSON ({e.msg})")
+        turns = obj.get('turns') or ([obj['message']] if obj.get('message') else [])
+        if not isinstance(turns, list) or not all(isinstance(t, str) and t.strip() for t in turns) or not turns:
+            raise ValueError(f"line {number}: expected a non-empty 'turns' list or a 'message'")
+        meta = {k: v for k, v in obj.items() if k not in ('id', 'turns', 'message')}
+        items.append({'id': str(obj.get('id', number)), 'turns': turns, 'meta': meta})
+    return items
+
+
+def completed_ids(lines) -> set:
+    """Ids of items already finished successfully in an earlier (partial) output."""
+    done = set()
+    for line in lines:
+        try:
+            result = json.loads(line)
+        except json.JSONDecodeError:
+            continue  # a line cut short by a crash
+        if result.get('status') == 'ok' and 'id' in result:
+            done.add(result['id'])
+    return done
+
+
+async def _run_turn(turn, user_id, session_id, text, retries):
+    """One turn: (response text, tool names). Rate limits are retried while nothing was produced."""
+    from google.genai import types
+    message = types.Content(role="user", parts=[types.Part(text=text)])
+    for attempt in range(retries + 1):
+        response, tools, produced = [], [], False
+        try:
+            async for event in turn(user_id, session_id, message):
+                produced = True
+                if not (getattr(event, 'content', None) and event.content.parts):
+                    continue
+                for part in event.content.parts:
+                    if getattr(part, 'function_call', None):
+                        tools.append(part.function_call.name)
+                    elif getattr(part, 'text', None):
+                        response.append(part.text)
+            return ''.join(response), tools
+        except Exception as e:
+            if produced or attempt == retries or not is_rate_limit(e):
+                raise
+            await asyncio.sleep(retry_after_seconds(e) or 5 * 2 ** attempt)
+
+
+async def run_item(item, turn, session_service, app_name, retries=2) -> dict:
+    """Run all turns of one item in a new session and return its result record."""
+    session_id = f"batch_{uuid.uuid4()}"
+    started = time.time()
+    result = {'id': item['id'], 'status': 'ok', 'turns': []}
+    if item.get('meta'):
+        result['meta'] = item['meta']
+    try:
+        await session_service.create_session(app_name=app_name, user_id=BATCH_USER_ID, session_id=session_id)
+        for text in item['turns']:
+            turn_started = time.perf_counter()
+            response, tools = await _run_turn(turn, BATCH_USER_ID, session_id, text, retries)
+            result['turns'].append({
+                'message': text,
+                'response': response,
+                'tools': tools,
+                'seconds': round(time.perf_counter() - turn_started, 3),
+            })
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    finally:
+        try:
+            await session_service.delete_session(app_name=app_name, user_id=BATCH_USER_ID, session_id=session_id)
+        except Exception as cleanup_error:
+            print(f"Batch session cleanup note: {cleanup_error}")
+    result['started'] = started
+    result['seconds'] = round(time.time() - started, 3)
+    return result
+
+
+async def run_batch(items, turn, session_service, app_name, concurrency=4, retries=2):
+    """Async generator yielding each item's result as soon as it finishes.
+
+    ``turn(user_id, session_id, message)`` runs one agent turn and yields its events
+    (``runner.run_async`` or a wrapper that adds admission control). Rate-limited
+    turns are retried up to ``retries`` times; pass 0 when ``turn`` already retries
+    them itself. Closing the generator early cancels the items still running.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _bounded(item):
+        async with semaphore:
+            return await run_item(item, turn, session_service, app_name, retries)
+
+    tasks = [asyncio.ensure_future(_bounded(item)) for item in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def summarize(results, seconds: float) -> dict:
+    """Throughput and latency summary for a finished (or interrupted) batch."""
+    durations = sorted(r['seconds'] for r in results)
+    turns = sum(len(r['turns']) for r in results)
+
+    def pct(p):
+        return durations[min(len(durations) - 1, int(p * len(durations)))] if durations else 0.0
+
+    return {
+        'items': len(results),
+        'ok': sum(1 for r in results if r['status'] == 'ok'),
+        'errors': sum(1 for r in results if r['status'] != 'ok'),
+        'turns': turns,
+        'seconds': round(seconds, 3),
+        'items_per_minute': round(60 * len(results) / seconds, 2) if seconds else 0.0,
+        'item_seconds_p50': pct(0.50),
+        'item_seconds_p95': pct(0.95),
+    }
@@ -0,0 +1,411 @@
+"""
+Background jobs for long agent runs.
+
+``POST /api/jobs`` returns a job id straight away. The agent turn then runs as
+a task on the worker's shared event loop (see loop.py), so no request thread
+waits on the LLM. Clients poll ``GET /api/jobs/<id>``, or subscribe to its
+event stream, for progress and the final result.
+
+Limits per worker: at most JOBS_MAX_RUNNING jobs run at once and at most
+JOBS_MAX_PENDING are accepted (queued + running). Each client may have
+JOBS_PER_CLIENT unfinished jobs, since its jobs share one conversation.
+Finished jobs are kept for JOBS_RESULT_TTL seconds.
+
+Set JOBS_DB to a SQLite file to mirror jobs there. Any worker on the host can
+then serve status, events and cancellation for a job another worker is running.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOBS_MAX_RUNNING = int(os.getenv('JOBS_MAX_RUNNING', 4))
+JOBS_MAX_PENDING = int(os.getenv('JOBS_MAX_PENDING', 100))
+JOBS_PER_CLIENT = int(os.getenv('JOBS_PER_CLIENT', 1))
+JOBS_RESULT_TTL = int(os.getenv('JOBS_RESULT_TTL', 600))
+JOBS_SWEEP_INTERVAL = float(os.getenv('JOBS_SWEEP_INTERVAL', 2))
+
+# A shared job whose owner hasn't refreshed it for this long is treated as lost
+_HEARTBEAT_TIMEOUT = max(30.0, JOBS_SWEEP_INTERVAL * 10)
+
+_ACTIVE = ('queued', 'running')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    client_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    result TEXT,
+    error TEXT,
+    cancel INTEGER NOT NULL DEFAULT 0,
+    heartbeat REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_client ON jobs (client_id, status);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+class JobRejected(Exception):
+    """A submission refused by the queue or per-client limits; ``status`` is the HTTP code."""
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+
+class JobFailed(Exception):
+    """Raised by a job function to fail with a user-facing message and extra fields."""
+
+    def __init__(self, message: str, **details):
+        super().__init__(message)
+        self.details = details
+
+
+class Job:
+    """One submitted run: status, ordered progress events and the final result or error."""
+
+    def __init__(self, client_id: str):
+        self.id = "job_" + uuid.uuid4().hex
+        self.client_id = client_id
+        self.status = 'queued'
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.events = []  # (seq, event, data)
+        self.result = None
+        self.error = None
+        self.task = None
+        self._changed = asyncio.Event()
+        self._manager = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in _ACTIVE
+
+    def emit(self, event: str, data: dict):
+        """Record a progress event and wake anyone waiting on this job."""
+        seq = len(self.events) + 1
+        self.events.append((seq, event, data))
+        if self._manager is not None:
+            self._manager._persist('add_event', self.id, seq, event, data)
+        self._notify()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def snapshot(self, after: int = 0) -> dict:
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'events': [{'seq': s, 'event': e, 'data': d} for s, e, d in self.events[after:]],
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class JobDB:
+    """SQLite mirror of job state, shared by the workers on a host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def save(self, job_id, client_id, status, created, started, finished, result, error):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, client_id, status, created, started, finished, result, error, heartbeat) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET "
+                "status = excluded.status, started = excluded.started, finished = excluded.finished, "
+                "result = excluded.result, error = excluded.error, heartbeat = excluded.heartbeat",
+                (job_id, client_id, status, created, started, finished,
+                 json.dumps(result, default=str), json.dumps(error), time.time())
+            )
+
+    def add_event(self, job_id, seq, event, data):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO job_events (job_id, seq, event, data) VALUES (?, ?, ?, ?)",
+                (job_id, seq, event, json.dumps(data, default=str))
+            )
+
+    def heartbeat(self, job_ids):
+        """Mark the owner's unfinished jobs as alive; returns the ones with a pending cancel."""
+        if not job_ids:
+            return []
+        marks = ",".join("?" * len(job_ids))
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET heartbeat = ? WHERE id IN ({marks})", (time.time(), *job_ids))
+            rows = self._conn.execute(f"SELECT id FROM jobs WHERE cancel = 1 AND id IN ({marks})", job_ids)
+            return [row[0] for row in rows.fetchall()]
+
+    def load(self, job_id, after=0):
+        rows = self._query(
+            "SELECT client_id, status, created, started, finished, result, error, heartbeat FROM jobs WHERE id = ?",
+            (job_id,)
+        )
+        if not rows:
+            return None
+        client_id, status, created, started, finished, result, error, heartbeat = rows[0]
+        if status in _ACTIVE and time.time() - heartbeat > _HEARTBEAT_TIMEOUT:
+            status, error = 'error', json.dumps({'message': "The worker running this job stopped. Please resubmit."})
+        events = self._query(
+            "SELECT seq, event, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after)
+        )
+        return client_id, {
+            'job_id': job_id,
+            'status': status,
+            'created': created,
+            'started': started,
+            'finished': finished,
+            'events': [{'seq': s, 'event': e, 'data': json.loads(d)} for s, e, d in events],
+            'result': json.loads(result) if result else None,
+            'error': json.loads(error) if error else None,
+        }
+
+    def active_count(self, client_id) -> int:
+        rows = self._query(
+            "SELECT COUNT(*) FROM jobs WHERE client_id = ? AND status IN ('queued', 'running') AND heartbeat > ?",
+            (client_id, time.time() - _HEARTBEAT_TIMEOUT)
+        )
+        return rows[0][0]
+
+    def request_cancel(self, job_id):
+        self._query("UPDATE jobs SET cancel = 1 WHERE id = ?", (job_id,))
+
+    def purge(self, ttl):
+        """Delete finished (or abandoned) jobs older than ``ttl`` seconds."""
+        cutoff = time.time() - ttl
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM job_events WHERE job_id IN (SELECT id FROM jobs WHERE "
+                "(finished IS NOT NULL AND finished < ?) OR heartbeat < ?)", (cutoff, cutoff)
+            )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE (finished IS NOT NULL AND finished < ?) OR heartbeat < ?", (cutoff, cutoff)
+            )
+
+
+class JobManager:
+    """Accepts, runs, tracks and expires jobs. Methods are called on the shared event loop."""
+
+    def __init__(self, max_running: int = JOBS_MAX_RUNNING, max_pending: int = JOBS_MAX_PENDING,
+                 per_client: int = JOBS_PER_CLIENT, result_ttl: float = JOBS_RESULT_TTL,
+                 db_path: str = None):
+        self.max_running = max_running
+        self.max_pending = max_pending
+        self.per_client = per_client
+        self.result_ttl = result_ttl
+        self.db = JobDB(db_path) if db_path else None
+        # One writer thread keeps mirrored writes ordered and off the event loop
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs-db") if self.db else None
+        self._jobs = {}
+        self._semaphore = None
+        self._sweeper = None
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    def _persist(self, method, *args):
+        if self._writer is not None:
+            self._writer.submit(self._safe_write, method, args)
+
+    def _safe_write(self, method, args):
+        try:
+            getattr(self.db, method)(*args)
+        except Exception as e:
+            print(f"[!] Job DB write failed: {e}")
+
+    def _save(self, job):
+        self._persist('save', job.id, job.client_id, job.status, job.created,
+                      job.started, job.finished, job.result, job.error)
+
+    async def submit(self, client_id: str, func, *args) -> Job:
+        """Queue ``func(job, *args)`` (a coroutine function) as a new job for ``client_id``."""
+        self._ensure_sweeper()
+        active = [j for j in self._jobs.values() if j.active]
+        if len(active) >= self.max_pending:
+            self.rejected += 1
+            raise JobRejected("The job queue is full. Please try again shortly.", 503)
+        mine = sum(1 for j in active if j.client_id == client_id)
+        if self.db is not None:
+            mine = max(mine, await asyncio.to_thread(self.db.active_count, client_id))
+        if mine >= self.per_client:
+            self.rejected += 1
+            raise JobRejected(
+                f"You already have {mine} job(s) in progress. Wait for it to finish or cancel it.", 429
+            )
+
+        job = Job(client_id)
+        job._manager = self
+        self._jobs[job.id] = job
+        self.submitted += 1
+        self._save(job)
+        job.task = asyncio.get_running_loop().create_task(self._run(job, func, args))
+        job.task.add_done_callback(lambda task: self._finish_unstarted(job))
+        return job
+
+    def _finish_unstarted(self, job):
+        """Record a job whose task was cancelled before its first step, so ``_run`` never did."""
+        if job.active:
+            job.status = 'cancelled'
+            job.finished = time.time()
+            self.cancelled += 1
+            self._save(job)
+            job._notify()
+
+    async def _run(self, job, func, args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_running)
+        try:
+            async with self._semaphore:
+                job.status = 'running'
+                job.started = time.time()
+                self._save(job)
+                job._notify()
+                job.result = await func(job, *args)
+                job.status = 'done'
+                self.completed += 1
+        except asyncio.CancelledError:
+            job.status = 'cancelled'
+            self.cancelled += 1
+        except JobFailed as e:
+            job.status = 'error'
+            job.error = {'message': str(e), **e.details}
+            self.failed += 1
+        except Exception as e:
+            print(f"[!] Job {job.id} failed: {e}")
+            job.status = 'error'
+            job.error = {'message': "The job failed unexpectedly. Please try again."}
+            self.failed += 1
+        finally:
+            job.finished = time.time()
+            self._save(job)
+            job._notify()
+
+    def _position(self, job) -> int:
+        """1-based place among this worker's queued jobs (0 once running)."""
+        if job.status != 'queued':
+            return 0
+        queued = [j for j in self._jobs.values() if j.status == 'queued']
+        return queued.index(job) + 1
+
+    async def get(self, job_id: str, client_id: str, after: int = 0):
+        """Snapshot of a job owned by ``client_id`` (events after ``after``), or None."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            if job.client_id != client_id:
+                return None
+            return dict(job.snapshot(after), position=self._position(job))
+        if self.db is not None:
+            loaded = await asyncio.to_thread(self.db.load, job_id, after)
+            if loaded and loaded[0] == client_id:
+                return loaded[1]
+        return None
+
+    async def wait(self, job_id: str, client_id: str, after: int = 0, timeout: float = 20.0):
+        """Like ``get``, but waits up to ``timeout`` seconds for new events or a status change."""
+        job = self._jobs.get(job_id)
+        if job is not None and job.client_id == client_id and job.active and len(job.events) <= after:
+            changed = job._changed
+            try:
+                await asyncio.wait_for(changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return await self.get(job_id, client_id, after)
+        if job is None and self.db is not None:
+            # Another worker owns it: poll the shared table
+            deadline = time.monotonic() + timeout
+            while True:
+                snap = await self.get(job_id, client_id, after)
+                if snap is None or snap['events'] or snap['status'] not in _ACTIVE or time.monotonic() >= deadline:
+                    return snap
+                await asyncio.sleep(0.5)
+        return await self.get(job_id, client_id, after)
+
+    async def cancel(self, job_id: str, client_id: str):
+        """Cancel a queued or running job; returns its snapshot, or None if unknown."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            if job.client_id != client_id:
+                return None
+            if job.active:
+                job.task.cancel()
+                await asyncio.wait({job.task}, timeout=5)
+            return await self.get(job_id, client_id)
+        if self.db is not None:
+            snap = await self.get(job_id, client_id)
+            if snap is not None and snap['status'] in _ACTIVE:
+                await asyncio.to_thread(self.db.request_cancel, job_id)
+                snap['status'] = 'cancelling'
+            return snap
+        return None
+
+    def expire(self) -> int:
+        """Forget finished jobs older than the retention TTL."""
+        cutoff = time.time() - self.result_ttl
+        expired = [jid for jid, j in self._jobs.items() if not j.active and j.finished < cutoff]
+        for jid in expired:
+            del self._jobs[jid]
+        return len(expired)
+
+    def _ensure_sweeper(self):
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_forever())
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(JOBS_SWEEP_INTERVAL)
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"[!] Job sweep error: {e}")
+
+    async def sweep(self):
+        """Expire old jobs and, when shared, heartbeat ours and apply cancels requested by other workers."""
+        self.expire()
+        if self.db is not None:
+            active = [jid for jid, j in self._jobs.items() if j.active]
+            for jid in await asyncio.to_thread(self.db.heartbeat, active):
+                self._jobs[jid].task.cancel()
+            await asyncio.to_thread(self.db.purge, self.result_ttl)
+
+    def stats(self) -> dict:
+        return {
+            'queued': sum(1 for j in self._jobs.values() if j.status == 'queued'),
+            'running': sum(1 for j in self._jobs.values() if j.status == 'running'),
+            'retained': sum(1 for j in self._jobs.values() if not j.active),
+            'max_running': self.max_running,
+            'max_pending': self.max_pending,
+            'submitted': self.submitted,
+            'rejected': self.rejected,
+            'completed': self.completed,
+            'failed': self.failed,
+            'cancelled': self.cancelled,
+        }
@@ -0,0 +1,139 @@
+"""
+Long-lived asyncio event loop shared by every request handled in a worker.
+
+Flask handlers are synchronous, so each async route is submitted to one
+background loop running in a daemon thread instead of building (and tearing
+down) a fresh loop per request. Anything that should outlive a single request
+(pooled aiohttp sessions, background refresh tasks, the ADK Runner and its
+session service) lives on this loop.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import queue
+import threading
+
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+_shutdown_hooks = []
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the worker's background loop, starting it on first use.
+
+    The loop is created lazily and per process, so gunicorn workers forked
+    from a preloaded master each get their own loop and thread.
+    """
+    global _loop, _loop_pid
+    with _loop_lock:
+        if _loop is None or _loop.is_closed() or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            thread = threading.Thread(
+                target=_run_forever,
+                args=(_loop,),
+                name="travel-planner-loop",
+                daemon=True,
+            )
+            thread.start()
+            print(f"[*] Started shared event loop in worker {_loop_pid}")
+        return _loop
+
+
+def _run_forever(loop):
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+
+def submit(coro) -> concurrent.futures.Future:
+    """Schedule a coroutine on the shared loop and return a thread-safe future.
+
+    The caller's context variables (Flask's request/app context included) are
+    copied onto the task, so handlers can keep using ``request`` and ``session``.
+    Cancelling the returned future cancels the task on the loop.
+    """
+    ctx = contextvars.copy_context()
+    return asyncio.run_coroutine_threadsafe(_in_context(coro, ctx), get_loop())
+
+
+async def _in_context(coro, ctx):
+    return await asyncio.get_running_loop().create_task(coro, context=ctx)
+
+
+def run_sync(coro, timeout=None):
+    """Run a coroutine on the shared loop and block the calling thread for its result."""
+    future = submit(coro)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
+
+
+def iterate_sync(agen):
+    """Iterate an async generator on the shared loop from a synchronous caller.
+
+    Items are handed over through a queue as soon as the loop produces them,
+    which lets Flask stream responses while the agent is still running. Closing
+    the returned generator early (e.g. the client disconnected) cancels the
+    async side.
+    """
+    items = queue.Queue()
+    end = object()
+
+    async def _pump():
+        try:
+            async for item in agen:
+                items.put((item, None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            items.put((end, e))
+        else:
+            items.put((end, None))
+
+    future = submit(_pump())
+    try:
+        while True:
+            item, error = items.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        future.cancel()
+
+
+def on_shutdown(hook):
+    """Register a coroutine function to await on the loop before it stops."""
+    _shutdown_hooks.append(hook)
+    return hook
+
+
+def shutdown(timeout=5):
+    """Cancel outstanding tasks and stop the shared loop (used on worker exit)."""
+    global _loop
+    with _loop_lock:
+        loop, _loop = _loop, None
+    if loop is None or loop.is_closed():
+        return
+
+    async def _cancel_all():
+        for hook in _shutdown_hooks:
+            try:
+                await hook()
+            except Exception as e:
+                print(f"[!] Shutdown hook {hook.__name__} failed: {e}")
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    try:
+        asyncio.run_coroutine_threadsafe(_cancel_all(), loop).result(timeout)
+    except Exception as e:
+        print(f"[!] Event loop shutdown note: {e}")
+    loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,119 @@
+"""
+Minimal in-process Prometheus metrics (counters and histograms) rendered in
+the text exposition format by the /metrics endpoint. Values are per worker
+process; Prometheus aggregates across workers by instance.
+"""
+import threading
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+_registry = []
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels_text(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name, doc, labels=()):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels_text(self.labels, key)} {value}"
+
+
+class Gauge:
+    """Metric whose value is read from a callback at scrape time.
+
+    ``func`` returns a number, or (with ``labels``) a dict mapping label-value
+    tuples to numbers. Use ``kind="counter"`` for monotonically increasing
+    values kept elsewhere (e.g. cache hit counters).
+    """
+
+    def __init__(self, name, doc, func, labels=(), kind="gauge"):
+        self.name, self.doc, self.func = name, doc, func
+        self.labels, self.kind = tuple(labels), kind
+        _registry.append(self)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} {self.kind}"
+        try:
+            value = self.func()
+        except Exception:
+            return
+        if not self.labels:
+            yield f"{self.name} {value}"
+            return
+        for key, v in sorted(value.items()):
+            yield f"{self.name}{_labels_text(self.labels, key)} {v}"
+
+
+class Histogram:
+    def __init__(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # key -> [bucket counts..., sum, count]
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with _lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} histogram"
+        for key, series in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _labels_text(self.labels + ("le",), key + (bound,))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_bucket{_labels_text(self.labels + ('le',), key + ('+Inf',))} {series[-1]}"
+            yield f"{self.name}_sum{_labels_text(self.labels, key)} {series[-2]}"
+            yield f"{self.name}_count{_labels_text(self.labels, key)} {series[-1]}"
+
+
+def render() -> str:
+    """All registered metrics in Prometheus text format."""
+    with _lock:
+        lines = [line for metric in _registry for line in metric.render()]
+    return "\n".join(lines) + "\n"
+
+
+# Metrics shared across the server
+REQUEST_SECONDS = Histogram("travel_request_seconds", "End-to-end request latency", ["endpoint"])
+RUNNER_EVENTS = Counter("travel_runner_events_total", "Events yielded by the ADK runner", ["agent"])
+LLM_SECONDS = Histogram("travel_llm_call_seconds", "LLM call latency", ["agent", "model"])
+LLM_TOKENS = Counter("travel_llm_tokens_total", "LLM tokens by direction", ["agent", "model", "kind"])
+TOOL_SECONDS = Histogram("travel_tool_call_seconds", "Tool call latency", ["agent", "tool"])
+TOOL_CALLS = Counter("travel_tool_calls_total", "Tool calls by outcome", ["agent", "tool", "outcome"])
+AGENT_ERRORS = Counter("travel_agent_errors_total", "Agent runs that raised", ["kind"])
+ROUTE_SECONDS = Histogram("travel_route_turn_seconds", "Turn latency by route", ["route"])
+ROUTE_TOKENS = Counter("travel_route_tokens_total", "LLM tokens (prompt + output) by route", ["route"])
@@ -0,0 +1,267 @@
+"""
+Response cache for the first turn of a conversation.
+
+Most conversations open with a request like "Plan a 3 day trip to Goa in
+December", and many users send the same one in different words. With
+PLAN_CACHE=1, such a first turn is reduced to a key: the destination and
+origin, resolved to IATA city codes, plus duration, dates, budget tier,
+traveler count, currency, and the remaining content words, sorted. Word order,
+case, punctuation, filler words and place-name spellings don't change the key.
+Anything the extractor doesn't understand stays in the key, so a miss is more
+likely than a wrong hit. Turns with no recognizable destination are not cached.
+
+On a miss, the turn runs normally and its final events are stored. The TTL is
+the shortest freshness of the data its tools returned (a plan built on
+15-minute flight prices lives 15 minutes). Turns where a tool failed are not
+stored. On a hit, the cached events are appended to the new session, so ADK's
+history looks exactly like a normal turn and follow-up questions work. They are
+then returned without calling Gemini or any upstream API.
+
+Follow-up turns are never cached; their answers depend on the conversation.
+"""
+import os
+import re
+import time
+from agents.cache import TTLCache
+from agents.places import get_place_index, normalize
+
+PLAN_CACHE = os.getenv('PLAN_CACHE', '').lower() in ('1', 'true', 'yes', 'on')
+PLAN_CACHE_SIZE = int(os.getenv('PLAN_CACHE_SIZE', 512))
+PLAN_CACHE_MAX_TTL = int(os.getenv('PLAN_CACHE_MAX_TTL', 6 * 3600))
+
+_MONTHS = ('january', 'february', 'march', 'april', 'may', 'june', 'july',
+           'august', 'september', 'october', 'november', 'december')
+# Full names and common abbreviations; group(1)[:3] is the canonical form
+_MONTH_NAMES = '|'.join(sorted({*_MONTHS, *(m[:3] for m in _MONTHS), 'sept'}, key=len, reverse=True))
+_MONTH = re.compile(rf'\b({_MONTH_NAMES})\b')
+_DAY_MONTH = re.compile(rf'\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({_MONTH_NAMES})\b')
+# Not "december 3 days", which is a month and a duration
+_MONTH_DAY = re.compile(rf'\b({_MONTH_NAMES})\s+(\d{{1,2}})(?:st|nd|rd|th)?\b(?!\s*(?:day|night|week))')
+# After normalize: 2025-12-05 is "2025 12 05"; 05/12/2025 (day/month order unknown) is "05 12 2025"
+_ISO_DATE = re.compile(r'\b(\d{4}) (\d{1,2}) (\d{1,2})\b')
+_NUMERIC_DATE = re.compile(r'\b(\d{1,2}) (\d{1,2}) (\d{4})\b')
+# Words whose meaning depends on when they are said
+_RELATIVE = re.compile(r'\b(today|tonight|tomorrow|now|this|next|coming|upcoming)\b')
+_DURATION = re.compile(r'\b(\d+|a|one|two|three|four|five|six|seven)\s*-?\s*(day|night|week)s?\b')
+_WEEKEND = re.compile(r'\b(long\s+)?weekend\b')
+_TRAVELERS = re.compile(r'\b(\d+|one|two|three|four|five|six|seven)\s+(?:people|persons|travell?ers|adults|of us|friends)\b|\btravell?ers\s+(\d+)\b')
+_BUDGET = re.compile(r'\b(budget|cheap|cheapest|affordable|backpack\w*|luxury|luxurious|premium|mid\s*range|midrange)\b')
+_CURRENCY = re.compile(r'\b(inr|usd|eur|gbp|rupees?|dollars?|euros?|pounds?)\b')
+
+_NUMBERS = {'a': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7}
+_BUDGET_TIERS = {'budget': 'budget', 'cheap': 'budget', 'cheapest': 'budget', 'affordable': 'budget',
+                 'luxury': 'luxury', 'luxurious': 'luxury', 'premium': 'luxury'}
+_CURRENCIES = {'rupee': 'INR', 'dollar': 'USD', 'euro': 'EUR', 'pound': 'GBP'}
+
+# Words before a destination / an origin
+_TO = {'to', 'in', 'for', 'visit', 'visiting', 'explore', 'exploring', 'around', 'at', 'of'}
+_FROM = {'from', 'leaving', 'departing'}
+_TRIP = {'trip', 'itinerary', 'travel', 'vacation', 'holiday', 'tour', 'getaway'}
+
+# Words that don't change what is being asked for (including the labels the web UI adds)
+_FILLER = set("""
+a an the to in for of on at from with and or about around into
+i me my we us our you your it this that some any
+please pls kindly can could would will should help want wanna like need love
+plan planning plans make create give show suggest recommend tell find build prepare
+trip trips itinerary travel travelling traveling vacation holiday tour getaway visit visiting
+go going get let lets s d ll m re ve
+day days night nights week weeks weekend long
+travellers travelers people persons adults us friends
+preferences preference date type currency
+""".split())
+
+
+def _count(word):
+    return int(word) if word.isdigit() else _NUMBERS.get(word, 0)
+
+
+def extract(message: str):
+    """Entities and leftover content words of a trip request, or None if it names no destination."""
+    # The web UI's "Budget preference: ..." label is not itself a budget
+    text = normalize(message).replace('budget preference', 'preference')
+    entities = {}
+    consumed = set()  # positions of the words an entity accounts for
+
+    def take(match):
+        start = len(text[:match.start()].split())
+        consumed.update(range(start, start + len(match.group(0).split())))
+
+    dates = []
+    for m in _ISO_DATE.finditer(text):
+        dates.append(f"{m.group(1)}-{int(m.group(2)):02d}-{int(m.group(3)):02d}")
+        take(m)
+    for m in _NUMERIC_DATE.finditer(text):
+        dates.append(f"{int(m.group(1)):02d}/{int(m.group(2)):02d}/{m.group(3)}")
+        take(m)
+    for m in _DAY_MONTH.finditer(text):
+        dates.append(f"{m.group(2)[:3]}-{int(m.group(1)):02d}")
+        take(m)
+    for m in _MONTH_DAY.finditer(text):
+        dates.append(f"{m.group(1)[:3]}-{int(m.group(2)):02d}")
+        take(m)
+    if dates:
+        entities['dates'] = sorted(set(dates))
+    months = sorted({m.group(1)[:3] for m in _MONTH.finditer(text)} - {d[:3] for d in dates})
+    if months:
+        entities['months'] = months
+    for m in _MONTH.finditer(text):
+        take(m)
+    if _RELATIVE.search(text):
+        # "next weekend" is a different trip tomorrow
+        entities['asked_on'] = time.strftime('%Y-%m-%d')
+
+    days = 0
+    for m in _DURATION.finditer(text):
+        n = _count(m.group(1))
+        days = max(days, {'week': n * 7, 'night': n + 1}.get(m.group(2), n))
+        take(m)
+    if not days and (m := _WEEKEND.search(text)):
+        days = 3 if m.group(1) else 2
+        take(m)
+    if days:
+        entities['days'] = days
+
+    if (m := _TRAVELERS.search(text)):
+        entities['travelers'] = _count(m.group(1) or m.group(2))
+        take(m)
+    elif re.search(r'\bsolo\b', text):
+        entities['travelers'] = 1
+    elif re.search(r'\b(couple|honeymoon)\b', text):
+        entities['travelers'] = 2
+
+    tiers = {_BUDGET_TIERS.get(m.group(1), 'mid') for m in _BUDGET.finditer(text)}
+    if tiers:
+        entities['budget'] = sorted(tiers)
+        for m in _BUDGET.finditer(text):
+            take(m)
+
+    currencies = set()
+    for m in _CURRENCY.finditer(text):
+        currencies.add(_CURRENCIES.get(m.group(1).rstrip('s'), m.group(1).upper()))
+        take(m)
+    if currencies:
+        entities['currency'] = sorted(currencies)
+
+    words = text.split()
+    places = []
+    for place, at, end in get_place_index().mentions(text):
+        before = words[at - 1] if at else None
+        after = words[end] if end < len(words) else None
+        if before in _FROM:
+            entities.setdefault('origin', place.city_code)
+        elif before in _TO or (at == 0 and after in _TRIP):
+            entities.setdefault('destination', place.city_code)
+        places.append(place.city_code)
+        consumed.update(range(at, end))
+    if 'destination' not in entities:
+        return None
+    others = [p for p in places if p not in (entities['destination'], entities.get('origin'))]
+    if others:
+        entities['places'] = others
+
+    # Numbers the extractor didn't parse ("family of 4", "in 2026") stay, like any other word
+    entities['words'] = sorted({w for i, w in enumerate(words) if w not in _FILLER and i not in consumed})
+    return entities
+
+
+def _tool_ttl(name, args) -> float:
+    """Seconds the result of one tool call stays fresh; 0 for tools whose freshness is unknown."""
+    from agents.flights import FLIGHT_CACHE_TTL
+    from agents.transport import TRANSIT_CACHE_TTL
+    from agents.weather import WEATHER_CURRENT_TTL, WEATHER_FORECAST_TTL
+    if name == 'resolve_location':
+        return PLAN_CACHE_MAX_TTL
+    if name in ('get_weather', 'get_weather_many'):
+        return WEATHER_FORECAST_TTL if int(args.get('forecast_days') or 1) > 1 else WEATHER_CURRENT_TTL
+    if name in ('search_flights', 'search_flexible_flights', 'search_hotels'):
+        return FLIGHT_CACHE_TTL
+    if name == 'search_ground_transport':
+        return TRANSIT_CACHE_TTL
+    if name == 'gather_trip_data':
+        return min(WEATHER_FORECAST_TTL, FLIGHT_CACHE_TTL, TRANSIT_CACHE_TTL)
+    return 0
+
+
+def _cacheable_ttl(events) -> float:
+    """TTL for a finished turn: its stalest data source, or 0 if a tool failed or nothing was answered."""
+    ttl, answered = PLAN_CACHE_MAX_TTL, False
+    for event in events:
+        for part in (event.content.parts if event.content else None) or []:
+            if getattr(part, 'function_call', None):
+                ttl = min(ttl, _tool_ttl(part.function_call.name, part.function_call.args or {}))
+            elif getattr(part, 'function_response', None):
+                response = part.function_response.response or {}
+                if 'error' in response or response.get('errors') or response.get('failed'):
+                    return 0
+            elif getattr(part, 'text', None) and event.author != 'user':
+                answered = True
+    return ttl if answered else 0
+
+
+class PlanCache:
+    """First-turn response cache in front of the runner (see module docstring)."""
+
+    def __init__(self, session_service, app_name: str, enabled: bool = PLAN_CACHE,
+                 maxsize: int = PLAN_CACHE_SIZE):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.enabled = enabled
+        self._cache = TTLCache(maxsize=maxsize, name="plans")
+        self.stored = 0
+        self.uncacheable = 0
+
+    async def key_for(self, model, user_id, session_id, message):
+        """Cache key for a first turn, or None when the turn can't be served from (or stored in) the cache."""
+        if not self.enabled:
+            return None
+        text = ''.join(p.text or '' for p in message.parts or [])
+        entities = extract(text)
+        if entities is None:
+            self.uncacheable += 1
+            return None
+        from google.adk.sessions.base_session_service import GetSessionConfig
+        session = await self.session_service.get_session(
+            app_name=self.app_name, user_id=user_id, session_id=session_id,
+            config=GetSessionConfig(num_recent_events=1)
+        )
+        if session is None or session.events:
+            return None
+        return (model,) + tuple((k, tuple(v) if isinstance(v, list) else v) for k, v in sorted(entities.items()))
+
+    async def replay(self, key, user_id, session_id, message):
+        """Append a cached turn to the session and return its events, or None on a miss."""
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+        from google.adk.events import Event
+        session = await self.session_service.get_session(
+            app_name=self.app_name, user_id=user_id, session_id=session_id
+        )
+        invocation_id = 'e-' + Event.new_id()
+        await self.session_service.append_event(
+            session, Event(invocation_id=invocation_id, author='user', content=message)
+        )
+        events = []
+        for data in cached:
+            event = Event.model_validate_json(data)
+            event.id = Event.new_id()
+            event.invocation_id = invocation_id
+            event.timestamp = time.time()
+            events.append(await self.session_service.append_event(session, event))
+        return events
+
+    def store(self, key, events):
+        """Keep a finished first turn's final events, if all its data was fetched successfully."""
+        events = [e for e in events if not getattr(e, 'partial', False) and e.content]
+        ttl = _cacheable_ttl(events)
+        if ttl <= 0:
+            self.uncacheable += 1
+            return
+        self._cache.set(key, [e.model_dump_json(exclude_none=True) for e in events], ttl)
+        self.stored += 1
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        stats.update(enabled=self.enabled, stored=self.stored, uncacheable=self.uncacheable)
+        return stats
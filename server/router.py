@@ -0,0 +1,188 @@
+"""
+Per-turn model routing.
+
+With ROUTING=1, each turn is classified before it reaches a runner:
+
+- plan: a conversation's first turn, or a request for a new trip. It goes to
+  the root agent (full instruction, planner model).
+- followup: any other turn in a running conversation ("what about day 2?",
+  "in USD please"). It goes to agents.root.followup_agent, which has a short
+  instruction and the smaller FOLLOWUP_MODEL. Both agents share a name, so the
+  session history reads as one conversation whichever agent answered.
+- lookup: a message that is only a data question, such as "weather in Goa",
+  "5 day forecast for Paris" or "airport code for Bombay". The matching tool is
+  called directly and its result is formatted without an LLM. The call and the
+  answer are appended to the session like a normal turn. If the tool fails, the
+  turn falls back to followup (or plan).
+
+Classification is rule-based and conservative. A lookup must be the whole
+message and name a known place; anything unclear goes to an LLM. Latency and
+tokens per route are exported as travel_route_turn_seconds and
+travel_route_tokens_total.
+"""
+import inspect
+import os
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from agents.places import get_place_index, normalize
+from server import metrics
+from server.plan_cache import extract
+from server.tracing import TOOL_UPSTREAMS, record_upstream
+
+ROUTING = os.getenv('ROUTING', '').lower() in ('1', 'true', 'yes', 'on')
+
+_ASK = r"(?:(?:what s|what is|whats|show|show me|get|tell me|check)\s+)?(?:me\s+)?(?:the\s+)?"
+_WEATHER = re.compile(
+    rf"^{_ASK}(?:current\s+)?(?:weather|temperature)(?:\s+like)?(?:\s+(?:right\s+)?now)?"
+    r"\s+(?:in|at|for)\s+(?P<place>.+?)(?:\s+(?:right\s+now|now|today))?$"
+)
+_FORECAST = re.compile(
+    rf"^{_ASK}(?:(?P<days>\d)\s+day\s+)?(?:weather\s+)?forecast\s+(?:in|at|for)\s+(?P<place>.+?)"
+    r"(?:\s+for\s+(?:the\s+)?next\s+(?P<next>\d)\s+days)?$"
+)
+_CODE = re.compile(rf"^{_ASK}(?:airport|iata|city)\s+codes?\s+(?:for|of)\s+(?P<place>.+)$")
+_NEW_TRIP = re.compile(r'\b(plan|itinerary)\b|\b(new|another|different)\s+(trip|vacation|holiday|getaway)\b')
+
+
+@dataclass(frozen=True)
+class Route:
+    name: str                       # 'plan' | 'followup' | 'lookup'
+    fallback: str = 'plan'          # route to use if a lookup can't be answered directly
+    tool: str = None
+    args: dict = field(default_factory=dict)
+
+
+def _place(text: str):
+    """The Place named by the whole of ``text``, or None."""
+    mentions = get_place_index().mentions(text)
+    if len(mentions) == 1 and mentions[0][1] == 0 and mentions[0][2] == len(text.split()):
+        return mentions[0][0]
+    return None
+
+
+def match_lookup(message: str):
+    """(tool name, args) when the message is only a weather or airport-code question, else None."""
+    text = normalize(message)
+    if (m := _WEATHER.match(text)) and (place := _place(m.group('place'))):
+        return 'get_weather', {'city': place.city}
+    if (m := _FORECAST.match(text)) and (place := _place(m.group('place'))):
+        days = int(m.group('days') or m.group('next') or 5)
+        return 'get_weather', {'city': place.city, 'forecast_days': max(2, min(days, 5))}
+    if (m := _CODE.match(text)) and _place(m.group('place')):
+        return 'resolve_location', {'query': m.group('place')}
+    return None
+
+
+def classify(message: str, has_history: bool) -> Route:
+    """Route for one turn; see the module docstring."""
+    fallback = 'followup' if has_history else 'plan'
+    lookup = match_lookup(message)
+    if lookup is not None:
+        return Route('lookup', fallback, *lookup)
+    if not has_history:
+        return Route('plan')
+    entities = extract(message)
+    new_trip = entities is not None and (
+        _NEW_TRIP.search(normalize(message)) or {'days', 'dates', 'months'} & entities.keys()
+    )
+    if new_trip:
+        return Route('plan')
+    return Route('followup', 'followup')
+
+
+def _table(result: dict, headers: list) -> str:
+    lines = ["| " + " | ".join(headers) + " |", "|" + "---|" * len(headers)]
+    for row in result['rows']:
+        lines.append("| " + " | ".join('' if v is None else str(v) for v in row) + " |")
+    return "\n".join(lines)
+
+
+def format_lookup(tool: str, result: dict) -> str:
+    """Markdown answer for a lookup tool's result."""
+    if tool == 'resolve_location':
+        return (f"### Codes for {result.get('query', '')}\n\n"
+                + _table(result, ['Code', 'Airport', 'City', 'City code (hotels)', 'Country']))
+    if 'rows' in result:
+        rows = dict(result, rows=[[d, f"{lo}°C", f"{hi}°C", f"{pop}%", desc]
+                                  for d, lo, hi, _, pop, desc in result['rows']])
+        return (f"### {result.get('city', '')} - {len(rows['rows'])}-day forecast\n\n"
+                + _table(rows, ['Date', 'Low', 'High', 'Rain', 'Conditions']))
+    return (f"**{result.get('city', '')}** right now: {round(result['temp'])}°C "
+            f"(feels like {round(result['feels_like'])}°C), {result['desc']}, humidity {result['humidity']}%.")
+
+
+def _lookup_tools() -> dict:
+    from agents.places import resolve_location
+    from agents.weather import get_weather
+    return {'get_weather': get_weather, 'resolve_location': resolve_location}
+
+
+class Router:
+    """Classifies turns and answers lookups directly (see module docstring)."""
+
+    def __init__(self, session_service, app_name: str, enabled: bool = ROUTING):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.enabled = enabled
+        self.routes = Counter()
+        self.fallbacks = 0
+
+    async def route(self, user_id, session_id, message) -> Route:
+        if not self.enabled:
+            return Route('plan')
+        from google.adk.sessions.base_session_service import GetSessionConfig
+        session = await self.session_service.get_session(
+            app_name=self.app_name, user_id=user_id, session_id=session_id,
+            config=GetSessionConfig(num_recent_events=1)
+        )
+        text = ''.join(p.text or '' for p in message.parts or [])
+        return classify(text, bool(session and session.events))
+
+    async def answer(self, route: Route, author: str, user_id, session_id, message):
+        """Run a lookup's tool and append the exchange to the session; None if the tool failed."""
+        from google.adk.events import Event
+        from google.genai import types
+        tool = _lookup_tools()[route.tool]
+        started = time.perf_counter()
+        result = tool(**route.args)
+        if inspect.isawaitable(result):
+            result = await result
+        failed = 'error' in result
+        metrics.TOOL_SECONDS.observe(time.perf_counter() - started, agent='router', tool=route.tool)
+        metrics.TOOL_CALLS.inc(agent='router', tool=route.tool, outcome='error' if failed else 'ok')
+        if route.tool in TOOL_UPSTREAMS:
+            record_upstream(TOOL_UPSTREAMS[route.tool], not failed, result.get('error') if failed else None)
+        if failed:
+            self.fallbacks += 1
+            return None
+
+        session = await self.session_service.get_session(
+            app_name=self.app_name, user_id=user_id, session_id=session_id
+        )
+        invocation_id = 'e-' + Event.new_id()
+        call_id = 'router-' + uuid.uuid4().hex[:12]
+        contents = [
+            ('user', message),
+            (author, types.Content(role='model', parts=[types.Part(
+                function_call=types.FunctionCall(id=call_id, name=route.tool, args=route.args))])),
+            (author, types.Content(role='user', parts=[types.Part(
+                function_response=types.FunctionResponse(id=call_id, name=route.tool, response=result))])),
+            (author, types.Content(role='model', parts=[types.Part(text=format_lookup(route.tool, result))])),
+        ]
+        events = []
+        for event_author, content in contents:
+            event = Event(invocation_id=invocation_id, author=event_author, content=content)
+            events.append(await self.session_service.append_event(session, event))
+        return events[1:]
+
+    def observe(self, route: str, seconds: float, tokens: int):
+        """Count a finished turn under its route."""
+        self.routes[route] += 1
+        metrics.ROUTE_SECONDS.observe(seconds, route=route)
+        metrics.ROUTE_TOKENS.inc(tokens, route=route)
+
+    def stats(self) -> dict:
+        return {'enabled': self.enabled, 'routes': dict(self.routes), 'lookup_fallbacks': self.fallbacks}
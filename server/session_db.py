@@ -0,0 +1,257 @@
+"""
+SQLite-backed ADK session service, so conversations survive restarts and can
+be served by any worker on the host (no sticky routing needed).
+
+Events are append-only rows written in batches; session state is stored as a
+JSON snapshot per session. History is only read when asked for, and
+``GetSessionConfig`` (``num_recent_events`` / ``after_timestamp``) is pushed
+down into SQL so callers can load just the tail.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+SESSION_DB_BATCH_SIZE = int(os.getenv('SESSION_DB_BATCH_SIZE', 32))
+SESSION_DB_FLUSH_INTERVAL = float(os.getenv('SESSION_DB_FLUSH_INTERVAL', 0.05))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT '{}',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id)
+);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    author TEXT,
+    timestamp REAL NOT NULL,
+    size INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_session ON events (app_name, user_id, session_id, seq);
+"""
+
+_SESSION_KEY = "app_name = ? AND user_id = ? AND session_id = ?"
+
+
+class SQLiteSessionService(BaseSessionService):
+    """ADK session service persisting sessions and events to a SQLite file."""
+
+    # Sessions are shared with other workers, so local eviction must not delete them
+    persistent = True
+
+    def __init__(self, path: str, batch_size: int = SESSION_DB_BATCH_SIZE,
+                 flush_interval: float = SESSION_DB_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._db_lock = threading.Lock()
+        self._pending_events = []
+        self._pending_state = {}  # (app, user, session) -> (state json, updated_at)
+        self._flush_lock = None
+        self._flush_handle = None
+
+    # -- low-level helpers (run on a worker thread) -------------------------
+
+    def _query(self, sql, params=()):
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _execute(self, sql, params=()):
+        with self._db_lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def _transaction(self, work):
+        """Run ``work()`` (statements on self._conn) atomically; returns its result."""
+        with self._db_lock:
+            self._conn.execute("BEGIN")
+            try:
+                result = work()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return result
+
+    def _write_batch(self, events, states):
+        def work():
+            self._conn.executemany(
+                "INSERT INTO events (app_name, user_id, session_id, author, timestamp, size, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", events
+            )
+            self._conn.executemany(
+                f"UPDATE sessions SET state = ?, updated_at = ? WHERE {_SESSION_KEY}",
+                [(state, ts) + key for key, (state, ts) in states.items()]
+            )
+        self._transaction(work)
+
+    # -- batching ----------------------------------------------------------
+
+    async def flush(self):
+        """Write buffered events and state snapshots in one transaction."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending_events and not self._pending_state:
+                return
+            events, self._pending_events = self._pending_events, []
+            states, self._pending_state = self._pending_state, {}
+            await asyncio.to_thread(self._write_batch, events, states)
+
+    def _schedule_flush(self):
+        if self._flush_handle is None or self._flush_handle.done():
+            async def _delayed():
+                await asyncio.sleep(self.flush_interval)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    print(f"[!] Session DB flush failed: {e}")
+            self._flush_handle = asyncio.get_running_loop().create_task(_delayed())
+
+    # -- BaseSessionService ------------------------------------------------
+
+    async def create_session(self, *, app_name, user_id, state=None, session_id=None):
+        session_id = session_id or str(uuid.uuid4())
+        now = time.time()
+        state = state or {}
+        try:
+            await asyncio.to_thread(
+                self._execute,
+                "INSERT INTO sessions (app_name, user_id, session_id, state, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (app_name, user_id, session_id, json.dumps(state), now, now)
+            )
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Session {session_id} already exists.")
+        return Session(id=session_id, app_name=app_name, user_id=user_id,
+                       state=state, events=[], last_update_time=now)
+
+    async def get_session(self, *, app_name, user_id, session_id, config: GetSessionConfig = None):
+        await self.flush()
+        key = (app_name, user_id, session_id)
+        rows = await asyncio.to_thread(
+            self._query, f"SELECT state, updated_at FROM sessions WHERE {_SESSION_KEY}", key)
+        if not rows:
+            return None
+        state, updated_at = rows[0]
+
+        sql = f"SELECT data FROM events WHERE {_SESSION_KEY}"
+        params = key
+        if config and config.after_timestamp:
+            sql += " AND timestamp >= ?"
+            params += (config.after_timestamp,)
+        if config and config.num_recent_events:
+            sql = f"SELECT data FROM ({sql.replace('SELECT data', 'SELECT seq, data')} " \
+                  f"ORDER BY seq DESC LIMIT ?) ORDER BY seq"
+            params += (config.num_recent_events,)
+        else:
+            sql += " ORDER BY seq"
+        event_rows = await asyncio.to_thread(self._query, sql, params)
+
+        return Session(
+            id=session_id, app_name=app_name, user_id=user_id,
+            state=json.loads(state),
+            events=[Event.model_validate_json(data) for (data,) in event_rows],
+            last_update_time=updated_at
+        )
+
+    async def list_sessions(self, *, app_name, user_id):
+        await self.flush()
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT session_id, state, updated_at FROM sessions WHERE app_name = ? AND user_id = ?",
+            (app_name, user_id)
+        )
+        return ListSessionsResponse(sessions=[
+            Session(id=sid, app_name=app_name, user_id=user_id,
+                    state=json.loads(state), events=[], last_update_time=updated_at)
+            for sid, state, updated_at in rows
+        ])
+
+    async def delete_session(self, *, app_name, user_id, session_id):
+        await self.flush()
+        key = (app_name, user_id, session_id)
+
+        def work():
+            self._conn.execute(f"DELETE FROM events WHERE {_SESSION_KEY}", key)
+            self._conn.execute(f"DELETE FROM sessions WHERE {_SESSION_KEY}", key)
+        await asyncio.to_thread(self._transaction, work)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session, event)
+        if event.partial:
+            return event
+        data = event.model_dump_json(exclude_none=True)
+        key = (session.app_name, session.user_id, session.id)
+        self._pending_events.append(key + (event.author, event.timestamp, len(data), data))
+        state = {k: v for k, v in session.state.items() if not k.startswith('temp:')}
+        self._pending_state[key] = (json.dumps(state), event.timestamp)
+        if len(self._pending_events) >= self.batch_size:
+            await self.flush()
+        else:
+            self._schedule_flush()
+        return event
+
+    # -- hooks used by server.sessions.SessionStore -------------------------
+
+    async def event_sizes(self, app_name, user_id, session_id):
+        """(author, size) for each stored event, oldest first, without loading payloads."""
+        await self.flush()
+        return await asyncio.to_thread(
+            self._query,
+            f"SELECT author, size FROM events WHERE {_SESSION_KEY} ORDER BY seq",
+            (app_name, user_id, session_id)
+        )
+
+    async def trim_events(self, app_name, user_id, session_id, drop):
+        """Delete the oldest ``drop`` events of a session."""
+        await self.flush()
+        key = (app_name, user_id, session_id)
+        await asyncio.to_thread(
+            self._execute,
+            f"DELETE FROM events WHERE seq IN "
+            f"(SELECT seq FROM events WHERE {_SESSION_KEY} ORDER BY seq LIMIT ?)",
+            key + (drop,)
+        )
+
+    async def purge_idle(self, idle_ttl):
+        """Delete sessions (and their events) not updated for ``idle_ttl`` seconds."""
+        await self.flush()
+        cutoff = time.time() - idle_ttl
+
+        def _purge():
+            self._conn.execute(
+                "DELETE FROM events WHERE (app_name, user_id, session_id) IN "
+                "(SELECT app_name, user_id, session_id FROM sessions WHERE updated_at < ?)",
+                (cutoff,)
+            )
+            return self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+
+        return await asyncio.to_thread(self._transaction, _purge)
+
+
+def create_session_service():
+    """SQLite-backed sessions when SESSION_DB is set, in-memory otherwise."""
+    path = os.getenv('SESSION_DB')
+    if path:
+        print(f"[*] Using persistent sessions at {path}")
+        return SQLiteSessionService(path)
+    return InMemorySessionService()
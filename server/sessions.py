@@ -0,0 +1,268 @@
+"""
+Bounded store mapping browser clients to ADK sessions.
+
+Replaces the unbounded ``active_sessions`` dict: sessions expire after an idle
+TTL, the number of live sessions is capped (least recently used are evicted
+first), and each session's event history is trimmed to an event-count and
+byte budget. Evicted sessions are also deleted from the ADK session service,
+unless it is persistent and shared with other workers (see session_db.py).
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+SESSION_IDLE_TTL = int(os.getenv('SESSION_IDLE_TTL', 3600))
+SESSION_MAX = int(os.getenv('SESSION_MAX', 1000))
+SESSION_MAX_EVENTS = int(os.getenv('SESSION_MAX_EVENTS', 200))
+SESSION_MAX_BYTES = int(os.getenv('SESSION_MAX_BYTES', 512 * 1024))
+SESSION_SWEEP_INTERVAL = int(os.getenv('SESSION_SWEEP_INTERVAL', 60))
+
+
+def _event_size(event) -> int:
+    """Approximate memory held by one ADK event (its JSON size)."""
+    try:
+        return len(event.model_dump_json(exclude_none=True))
+    except Exception:
+        return len(str(event))
+
+
+class LazySessionService:
+    """The app's ADK session service, created on first use so importing the app doesn't load the ADK.
+
+    ``persistent`` is known up front (SESSION_DB is set); any other attribute is
+    looked up on the real service from session_db.create_session_service().
+    """
+
+    def __init__(self):
+        self.persistent = bool(os.getenv('SESSION_DB'))
+        self._service = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """The real service (pass this to the Runner, which checks its type)."""
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    from server import startup
+                    from server.session_db import create_session_service
+                    with startup.timed('session_service'):
+                        self._service = create_session_service()
+        return self._service
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+class SessionStore:
+    """LRU + idle-TTL store of ``client_id -> {'user_id', 'session_id', ...}``.
+
+    All methods are meant to be called from the worker's shared event loop.
+    """
+
+    def __init__(self, session_service, app_name: str,
+                 max_sessions: int = SESSION_MAX, idle_ttl: float = SESSION_IDLE_TTL,
+                 max_events: int = SESSION_MAX_EVENTS, max_bytes: int = SESSION_MAX_BYTES):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.persistent = getattr(session_service, 'persistent', False)
+        self._entries = OrderedDict()
+        self._sweeper = None
+        self.evicted = 0
+        self.expired = 0
+        self.trimmed_events = 0
+
+    def __contains__(self, client_id):
+        return self.get(client_id) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, client_id):
+        """Return the live entry for a client (refreshing its idle timer), or None."""
+        entry = self._entries.get(client_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry['last_seen'] > self.idle_ttl:
+            return None
+        entry['last_seen'] = time.monotonic()
+        self._entries.move_to_end(client_id)
+        return entry
+
+    async def create(self, client_id, user_id, session_id):
+        """Create the ADK session and register it, evicting the LRU sessions if full."""
+        await self.session_service.create_session(
+            app_name=self.app_name,
+            user_id=user_id,
+            session_id=session_id
+        )
+        return await self._register(client_id, user_id, session_id)
+
+    async def adopt(self, client_id, user_id, session_id):
+        """Register a session created elsewhere (e.g. by another worker), if it still exists.
+
+        Only persistent services are shared between workers; with an in-memory
+        service this store is the only authority, so nothing is adopted.
+        """
+        if not self.persistent:
+            return None
+        from google.adk.sessions.base_session_service import GetSessionConfig
+        existing = await self.session_service.get_session(
+            app_name=self.app_name,
+            user_id=user_id,
+            session_id=session_id,
+            config=GetSessionConfig(num_recent_events=1)
+        )
+        if existing is None:
+            return None
+        return await self._register(client_id, user_id, session_id)
+
+    async def _register(self, client_id, user_id, session_id):
+        self._ensure_sweeper()
+        previous = self._entries.pop(client_id, None)
+        if previous is not None and previous['session_id'] != session_id:
+            self.expired += 1
+            await self._delete(previous)
+        self._entries[client_id] = {
+            'user_id': user_id,
+            'session_id': session_id,
+            'last_seen': time.monotonic(),
+            'sizes': [],
+            'bytes': 0,
+        }
+        self._entries.move_to_end(client_id)
+        while len(self._entries) > self.max_sessions:
+            old_client, old_entry = self._entries.popitem(last=False)
+            self.evicted += 1
+            await self._delete(old_entry)
+        return self._entries[client_id]
+
+    async def remove(self, client_id):
+        """Forget a client and delete its ADK session."""
+        entry = self._entries.pop(client_id, None)
+        if entry is not None:
+            await self._delete(entry)
+        return entry
+
+    async def expire_idle(self):
+        """Drop every session idle for longer than the TTL."""
+        cutoff = time.monotonic() - self.idle_ttl
+        stale = [cid for cid, e in self._entries.items() if e['last_seen'] < cutoff]
+        for client_id in stale:
+            entry = self._entries.pop(client_id)
+            self.expired += 1
+            await self._delete(entry)
+        return len(stale)
+
+    async def enforce_limits(self, client_id):
+        """After a turn, trim the session's oldest events to the count/byte budget."""
+        entry = self._entries.get(client_id)
+        if entry is None:
+            return
+        events = await self._event_sizes(entry)
+        if events is None:
+            return
+
+        sizes = [size for _, size in events]
+        total = sum(sizes)
+        drop = 0
+        while drop < len(events) and (len(events) - drop > self.max_events or total > self.max_bytes):
+            total -= sizes[drop]
+            drop += 1
+        # Never start the kept history in the middle of a turn (e.g. on a tool response)
+        while drop and drop < len(events) and events[drop][0] != 'user':
+            total -= sizes[drop]
+            drop += 1
+
+        if drop:
+            await self._trim(entry, drop)
+            self.trimmed_events += drop
+        entry['sizes'] = entry['sizes'][drop:]
+        entry['bytes'] = total
+
+    async def _event_sizes(self, entry):
+        """``(author, size)`` for each stored event, oldest first, or None if unknown."""
+        if hasattr(self.session_service, 'event_sizes'):
+            return await self.session_service.event_sizes(
+                self.app_name, entry['user_id'], entry['session_id'])
+        events = self._stored_events(entry)
+        if events is None:
+            return None
+        # Only size events appended since the last turn
+        sizes = entry['sizes'][:len(events)]
+        sizes += [_event_size(e) for e in events[len(sizes):]]
+        entry['sizes'] = sizes
+        return [(getattr(e, 'author', 'user'), size) for e, size in zip(events, sizes)]
+
+    def _stored_events(self, entry):
+        """The live event list held by an in-memory session service, or None if the session is gone.
+
+        InMemorySessionService keeps sessions[app_name][user_id][session_id].events.
+        That is an ADK internal, so a service without that layout (and without
+        event_sizes/trim_events) raises instead of silently skipping the budget.
+        """
+        sessions = getattr(self.session_service, 'sessions', None)
+        if not isinstance(sessions, dict):
+            raise TypeError(f"{type(self.session_service).__name__} has no sessions dict or event_sizes/"
+                            "trim_events; session history budgets can't be enforced")
+        session = sessions.get(self.app_name, {}).get(entry['user_id'], {}).get(entry['session_id'])
+        if session is None:
+            return None
+        events = getattr(session, 'events', None)
+        if not isinstance(events, list):
+            raise TypeError(f"Stored {type(session).__name__} has no events list; "
+                            "session history budgets can't be enforced")
+        return events
+
+    async def _trim(self, entry, drop):
+        if hasattr(self.session_service, 'trim_events'):
+            await self.session_service.trim_events(
+                self.app_name, entry['user_id'], entry['session_id'], drop)
+        else:
+            del self._stored_events(entry)[:drop]
+
+    async def _delete(self, entry):
+        # A persistent service shares sessions with other workers; only its own
+        # idle purge (see _sweep_forever) may delete them.
+        if self.persistent:
+            return
+        try:
+            await self.session_service.delete_session(
+                app_name=self.app_name,
+                user_id=entry['user_id'],
+                session_id=entry['session_id']
+            )
+        except Exception as cleanup_error:
+            print(f"Session cleanup note: {cleanup_error}")
+
+    def _ensure_sweeper(self):
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_forever())
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+            try:
+                expired = await self.expire_idle()
+                if hasattr(self.session_service, 'purge_idle'):
+                    expired += await self.session_service.purge_idle(self.idle_ttl)
+                if expired:
+                    print(f"[*] Expired {expired} idle session(s), {len(self)} live")
+            except Exception as e:
+                print(f"[!] Session sweep error: {e}")
+
+    def stats(self) -> dict:
+        """Gauges for sizing instances: live sessions and approximate bytes held."""
+        return {
+            'live_sessions': len(self._entries),
+            'max_sessions': self.max_sessions,
+            'approx_bytes': sum(e['bytes'] for e in self._entries.values()),
+            'evicted': self.evicted,
+            'expired': self.expired,
+            'trimmed_events': self.trimmed_events,
+        }
@@ -0,0 +1,184 @@
+"""
+Cold-start accounting and warm-up.
+
+``timed(name)`` records how long one initialization step took. With
+STARTUP_REPORT=1, every module import is timed too. The timing is self time,
+without the nested imports, as in ``python -X importtime``, so ``report()``
+shows which packages a cold start pays for. Import this module before anything
+heavy so those imports are counted.
+
+``warm_up()`` pays the first request's costs before the worker takes traffic
+(WARMUP=1):
+- Amadeus OAuth
+- the upstream connection pool
+- the place index and the transit timetable index
+- optionally, current weather for WARMUP_CITIES
+
+Every step is best-effort; failures are reported, never raised.
+"""
+import asyncio
+import importlib.abc
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+STARTUP_REPORT = os.getenv('STARTUP_REPORT', '').lower() in ('1', 'true', 'yes', 'on')
+WARMUP = os.getenv('WARMUP', '').lower() in ('1', 'true', 'yes', 'on')
+WARMUP_CITIES = [c.strip() for c in os.getenv('WARMUP_CITIES', '').split(',') if c.strip()]
+WARMUP_TIMEOUT = float(os.getenv('WARMUP_TIMEOUT', 20))
+
+_started = time.perf_counter()
+_steps = {}     # step name -> seconds
+_imports = {}   # module name -> seconds spent executing it, excluding nested imports
+_lock = threading.Lock()
+
+
+@contextmanager
+def timed(name: str):
+    """Record the duration of an initialization step."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            _steps[name] = _steps.get(name, 0.0) + time.perf_counter() - start
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """Wraps a module's loader for its one ``exec_module`` call."""
+
+    def __init__(self, loader, timer):
+        self.loader = loader
+        self.timer = timer
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Hand the module back its real loader before any of its code runs
+        module.__spec__.loader = module.__loader__ = self.loader
+        self.timer.run(module.__spec__.name, self.loader.exec_module, module)
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """First meta path entry: finds specs through the other finders and times their loading."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            find = getattr(finder, 'find_spec', None)
+            if finder is self or find is None:
+                continue
+            spec = find(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def run(self, name, exec_module, module):
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with _lock:
+                _imports[name] = elapsed - nested
+
+
+if STARTUP_REPORT and not any(isinstance(f, _ImportTimer) for f in sys.meta_path):
+    sys.meta_path.insert(0, _ImportTimer())
+
+
+def report(top: int = 15) -> dict:
+    """Startup cost so far: initialization steps, and imports by package and module (STARTUP_REPORT=1)."""
+    with _lock:
+        steps = dict(_steps)
+        imports = dict(_imports)
+    packages = {}
+    for name, seconds in imports.items():
+        root = name.split('.')[0]
+        packages[root] = packages.get(root, 0.0) + seconds
+
+    def ranked(d):
+        return {k: round(v, 4) for k, v in sorted(d.items(), key=lambda kv: -kv[1])[:top]}
+
+    result = {
+        'seconds_since_import': round(time.perf_counter() - _started, 3),
+        'steps': {k: round(v, 4) for k, v in steps.items()},
+    }
+    if imports:
+        result['import_seconds'] = round(sum(imports.values()), 4)
+        result['imports_by_package'] = ranked(packages)
+        result['slowest_modules'] = ranked(imports)
+    return result
+
+
+def print_report():
+    data = report()
+    print(f"[*] Startup: {data['seconds_since_import']}s since server.startup was imported")
+    for name, seconds in data['steps'].items():
+        print(f"    {seconds:8.3f}s  {name}")
+    if 'imports_by_package' in data:
+        print(f"    imports: {data['import_seconds']}s total (self time)")
+        for name, seconds in data['imports_by_package'].items():
+            print(f"    {seconds:8.3f}s  import {name}")
+
+
+async def warm_up(cities=None) -> dict:
+    """Run the warm-up steps concurrently; returns {step: 'ok' | 'skipped' | error}."""
+    from agents.http import get_http_session
+    from agents.places import get_place_index
+    from agents.transit import TRANSIT_FEEDS, get_transit_index
+    from agents.cassette import replaying
+    from agents.utils import authenticate_amadeus
+    from agents.weather import OPENWEATHER_BASE_URL, get_weather
+
+    cities = WARMUP_CITIES if cities is None else cities
+
+    async def amadeus():
+        if not (os.getenv('AMADEUS_CLIENT_ID') and os.getenv('AMADEUS_CLIENT_SECRET') or replaying()):
+            return 'skipped'
+        await authenticate_amadeus()
+
+    async def http_pool():
+        # Any response will do: the point is a resolved, TLS-established keep-alive connection
+        async with get_http_session().head(OPENWEATHER_BASE_URL):
+            pass
+
+    async def places():
+        await asyncio.to_thread(get_place_index)
+
+    async def transit():
+        if not TRANSIT_FEEDS:
+            return 'skipped'
+        await asyncio.to_thread(get_transit_index)
+
+    async def weather_cache():
+        if not (cities and (os.getenv('OPENWEATHER_API_KEY') or replaying())):
+            return 'skipped'
+        failed = [r['error'] for r in await asyncio.gather(*(get_weather(c) for c in cities)) if 'error' in r]
+        if failed:
+            raise RuntimeError("; ".join(failed))
+
+    async def run(name, step):
+        with timed(f"warmup.{name}"):
+            try:
+                return name, await step() or 'ok'
+            except Exception as e:
+                return name, f"failed: {e}"
+
+    steps = {'amadeus': amadeus, 'http_pool': http_pool, 'places': places, 'transit': transit,
+             'weather_cache': weather_cache}
+    return dict(await asyncio.gather(*(run(name, step) for name, step in steps.items())))
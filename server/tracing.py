@@ -0,0 +1,269 @@
+"""
+Per-request tracing for agent turns.
+
+Each request gets a span tree: runner events, LLM calls (with prompt/output
+token counts) and tool calls (with latency and outcome). Spans feed the
+Prometheus metrics in server/metrics.py and, when TRACE_FILE is set, each
+finished trace is appended to that file as one JSON line for offline
+profiling. LLM and tool spans are collected through ADK agent callbacks
+installed by ``instrument()``.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from server import metrics
+
+TRACE_FILE = os.getenv('TRACE_FILE')
+
+_current_trace = ContextVar('current_trace', default=None)
+_dump_lock = threading.Lock()
+
+# Which upstream each tool depends on, for the readiness probe
+TOOL_UPSTREAMS = {
+    'get_weather': 'openweather',
+    'get_weather_many': 'openweather',
+    'search_flights': 'amadeus',
+    'search_flexible_flights': 'amadeus',
+    'search_hotels': 'amadeus',
+}
+
+# gather_trip_data returns one structured section per source
+TRIP_SECTION_UPSTREAMS = {
+    'weather': 'openweather',
+    'flights': 'amadeus',
+    'hotels': 'amadeus',
+}
+
+# Tools report failures in their result rather than raising: an 'error' key
+# for structured results, or one of these phrases for plain text
+_ERROR_MARKERS = ("error", "failed", "could not", "timed out", "unavailable", "issue", "invalid")
+
+upstream_status = {
+    name: {'last_ok': None, 'last_error': None, 'error': None}
+    for name in ('gemini', 'amadeus', 'openweather')
+}
+
+
+def record_upstream(name, ok, error=None):
+    """Remember the latest success/failure seen for an upstream API."""
+    status = upstream_status.setdefault(name, {'last_ok': None, 'last_error': None, 'error': None})
+    if ok:
+        status['last_ok'] = time.time()
+    else:
+        status['last_error'] = time.time()
+        status['error'] = str(error)[:200] if error else None
+
+
+class Span:
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+
+    def child(self, name, **attrs):
+        span = Span(name, **attrs)
+        self.children.append(span)
+        return span
+
+    def finish(self, **attrs):
+        self.attrs.update(attrs)
+        if self.end is None:
+            self.end = time.perf_counter()
+        return self.end - self.start
+
+    @property
+    def duration(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    def to_dict(self, origin):
+        return {
+            'name': self.name,
+            'start_ms': round((self.start - origin) * 1000, 2),
+            'duration_ms': round(self.duration * 1000, 2),
+            'attrs': self.attrs,
+            'children': [c.to_dict(origin) for c in self.children],
+        }
+
+
+class Trace:
+    def __init__(self, name, **attrs):
+        self.trace_id = uuid.uuid4().hex
+        self.timestamp = time.time()
+        self.root = Span(name, **attrs)
+        self.open = {}  # (kind, key) -> Span started by a "before" callback
+
+    def to_dict(self):
+        return {'trace_id': self.trace_id, 'timestamp': self.timestamp,
+                **self.root.to_dict(self.root.start)}
+
+
+@contextmanager
+def trace(name, **attrs):
+    """Trace one request; spans recorded while it is active attach to it."""
+    current = Trace(name, **attrs)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.root.attrs['error'] = str(e)
+        raise
+    finally:
+        _current_trace.reset(token)
+        duration = current.root.finish()
+        metrics.REQUEST_SECONDS.observe(duration, endpoint=name)
+        _dump(current)
+
+
+def record_event(event):
+    """Add a runner event to the current trace."""
+    author = getattr(event, 'author', None) or 'unknown'
+    metrics.RUNNER_EVENTS.inc(agent=author)
+    current = _current_trace.get()
+    if current is not None:
+        current.root.child('event', author=author, partial=bool(getattr(event, 'partial', False))).finish()
+
+
+def _dump(current):
+    path = TRACE_FILE
+    if not path:
+        return
+    try:
+        line = json.dumps(current.to_dict(), default=str)
+        with _dump_lock, open(path, 'a') as f:
+            f.write(line + "\n")
+    except Exception as e:
+        print(f"[!] Trace dump failed: {e}")
+
+
+# -- ADK callbacks ---------------------------------------------------------
+
+def _start(kind, key, **attrs):
+    current = _current_trace.get()
+    if current is not None:
+        current.open[(kind, key)] = current.root.child(kind, **attrs)
+
+
+def _finish(kind, key):
+    current = _current_trace.get()
+    if current is None:
+        return None
+    return current.open.pop((kind, key), None)
+
+
+def before_model(callback_context, llm_request):
+    agent = callback_context.agent_name
+    _start('llm', agent, agent=agent, model=getattr(llm_request, 'model', None) or 'unknown')
+    return None
+
+
+def after_model(callback_context, llm_response):
+    # Streaming yields partial responses first; the call ends with the final one
+    if getattr(llm_response, 'partial', False):
+        return None
+    agent = callback_context.agent_name
+    span = _finish('llm', agent)
+    usage = getattr(llm_response, 'usage_metadata', None)
+    prompt_tokens = (getattr(usage, 'prompt_token_count', None) or 0) if usage else 0
+    output_tokens = (getattr(usage, 'candidates_token_count', None) or 0) if usage else 0
+    model = span.attrs.get('model', 'unknown') if span else 'unknown'
+    if span is not None:
+        duration = span.finish(prompt_tokens=prompt_tokens, output_tokens=output_tokens)
+        metrics.LLM_SECONDS.observe(duration, agent=agent, model=model)
+    metrics.LLM_TOKENS.inc(prompt_tokens, agent=agent, model=model, kind='prompt')
+    metrics.LLM_TOKENS.inc(output_tokens, agent=agent, model=model, kind='output')
+    if getattr(llm_response, 'error_code', None):
+        record_upstream('gemini', False, getattr(llm_response, 'error_message', None) or llm_response.error_code)
+    else:
+        record_upstream('gemini', True)
+    return None
+
+
+def _tool_key(tool, tool_context):
+    return getattr(tool_context, 'function_call_id', None) or tool.name
+
+
+def before_tool(tool, args, tool_context):
+    _start('tool', _tool_key(tool, tool_context), tool=tool.name,
+           agent=getattr(tool_context, 'agent_name', 'unknown'))
+    return None
+
+
+def after_tool(tool, args, tool_context, tool_response):
+    text = tool_response if isinstance(tool_response, str) else json.dumps(tool_response, default=str)
+    if isinstance(tool_response, dict):
+        failed = 'error' in tool_response
+    else:
+        failed = any(m in text[:120].lower() for m in _ERROR_MARKERS)
+    outcome = 'error' if failed else 'ok'
+    agent = getattr(tool_context, 'agent_name', 'unknown')
+    span = _finish('tool', _tool_key(tool, tool_context))
+    if span is not None:
+        duration = span.finish(outcome=outcome, result_chars=len(text))
+        metrics.TOOL_SECONDS.observe(duration, agent=agent, tool=tool.name)
+    metrics.TOOL_CALLS.inc(agent=agent, tool=tool.name, outcome=outcome)
+    if tool.name in TOOL_UPSTREAMS:
+        record_upstream(TOOL_UPSTREAMS[tool.name], outcome == 'ok', text[:200] if failed else None)
+    elif tool.name == 'gather_trip_data' and isinstance(tool_response, dict):
+        for section, upstream in TRIP_SECTION_UPSTREAMS.items():
+            result = tool_response.get(section)
+            if isinstance(result, dict):
+                record_upstream(upstream, 'error' not in result, result.get('error'))
+    return None
+
+
+def _chain(existing, callback):
+    if existing is None:
+        return callback
+    if isinstance(existing, list):
+        return existing + [callback]
+    return [existing, callback]
+
+
+def instrument(agent):
+    """Install the tracing callbacks on an agent and all its sub-agents."""
+    for name, callback in (
+        ('before_model_callback', before_model),
+        ('after_model_callback', after_model),
+        ('before_tool_callback', before_tool),
+        ('after_tool_callback', after_tool),
+    ):
+        if hasattr(agent, name):
+            setattr(agent, name, _chain(getattr(agent, name), callback))
+    for sub_agent in getattr(agent, 'sub_agents', None) or []:
+        instrument(sub_agent)
+    return agent
+
+
+def record_agent_error(error_msg):
+    """Count a failed agent run and mark Gemini unhealthy for model-side failures."""
+    lowered = error_msg.lower()
+    if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg or "rate" in lowered:
+        kind = 'rate_limit'
+    elif "model" in lowered or "not found" in lowered:
+        kind = 'model'
+    elif "api" in lowered or "key" in lowered or "auth" in lowered:
+        kind = 'auth'
+    else:
+        kind = 'other'
+    metrics.AGENT_ERRORS.inc(kind=kind)
+    if kind != 'other':
+        record_upstream('gemini', False, error_msg)
+    current = _current_trace.get()
+    if current is not None:
+        current.root.attrs['error'] = error_msg[:200]
+
+
+def llm_usage():
+    """(LLM calls, prompt + output tokens) recorded so far in the current trace, or None."""
+    current = _current_trace.get()
+    if current is None:
+        return None
+    spans = [s for s in current.root.children if s.name == 'llm']
+    tokens = sum(s.attrs.get('prompt_tokens', 0) + s.attrs.get('output_tokens', 0) for s in spans)
+    return len(spans), tokens
@@ -512,22 +512,106 @@ function handleSendMessage() {
     sendMessage(fullMessage);
 }
 
+// Friendly labels for tool calls reported by the stream
+const toolLabels = {
+    gather_trip_data: 'Gathering weather, flights and hotels...',
+    get_weather: 'Checking the weather...',
+    get_weather_many: 'Checking the weather in each city...',
+    search_flights: 'Searching flights...',
+    search_flexible_flights: 'Comparing flight prices across dates...',
+    search_hotels: 'Finding hotels...',
+    search_ground_transport: 'Looking up trains and buses...',
+    resolve_location: 'Looking up airports...'
+};
+
+// Column headings for structured tool results
+const columnLabels = {
+    airline: 'Airline', price: 'Price', duration: 'Duration', stops: 'Stops',
+    name: 'Hotel', rating: 'Rating', currency: 'Currency',
+    city: 'City', date: 'Date', temp: 'Temp (°C)', feels_like: 'Feels like (°C)',
+    humidity: 'Humidity (%)', low: 'Low (°C)', high: 'High (°C)', mean: 'Avg (°C)',
+    pop: 'Rain chance (%)', desc: 'Conditions'
+};
+
+// Render structured tool results (see agents/records.py) as compact cards.
+// Returns null when there is nothing worth showing.
+function renderToolResults(results) {
+    const cards = document.createElement('div');
+    cards.className = 'tool-cards';
+
+    const addCard = (title, data) => {
+        if (!data || typeof data !== 'object' || data.error) return;
+        const card = document.createElement('div');
+        card.className = 'tool-card';
+        const heading = document.createElement('div');
+        heading.className = 'tool-card-title';
+
+        if (Array.isArray(data.cols)) {
+            if (!data.rows || !data.rows.length) return;
+            const meta = [data.route, data.city, data.date, data.currency].filter(Boolean).join(' · ');
+            heading.textContent = meta ? `${title} — ${meta}` : title;
+            const table = document.createElement('table');
+            table.className = 'md-table';
+            const headRow = table.createTHead().insertRow();
+            data.cols.forEach(col => {
+                const th = document.createElement('th');
+                th.textContent = columnLabels[col] || col;
+                headRow.appendChild(th);
+            });
+            const body = table.createTBody();
+            data.rows.forEach(row => {
+                const tr = body.insertRow();
+                row.forEach(value => { tr.insertCell().textContent = value ?? '—'; });
+            });
+            card.append(heading, table);
+        } else if (data.temp !== undefined) {
+            heading.textContent = `${title} — ${data.city || ''}`;
+            const line = document.createElement('div');
+            line.textContent = `${data.temp}°C (feels like ${data.feels_like}°C), ${data.desc}, humidity ${data.humidity}%`;
+            card.append(heading, line);
+        } else {
+            return;
+        }
+        cards.appendChild(card);
+    };
+
+    results.forEach(({ name, data }) => {
+        if (name === 'gather_trip_data') {
+            addCard('Weather', data.weather);
+            addCard('Flights', data.flights);
+            addCard('Hotels', data.hotels);
+        } else if (name === 'get_weather' || name === 'get_weather_many') {
+            addCard('Weather', data);
+        } else if (name === 'search_flights') {
+            addCard('Flights', data);
+        } else if (name === 'search_flexible_flights') {
+            if (data.outbound) {
+                addCard('Cheapest outbound by day', { ...data.outbound, route: data.route, currency: data.currency });
+                addCard('Cheapest return by day', { ...data.return, currency: data.currency });
+            } else {
+                addCard('Cheapest flight by day', data);
+            }
+        } else if (name === 'search_hotels') {
+            addCard('Hotels', data);
+        }
+    });
+
+    return cards.childElementCount ? cards : null;
+}
+
 async function sendMessage(message) {
     showLoading();
     updateProgress(1);
 
     try {
-        const response = await fetch('/api/chat', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ message })
-        });
-
-        updateProgress(2);
-        
-        if (!response.ok) throw new Error('Network error');
+        const streamed = await streamMessage(message);
+        if (streamed) return;
+    } catch (error) {
+        console.warn('Streaming unavailable, falling back:', error);
+    }
 
-        const data = await response.json();
+    try {
+        const data = await runJob(message) || await postChat(message);
         
         updateProgress(3);
         
@@ -537,7 +621,7 @@ async function sendMessage(message) {
             sessionId = data.session_id;
             updateProgress(4);
             setTimeout(() => {
-                addMessage(data.response, 'assistant');
+                addMessage(data.response, 'assistant', data.tool_results);
                 hideLoading();
                 hideProgress();
             }, 300);
@@ -552,13 +636,179 @@ async function sendMessage(message) {
     hideProgress();
 }
 
-function addMessage(content, role) {
+// Run the turn as a background job and long-poll it, so no request is held open
+// for the whole agent run. Returns null if the job API can't be used.
+async function runJob(message) {
+    const response = await fetch('/api/jobs', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ message })
+    });
+    if (response.status === 404 || response.status === 405) return null;
+    const submitted = await response.json();
+    if (!response.ok) return { error: submitted.error || 'Sorry, there was an error. Please try again.' };
+
+    updateProgress(2);
+    let after = 0;
+    while (true) {
+        const poll = await fetch(`/api/jobs/${submitted.job_id}?after=${after}&wait=20`);
+        if (!poll.ok) throw new Error('Network error');
+        const job = await poll.json();
+        job.events.forEach(item => {
+            after = item.seq;
+            if (item.event === 'tool_start') {
+                const textEl = document.getElementById('loadingText');
+                if (textEl) textEl.textContent = toolLabels[item.data.name] || 'Gathering travel data...';
+            } else if (item.event === 'tool_end') {
+                updateProgress(3);
+            }
+        });
+        if (job.status === 'done') return { ...job.result, session_id: submitted.session_id };
+        if (job.status === 'error' || job.status === 'cancelled') {
+            return { error: job.error?.message || 'The request was cancelled.' };
+        }
+    }
+}
+
+// Blocking request/response fallback
+async function postChat(message) {
+    const response = await fetch('/api/chat', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ message })
+    });
+
+    updateProgress(2);
+
+    // 429 carries a queue position / retry hint worth showing
+    if (!response.ok && response.status !== 429) throw new Error('Network error');
+    return response.json();
+}
+
+// Stream the reply from /api/chat/stream, rendering tokens as they arrive.
+// Returns false (before anything is rendered) if the endpoint can't be used.
+async function streamMessage(message) {
+    const response = await fetch('/api/chat/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ message })
+    });
+
+    if (!response.ok || !response.body) return false;
+
+    updateProgress(2);
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    let contentDiv = null;
+    const toolResults = [];
+    let renderPending = false;
+    let finished = false;
+
+    const render = () => {
+        renderPending = false;
+        if (!contentDiv) return;
+        contentDiv.innerHTML = formatMessage(text);
+        const container = document.getElementById('chatContainer');
+        if (container && container.scrollHeight - container.scrollTop - container.clientHeight < 100) {
+            container.scrollTop = container.scrollHeight;
+        }
+    };
+
+    const handleEvent = (event, data) => {
+        if (event === 'session') {
+            sessionId = data.session_id;
+        } else if (event === 'tool_start') {
+            updateProgress(2);
+            const textEl = document.getElementById('loadingText');
+            if (textEl) textEl.textContent = toolLabels[data.name] || 'Gathering travel data...';
+        } else if (event === 'tool_end') {
+            updateProgress(3);
+            if (data.data) toolResults.push(data);
+        } else if (event === 'token') {
+            if (!contentDiv) {
+                contentDiv = startStreamingMessage(toolResults);
+                hideLoading();
+                updateProgress(4);
+            }
+            text += data.text;
+            if (!renderPending) {
+                renderPending = true;
+                requestAnimationFrame(render);
+            }
+        } else if (event === 'error') {
+            text = text ? `${text}\n\n${data.message}` : data.message;
+            finished = true;
+        } else if (event === 'done') {
+            finished = true;
+        }
+    };
+
+    try {
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                });
+                if (data) handleEvent(event, JSON.parse(data));
+            }
+        }
+    } catch (error) {
+        console.error('Stream error:', error);
+    }
+
+    if (!text && !finished) {
+        text = 'Sorry, the connection was interrupted. Please try again.';
+    } else if (!text) {
+        text = "I couldn't generate a response. Please try again with a different query.";
+    }
+    if (!contentDiv) contentDiv = startStreamingMessage(toolResults);
+    render();
+    contentDiv.classList.remove('typing');
+
+    hideLoading();
+    hideProgress();
+    return true;
+}
+
+// Create an empty assistant message that is filled in as tokens stream in
+function startStreamingMessage(toolResults = []) {
+    const container = document.getElementById('chatContainer');
+    const messageDiv = document.createElement('div');
+    messageDiv.className = 'message assistant';
+
+    const cards = renderToolResults(toolResults);
+    if (cards) messageDiv.appendChild(cards);
+
+    const contentDiv = document.createElement('div');
+    contentDiv.className = 'message-content typing';
+    messageDiv.appendChild(contentDiv);
+    container?.appendChild(messageDiv);
+    return contentDiv;
+}
+
+function addMessage(content, role, toolResults = []) {
     const container = document.getElementById('chatContainer');
     if (!container) return;
 
     const messageDiv = document.createElement('div');
     messageDiv.className = `message ${role}`;
 
+    const cards = renderToolResults(toolResults || []);
+    if (cards) messageDiv.appendChild(cards);
+
     const contentDiv = document.createElement('div');
     contentDiv.className = 'message-content';
 
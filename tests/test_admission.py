@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+from server import admission
+from server.admission import AdmissionController, Overloaded, TokenBucket, retry_after_seconds
+
+MODEL = "gemini-test"
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_up_to_capacity(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(admission.time, 'monotonic', clock)
+    bucket = TokenBucket(60)  # one per second
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.now += 0.5
+    assert bucket.wait_time(1) == pytest.approx(0.5)
+    clock.now += 10
+    assert bucket.wait_time(10) == 0
+    clock.now += 3600
+    bucket._refill()
+    assert bucket.level == 60
+    # Overspending (actual usage above the estimate) goes negative and takes longer to recover
+    bucket.take(90)
+    assert bucket.wait_time(1) == pytest.approx(31.0)
+
+
+def _drained(rpm=600, **kwargs):
+    """A controller whose request budget is empty, so every turn has to queue."""
+    controller = AdmissionController(rpm=rpm, tpm=1_000_000, limits='', **kwargs)
+    controller.budget(MODEL).requests.level = 0
+    return controller
+
+
+def test_fast_path_admits_without_queueing():
+    async def main():
+        controller = AdmissionController(rpm=10, tpm=1000, limits='')
+        ticket = await controller.admit('s', MODEL, 100)
+        assert controller.admitted == 1 and controller.queued == 0
+        ticket.settle(3, 250)  # two extra LLM calls and 150 more tokens than estimated
+        budget = controller.budget(MODEL)
+        assert budget.requests.level == pytest.approx(7, abs=0.01)
+        assert budget.tokens.level == pytest.approx(750, abs=1)
+    asyncio.run(main())
+
+
+def test_queue_is_round_robin_across_sessions():
+    async def main():
+        controller = _drained(max_wait=10)
+        order = []
+
+        async def turn(session, n):
+            await controller.admit(session, MODEL, 10)
+            order.append(f"{session}{n}")
+
+        tasks = [asyncio.create_task(turn('a', n)) for n in (1, 2, 3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(turn('b', 1)))
+        await asyncio.gather(*tasks)
+        return order, controller
+
+    order, controller = asyncio.run(main())
+    assert order == ['a1', 'b1', 'a2', 'a3']
+    assert controller.queued == 4 and controller.admitted == 4
+
+
+def test_full_queue_rejects_with_position():
+    async def main():
+        controller = _drained(rpm=60, max_queue=2, max_wait=60)
+        waiting = [asyncio.create_task(controller.admit(f"s{n}", MODEL, 10)) for n in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as rejected:
+            await controller.admit('s3', MODEL, 10)
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+        return rejected.value, controller
+
+    rejected, controller = asyncio.run(main())
+    assert rejected.position == 3 and rejected.retry_after > 0
+    assert controller.rejected == 1 and controller.waiting() == 0
+
+
+def test_expected_wait_over_limit_rejects():
+    async def main():
+        controller = _drained(rpm=6, max_wait=5)  # one request per 10 seconds
+        with pytest.raises(Overloaded):
+            await controller.admit('s', MODEL, 10)
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_the_queue_without_spending():
+    async def main():
+        controller = _drained(rpm=60, max_wait=60)
+        task = asyncio.create_task(controller.admit('s', MODEL, 10))
+        await asyncio.sleep(0)
+        assert controller.waiting(MODEL) == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert controller.waiting(MODEL) == 0
+        assert controller.budget(MODEL).tokens.level == pytest.approx(1_000_000, abs=1)
+    asyncio.run(main())
+
+
+def test_waiter_cancelled_after_dispatch_is_refunded():
+    async def main():
+        controller = _drained(rpm=60, max_wait=60)
+        budget = controller.budget(MODEL)
+        task = asyncio.create_task(controller.admit('s', MODEL, 10))
+        await asyncio.sleep(0)
+        # Dispatch it exactly as _dispatch does, then cancel before the turn resumes
+        sessions = controller._queues[MODEL]
+        waiter = sessions.pop('s').popleft()
+        before = (budget.requests.level, budget.tokens.level)
+        budget.take(1, waiter.tokens)
+        waiter.future.set_result(True)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert budget.requests.level == pytest.approx(before[0], abs=0.1)
+        assert budget.tokens.level == pytest.approx(before[1], abs=1)
+        assert controller.admitted == 0
+    asyncio.run(main())
+
+
+def test_penalize_pauses_the_model():
+    controller = AdmissionController(rpm=60, tpm=1000, limits='')
+    controller.penalize(MODEL, 20)
+    assert controller.budget(MODEL).wait_time(1) == pytest.approx(20, abs=0.1)
+
+
+def test_retry_after_parsing():
+    assert retry_after_seconds('429 RESOURCE_EXHAUSTED {"retryDelay": "23s"}') == 23
+    assert retry_after_seconds('rate limited, retry in 4.5s') == 4.5
+    assert retry_after_seconds('500 internal') is None
@@ -0,0 +1,66 @@
+import time
+
+from amadeus import Client
+
+from agents.utils import AmadeusPool, _set_token, _token_holder
+
+
+class _Holder:
+    """Stands in for the SDK's AccessToken: fetching a token just counts."""
+    fetched = 0
+
+    def __init__(self):
+        self.access_token, self.expires_at = None, 0
+
+    def _bearer_token(self):
+        if self.expires_at < time.time():
+            _Holder.fetched += 1
+            self.access_token, self.expires_at = f"token-{_Holder.fetched}", time.time() + 1800
+        return f"Bearer {self.access_token}"
+
+
+class _Client:
+    def __init__(self):
+        self.access_token = _Holder()
+
+
+class _OpaqueClient:
+    """A client from an SDK version that keeps its token somewhere we can't see."""
+
+
+def _pool(factory, monkeypatch):
+    pool = AmadeusPool('id', 'secret', size=2)
+    monkeypatch.setattr(pool, '_new_client', factory)
+    return pool
+
+
+def test_sdk_token_holder_is_reachable():
+    client = Client(client_id='id', client_secret='secret')
+    holder = _token_holder(client)
+    assert holder is not None
+    _set_token(client, ('shared', time.time() + 1800))
+    assert holder._bearer_token() == 'Bearer shared'  # served without a token request
+
+
+def test_clients_share_one_token(monkeypatch):
+    pool = _pool(_Client, monkeypatch)
+    try:
+        first = pool.call('test', lambda c: c.access_token.access_token)
+        pool.authenticate(force=False)
+        second = pool.call('test', lambda c: c.access_token.access_token)
+        assert first == second == pool._token[0]
+        assert pool.refreshes == 1 and pool.stats()['shared_token'] is True
+    finally:
+        pool.close()
+
+
+def test_falls_back_to_sdk_token_handling(monkeypatch):
+    pool = _pool(_OpaqueClient, monkeypatch)
+    try:
+        assert pool.call('test', lambda c: 'ok') == 'ok'
+        assert pool.call('test', lambda c: 'ok') == 'ok'
+        assert pool.shared_token is False and pool._token is None
+        assert pool._refresher is None
+        assert pool.stats()['endpoints']['test']['calls'] == 2
+    finally:
+        pool.close()
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+
+from agents.cache import MemoryBackend, SQLiteBackend, SWRCache, TTLCache
+
+
+class _ThreadRecordingBackend(SQLiteBackend):
+    """SQLiteBackend that records which threads touched it."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return super().get(key)
+
+    def set(self, key, stored_at, value):
+        self.threads.add(threading.get_ident())
+        super().set(key, stored_at, value)
+
+
+def _counting_fetch(values):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return values[len(calls) - 1]
+    return fetch, calls
+
+
+def test_swr_fresh_hit_and_miss():
+    cache = SWRCache(MemoryBackend(), ttl=60, stale_ttl=120, name="test-fresh")
+    fetch, calls = _counting_fetch([{'v': 1}, {'v': 2}])
+
+    async def main():
+        assert await cache.get_or_fetch('k', fetch) == {'v': 1}
+        assert await cache.get_or_fetch('k', fetch) == {'v': 1}
+        assert await cache.peek('k') == {'v': 1}
+        assert await cache.peek('other') is None
+
+    asyncio.run(main())
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_swr_serves_stale_and_refreshes_in_background():
+    backend = MemoryBackend()
+    cache = SWRCache(backend, ttl=60, stale_ttl=3600, name="test-stale")
+    backend.set('k', time.time() - 120, 'old')
+    fetch, calls = _counting_fetch(['new'])
+
+    async def main():
+        assert await cache.get_or_fetch('k', fetch) == 'old'
+        await asyncio.gather(*cache._refreshing.values())
+        assert await cache.get_or_fetch('k', fetch) == 'new'
+
+    asyncio.run(main())
+    assert len(calls) == 1 and cache.stale_hits == 1
+
+
+def test_sqlite_backend_runs_off_the_event_loop(tmp_path):
+    backend = _ThreadRecordingBackend(str(tmp_path / 'cache.db'), maxsize=2)
+    cache = SWRCache(backend, ttl=60, stale_ttl=120, name="test-sqlite")
+    fetch, _ = _counting_fetch([[1], [2], [3]])
+
+    async def main():
+        for key in ('a', 'b', 'c'):
+            await cache.get_or_fetch(key, fetch)
+        assert await cache.get_or_fetch('c', fetch) == [3]
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+    assert backend.threads and loop_thread not in backend.threads
+    # Bounded: the least recently used entry was evicted
+    assert len(backend) == 2 and backend.evictions == 1 and backend.get('a') is None
+
+
+def test_ttl_cache_expiry_and_lru():
+    cache = TTLCache(maxsize=2, name="test-ttl")
+    cache.set('a', 1, ttl=60)
+    cache.set('b', 2, ttl=-1)
+    assert cache.get('a') == 1 and cache.get('b') is None
+    cache.set('c', 3, ttl=60)
+    cache.set('d', 4, ttl=60)
+    assert cache.get('a') is None and cache.get('d') == 4
@@ -0,0 +1,24 @@
+import asyncio
+from types import SimpleNamespace
+
+from google.adk.agents import Agent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.sessions import InMemorySessionService
+
+from agents.context import _session_key
+
+
+def test_session_key_uses_the_public_session_id():
+    async def scenario():
+        service = InMemorySessionService()
+        session = await service.create_session(app_name='app', user_id='u', session_id='s-1')
+        invocation = InvocationContext(session_service=service, invocation_id='e-1',
+                                       agent=Agent(name='planner', model='gemini-2.0-flash'), session=session)
+        return _session_key(CallbackContext(invocation))
+
+    assert asyncio.run(scenario()) == 's-1'
+
+
+def test_session_key_falls_back_to_the_invocation_id():
+    assert _session_key(SimpleNamespace(invocation_id='e-1')) == 'e-1'
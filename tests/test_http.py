@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+from agents import http
+
+
+async def _session():
+    return http.get_http_session()
+
+
+def test_one_session_per_loop_closed_on_shutdown():
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever, daemon=True)
+    thread.start()
+    try:
+        theirs = asyncio.run_coroutine_threadsafe(_session(), other).result()
+
+        async def main():
+            ours = http.get_http_session()
+            assert http.get_http_session() is ours
+            assert ours is not theirs
+            await http.close_http_session()
+            return ours
+
+        ours = asyncio.run(main())
+        assert ours.closed and theirs.closed
+        assert http._sessions == {}
+    finally:
+        other.call_soon_threadsafe(other.stop)
+        thread.join()
+        other.close()
+
+
+def test_session_of_a_closed_loop_is_dropped():
+    stale = asyncio.run(_session())
+
+    async def main():
+        fresh = http.get_http_session()
+        await http.close_http_session()
+        return fresh
+
+    fresh = asyncio.run(main())
+    assert stale.closed and fresh.closed and fresh is not stale
+    assert http._sessions == {}
@@ -0,0 +1,223 @@
+import asyncio
+
+import pytest
+
+from server.jobs import JobManager, JobRejected
+
+
+async def _flush(manager):
+    """Wait for the manager's queued SQLite writes."""
+    await asyncio.wrap_future(manager._writer.submit(lambda: None))
+
+
+async def _emit_and_finish(job, *texts):
+    for text in texts:
+        job.emit('text', {'text': text})
+    return {'response': ''.join(texts)}
+
+
+async def _block(job, release):
+    job.emit('text', {'text': 'started'})
+    await release.wait()
+    return {'response': 'late'}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'jobs.db')
+
+
+def test_job_result_and_event_replay_after_cursor():
+    async def main():
+        manager = JobManager()
+        job = await manager.submit('c1', _emit_and_finish, 'a', 'b', 'c')
+        await job.task
+        full = await manager.get(job.id, 'c1')
+        tail = await manager.get(job.id, 'c1', after=2)
+        other = await manager.get(job.id, 'someone-else')
+        return full, tail, other
+
+    full, tail, other = asyncio.run(main())
+    assert full['status'] == 'done'
+    assert full['result'] == {'response': 'abc'}
+    assert [e['seq'] for e in full['events']] == [1, 2, 3]
+    assert [e['data']['text'] for e in tail['events']] == ['c']
+    assert other is None
+
+
+def test_wait_returns_as_soon_as_a_new_event_arrives():
+    async def main():
+        manager = JobManager()
+        release = asyncio.Event()
+        job = await manager.submit('c1', _block, release)
+        first = await manager.wait(job.id, 'c1', after=0, timeout=5)
+        quiet = await manager.wait(job.id, 'c1', after=1, timeout=0.05)
+        release.set()
+        final = await manager.wait(job.id, 'c1', after=1, timeout=5)
+        return first, quiet, final
+
+    first, quiet, final = asyncio.run(main())
+    assert [e['data']['text'] for e in first['events']] == ['started']
+    assert quiet['status'] == 'running' and quiet['events'] == []
+    assert final['status'] == 'done' and final['result'] == {'response': 'late'}
+
+
+def test_cancel_running_job():
+    async def main():
+        manager = JobManager()
+        job = await manager.submit('c1', _block, asyncio.Event())
+        await asyncio.sleep(0)
+        snap = await manager.cancel(job.id, 'c1')
+        return manager, snap
+
+    manager, snap = asyncio.run(main())
+    assert snap['status'] == 'cancelled'
+    assert snap['finished'] is not None
+    assert manager.stats()['cancelled'] == 1
+
+
+def test_cancel_before_the_job_starts_frees_the_client_slot():
+    async def main():
+        manager = JobManager(per_client=1)
+        job = await manager.submit('c1', _block, asyncio.Event())
+        snap = await manager.cancel(job.id, 'c1')  # same tick: the task never ran
+        again = await manager.submit('c1', _emit_and_finish, 'x')
+        await again.task
+        return snap, again
+
+    snap, again = asyncio.run(main())
+    assert snap['status'] == 'cancelled'
+    assert again.status == 'done'
+
+
+def test_cancel_queued_job_behind_the_running_limit():
+    async def main():
+        manager = JobManager(max_running=1, per_client=2)
+        release = asyncio.Event()
+        running = await manager.submit('c1', _block, release)
+        queued = await manager.submit('c1', _emit_and_finish, 'never')
+        await asyncio.sleep(0)
+        position = (await manager.get(queued.id, 'c1'))['position']
+        snap = await manager.cancel(queued.id, 'c1')
+        release.set()
+        await running.task
+        return position, snap, running
+
+    position, snap, running = asyncio.run(main())
+    assert position == 1
+    assert snap['status'] == 'cancelled' and snap['events'] == []
+    assert running.status == 'done'
+
+
+def test_per_client_and_queue_limits():
+    async def main():
+        manager = JobManager(max_pending=2, per_client=1)
+        release = asyncio.Event()
+        await manager.submit('c1', _block, release)
+        with pytest.raises(JobRejected) as per_client:
+            await manager.submit('c1', _block, release)
+        await manager.submit('c2', _block, release)
+        with pytest.raises(JobRejected) as full:
+            await manager.submit('c3', _block, release)
+        release.set()
+        return per_client.value, full.value
+
+    per_client, full = asyncio.run(main())
+    assert per_client.status == 429
+    assert full.status == 503
+
+
+def test_shared_db_serves_status_and_events_to_another_worker(db_path):
+    async def main():
+        owner, other = JobManager(db_path=db_path), JobManager(db_path=db_path)
+        release = asyncio.Event()
+        job = await owner.submit('c1', _block, release)
+        await asyncio.sleep(0)
+        await _flush(owner)
+        running = await other.get(job.id, 'c1')
+        stranger = await other.get(job.id, 'c2')
+        release.set()
+        await job.task
+        await _flush(owner)
+        done = await other.get(job.id, 'c1')
+        replay = await other.wait(job.id, 'c1', after=1, timeout=1)
+        return running, stranger, done, replay
+
+    running, stranger, done, replay = asyncio.run(main())
+    assert running['status'] == 'running'
+    assert [e['data'] for e in running['events']] == [{'text': 'started'}]
+    assert stranger is None
+    assert done['status'] == 'done' and done['result'] == {'response': 'late'}
+    assert replay['status'] == 'done' and replay['events'] == []
+
+
+def test_shared_db_enforces_the_per_client_limit_across_workers(db_path):
+    async def main():
+        owner, other = JobManager(db_path=db_path), JobManager(db_path=db_path)
+        release = asyncio.Event()
+        job = await owner.submit('c1', _block, release)
+        await _flush(owner)
+        with pytest.raises(JobRejected) as rejected:
+            await other.submit('c1', _emit_and_finish, 'x')
+        release.set()
+        await job.task
+        await _flush(owner)
+        after = await other.submit('c1', _emit_and_finish, 'x')
+        await after.task
+        return rejected.value, after
+
+    rejected, after = asyncio.run(main())
+    assert rejected.status == 429
+    assert after.status == 'done'
+
+
+def test_shared_db_cancel_from_another_worker(db_path):
+    async def main():
+        owner, other = JobManager(db_path=db_path), JobManager(db_path=db_path)
+        job = await owner.submit('c1', _block, asyncio.Event())
+        await asyncio.sleep(0)
+        await _flush(owner)
+        requested = await other.cancel(job.id, 'c1')
+        await owner.sweep()  # the owner picks the request up on its next heartbeat
+        await asyncio.wait({job.task}, timeout=1)
+        await _flush(owner)
+        return requested, job, await other.get(job.id, 'c1')
+
+    requested, job, seen = asyncio.run(main())
+    assert requested['status'] == 'cancelling'
+    assert job.status == 'cancelled'
+    assert seen['status'] == 'cancelled'
+
+
+def test_shared_db_reports_a_job_whose_worker_stopped(db_path, monkeypatch):
+    async def main():
+        owner, other = JobManager(db_path=db_path), JobManager(db_path=db_path)
+        job = await owner.submit('c1', _block, asyncio.Event())
+        await _flush(owner)
+        monkeypatch.setattr('server.jobs._HEARTBEAT_TIMEOUT', -1)
+        snap = await other.get(job.id, 'c1')
+        job.task.cancel()
+        return snap
+
+    snap = asyncio.run(main())
+    assert snap['status'] == 'error'
+    assert 'stopped' in snap['error']['message']
+
+
+def test_events_endpoint_replays_after_cursor_and_ends_with_status():
+    import app as web
+    from server.loop import run_sync
+
+    client = web.app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session['client_id'] = 'sse-client'
+    job = run_sync(web.jobs.submit('sse-client', _emit_and_finish, 'a', 'b', 'c'))
+    run_sync(asyncio.wait({job.task}))
+
+    body = client.get(f'/api/jobs/{job.id}/events?after=1').get_data(as_text=True)
+    blocks = [b for b in body.split('\n\n') if b.strip()]
+    assert [b.splitlines()[0] for b in blocks] == ['event: text', 'event: text', 'event: done']
+    assert '"seq": 2' in blocks[0] and '"seq": 3' in blocks[1]
+    assert '"response": "abc"' in blocks[2]
+
+    assert client.get('/api/jobs/job_unknown/events').status_code == 404
@@ -0,0 +1,60 @@
+from agents.places import Place, PlaceIndex, normalize_iata
+
+
+def _index():
+    return PlaceIndex([
+        Place('NYC', 'city', 'New York', 'New York', 'NYC', 'US', ('NY',)),
+        Place('JFK', 'airport', 'John F Kennedy International', 'New York', 'NYC', 'US'),
+        Place('BLR', 'airport', 'Kempegowda International', 'Bengaluru', 'BLR', 'IN', ('Bangalore',)),
+        Place('DPS', 'airport', 'Ngurah Rai International', 'Denpasar', 'DPS', 'ID', ('Bali',)),
+        Place('GOI', 'airport', 'Dabolim', 'Goa', 'GOI', 'IN'),
+    ])
+
+
+def test_exact_name_and_alias_resolve():
+    index = _index()
+    assert index.resolve('Goa') == 'GOI'
+    assert index.resolve('bangalore') == 'BLR'
+    assert index.resolve('John F Kennedy International', city=True) == 'NYC'
+
+
+def test_known_and_unknown_codes():
+    index = _index()
+    assert index.resolve('jfk') == 'JFK'
+    assert index.resolve('jfk', city=True) == 'NYC'
+    # Well-formed but not in the data: passed through, not swapped for a prefix match (DEN -> DPS)
+    assert index.resolve('DEN') == 'DEN'
+
+
+def test_prefix_and_fuzzy_matches_are_not_resolved():
+    index = _index()
+    assert [p.code for p, how in index.search('Den')] == ['DPS']
+    assert index.resolve('Denp') is None
+    assert index.resolve('York') is None
+    assert index.resolve('Banglore') is None
+    assert index.search('Banglore', limit=1)[0][0].code == 'BLR'
+
+
+def test_normalize_iata_exact_name():
+    assert normalize_iata('Goa') == ('GOI', None)
+    assert normalize_iata('Mumbai') == ('BOM', None)
+
+
+def test_normalize_iata_misspelling_suggests_the_code():
+    code, err = normalize_iata('Banglore')
+    assert code is None
+    assert err['suggestions'][0] == 'BLR (Bengaluru)'
+    assert 'did you mean BLR (Bengaluru)' in err['error']
+
+
+def test_normalize_iata_unknown_town_is_an_error():
+    code, err = normalize_iata('Kasol')
+    assert code is None and 'Unknown place' in err['error']
+    code, err = normalize_iata('Zzyzxqv')
+    assert code is None and 'suggestions' not in err
+
+
+def test_normalize_iata_prefix_collision_is_an_error():
+    code, err = normalize_iata('York')
+    assert code is None
+    assert any(s.startswith('NYC') for s in err['suggestions'])
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from server.plan_cache import PlanCache, extract
+
+APP = "travel_planner"
+
+
+@pytest.mark.parametrize('a, b', [
+    ("Plan a 3 day trip to Goa in December", "goa trip, december, 3 days please"),
+    ("3-day itinerary for Paris in Dec", "Can you plan a 3 day trip to Paris in December?"),
+    ("Trip to Goa from Mumbai for 2 people", "from mumbai to goa trip for two people"),
+    ("5 day trip to Tokyo on budget", "cheap 5 days trip to tokyo"),
+    ("Trip to Goa on 5 December", "trip to goa on december 5th"),
+    ("Trip to Goa on 2025-12-05", "trip to goa, 2025-12-5"),
+    ("Trip to Paris for a week", "7 day trip to paris"),
+])
+def test_rewordings_share_a_key(a, b):
+    assert extract(a) is not None
+    assert extract(a) == extract(b)
+
+
+@pytest.mark.parametrize('a, b', [
+    ("3 day trip to Goa in December", "3 day trip to Goa in January"),
+    ("3 day trip to Goa on 5 December", "3 day trip to Goa on 6 December"),
+    ("Trip to Goa on 2025-12-05", "Trip to Goa on 2025-12-06"),
+    ("Trip to Goa 05/12/2025", "Trip to Goa 06/12/2025"),
+    ("Trip to Goa 05/12/2025", "Trip to Goa 12/05/2025"),
+    ("Trip to Paris in December 2025", "Trip to Paris in December 2026"),
+    ("3 day trip to Goa for 2 people", "3 day trip to Goa for 4 people"),
+    ("3 day trip to Goa for two people", "3 day trip to Goa for four people"),
+    ("Trip to Goa with my family of 4", "Trip to Goa with my family of 6"),
+    ("Trip to Paris with 2 kids", "Trip to Paris with 3 kids"),
+    ("3 day trip to Goa", "5 day trip to Goa"),
+    ("Trip to Goa for 2 nights", "Trip to Goa for 2 days"),
+    ("Trip to Paris for a week", "Trip to Paris for 2 weeks"),
+    ("3 day trip to Goa", "3 day trip to Delhi"),
+    ("Trip to Goa from Mumbai", "Trip to Goa from Delhi"),
+    ("Trip to Goa from Mumbai", "Trip to Mumbai from Goa"),
+    ("3 day trip to Goa", "3 day trip to Goa and Mumbai"),
+    ("3 day budget trip to Goa", "3 day luxury trip to Goa"),
+    ("Trip to Goa in INR", "Trip to Goa in USD"),
+    ("Trip to Goa for 3 people under 20000 rupees", "Trip to Goa for 3 people under 50000 rupees"),
+    ("Trip to Goa in December", "Trip to Goa, not in December"),
+])
+def test_different_trips_get_different_keys(a, b):
+    assert extract(a) != extract(b)
+
+
+def test_extracted_entities():
+    entities = extract("Plan a 4 day trip to Goa from Mumbai for 2 people on Dec 20, cheap, in INR")
+    assert entities == {
+        'dates': ['dec-20'], 'days': 4, 'travelers': 2, 'budget': ['budget'],
+        'currency': ['INR'], 'origin': 'BOM', 'destination': 'GOI', 'words': [],
+    }
+
+
+def test_relative_dates_are_keyed_by_the_day_asked():
+    assert 'asked_on' in extract("Trip to Goa next weekend")
+    assert 'asked_on' not in extract("Trip to Goa in December")
+
+
+def test_requests_without_a_destination_are_not_cached():
+    assert extract("What should I pack for a beach holiday?") is None
+
+
+def _message(text):
+    return types.Content(role='user', parts=[types.Part(text=text)])
+
+
+def test_key_for_only_covers_the_first_turn_of_a_session():
+    async def main():
+        service = InMemorySessionService()
+        cache = PlanCache(service, APP, enabled=True)
+        for sid in ('a', 'b', 'c'):
+            await service.create_session(app_name=APP, user_id='u', session_id=sid)
+        a = await cache.key_for('m', 'u', 'a', _message("Plan a 3 day trip to Goa in December"))
+        b = await cache.key_for('m', 'u', 'b', _message("goa trip, december, 3 days please"))
+        other_model = await cache.key_for('m2', 'u', 'b', _message("goa trip, december, 3 days please"))
+        c = await cache.key_for('m', 'u', 'c', _message("3 day trip to Goa in January"))
+        from google.adk.events import Event
+        session = await service.get_session(app_name=APP, user_id='u', session_id='c')
+        await service.append_event(session, Event(invocation_id='e-1', author='user', content=_message("hi")))
+        follow_up = await cache.key_for('m', 'u', 'c', _message("Plan a 3 day trip to Goa in December"))
+        disabled = await PlanCache(service, APP, enabled=False).key_for('m', 'u', 'a', _message("Trip to Goa"))
+        return a, b, other_model, c, follow_up, disabled
+
+    a, b, other_model, c, follow_up, disabled = asyncio.run(main())
+    assert a is not None and a == b
+    assert other_model != a
+    assert c != a
+    assert follow_up is None
+    assert disabled is None
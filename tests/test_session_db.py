@@ -0,0 +1,116 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+from google.adk.events import Event
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.genai import types
+
+from server.session_db import SQLiteSessionService
+
+APP = "travel_planner"
+
+
+def _event(text, timestamp, author='user'):
+    role = 'user' if author == 'user' else 'model'
+    return Event(invocation_id='e-test', author=author, timestamp=timestamp,
+                 content=types.Content(role=role, parts=[types.Part(text=text)]))
+
+
+def _texts(session):
+    return [e.content.parts[0].text for e in session.events]
+
+
+def _stored_rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT session_id, author FROM events ORDER BY seq").fetchall()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'sessions.db')
+
+
+def test_append_event_is_batched_and_flushed_in_order(db_path):
+    async def main():
+        service = SQLiteSessionService(db_path, batch_size=3, flush_interval=60)
+        a = await service.create_session(app_name=APP, user_id='u', session_id='a')
+        b = await service.create_session(app_name=APP, user_id='u', session_id='b')
+        await service.append_event(a, _event('a1', 1.0))
+        await service.append_event(b, _event('b1', 2.0))
+        assert _stored_rows(db_path) == []  # still buffered
+        await service.append_event(a, _event('a2', 3.0, author='travel_planner_root'))
+        # The third event fills the batch: all three are written, in append order
+        assert _stored_rows(db_path) == [('a', 'user'), ('b', 'user'), ('a', 'travel_planner_root')]
+        await service.append_event(b, _event('b2', 4.0))
+        # Reads flush first, so nothing appended is missed
+        session = await service.get_session(app_name=APP, user_id='u', session_id='b')
+        assert _texts(session) == ['b1', 'b2']
+    asyncio.run(main())
+
+
+def test_get_session_config_is_pushed_down(db_path):
+    async def main():
+        service = SQLiteSessionService(db_path)
+        session = await service.create_session(app_name=APP, user_id='u', session_id='s')
+        for i in range(5):
+            await service.append_event(session, _event(f"m{i}", 100.0 + i))
+
+        def get(**config):
+            return service.get_session(app_name=APP, user_id='u', session_id='s',
+                                       config=GetSessionConfig(**config) if config else None)
+        assert _texts(await get()) == ['m0', 'm1', 'm2', 'm3', 'm4']
+        assert _texts(await get(num_recent_events=2)) == ['m3', 'm4']
+        assert _texts(await get(after_timestamp=102.0)) == ['m2', 'm3', 'm4']
+        assert _texts(await get(after_timestamp=101.0, num_recent_events=2)) == ['m3', 'm4']
+        assert await service.get_session(app_name=APP, user_id='u', session_id='missing') is None
+    asyncio.run(main())
+
+
+def test_trim_events_drops_the_oldest(db_path):
+    async def main():
+        service = SQLiteSessionService(db_path)
+        session = await service.create_session(app_name=APP, user_id='u', session_id='s')
+        other = await service.create_session(app_name=APP, user_id='u', session_id='other')
+        for i in range(4):
+            await service.append_event(session, _event(f"m{i}", 100.0 + i))
+        await service.append_event(other, _event('keep', 50.0))
+        await service.trim_events(APP, 'u', 's', 3)
+        assert [author for author, _ in await service.event_sizes(APP, 'u', 's')] == ['user']
+        assert _texts(await service.get_session(app_name=APP, user_id='u', session_id='s')) == ['m3']
+        assert _texts(await service.get_session(app_name=APP, user_id='u', session_id='other')) == ['keep']
+    asyncio.run(main())
+
+
+def test_purge_idle_removes_sessions_with_their_events(db_path):
+    async def main():
+        service = SQLiteSessionService(db_path)
+        for sid in ('old', 'new'):
+            session = await service.create_session(app_name=APP, user_id='u', session_id=sid)
+            await service.append_event(session, _event(sid, time.time()))
+        await service.flush()
+        await asyncio.to_thread(service._execute, "UPDATE sessions SET updated_at = 0 WHERE session_id = 'old'")
+        assert await service.purge_idle(3600) == 1
+        assert await service.get_session(app_name=APP, user_id='u', session_id='old') is None
+        assert _stored_rows(db_path) == [('new', 'user')]
+    asyncio.run(main())
+
+
+def test_purge_idle_rolls_back_on_failure(db_path):
+    async def main():
+        service = SQLiteSessionService(db_path)
+        session = await service.create_session(app_name=APP, user_id='u', session_id='old')
+        await service.append_event(session, _event('old', 100.0))
+        await service.flush()
+        await asyncio.to_thread(service._execute, "UPDATE sessions SET updated_at = 0")
+        # Make the second DELETE fail after the events are already gone
+        await asyncio.to_thread(
+            service._execute,
+            "CREATE TRIGGER fail_purge BEFORE DELETE ON sessions BEGIN SELECT RAISE(ABORT, 'boom'); END"
+        )
+        with pytest.raises(sqlite3.DatabaseError, match='boom'):
+            await service.purge_idle(3600)
+        assert _stored_rows(db_path) == [('old', 'user')]
+        assert _texts(await service.get_session(app_name=APP, user_id='u', session_id='old')) == ['old']
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from server.sessions import SessionStore
+
+APP = "travel_planner"
+
+
+def _event(author, text):
+    role = 'user' if author == 'user' else 'model'
+    return Event(invocation_id='e-test', author=author, content=types.Content(role=role, parts=[types.Part(text=text)]))
+
+
+async def _store_with_turns(turns, text='x' * 50, **limits):
+    service = InMemorySessionService()
+    store = SessionStore(service, APP, **limits)
+    entry = await store.create('client', 'user', 'session')
+    session = await service.get_session(app_name=APP, user_id='user', session_id='session')
+    for i in range(turns):
+        await service.append_event(session, _event('user', f"question {i} {text}"))
+        await service.append_event(session, _event('travel_planner_root', f"answer {i} {text}"))
+    return service, store, entry
+
+
+async def _stored(service):
+    session = await service.get_session(app_name=APP, user_id='user', session_id='session')
+    return [e.content.parts[0].text.split()[:2] for e in session.events]
+
+
+def test_lru_eviction_deletes_the_oldest_session():
+    async def main():
+        service = InMemorySessionService()
+        store = SessionStore(service, APP, max_sessions=2)
+        for n in range(3):
+            await store.create(f"c{n}", 'user', f"s{n}")
+        assert store.get('c0') is None and store.get('c2') is not None
+        assert await service.get_session(app_name=APP, user_id='user', session_id='s0') is None
+        assert store.evicted == 1 and len(store) == 2
+    asyncio.run(main())
+
+
+def test_idle_sessions_expire():
+    async def main():
+        service = InMemorySessionService()
+        store = SessionStore(service, APP, idle_ttl=60)
+        await store.create('old', 'user', 'old')
+        await store.create('new', 'user', 'new')
+        store._entries['old']['last_seen'] -= 120
+        assert store.get('old') is None  # not served once idle, even before the sweep
+        assert await store.expire_idle() == 1
+        assert 'old' not in store._entries and store.get('new') is not None
+        assert await service.get_session(app_name=APP, user_id='user', session_id='old') is None
+    asyncio.run(main())
+
+
+def test_enforce_limits_trims_by_event_count():
+    async def main():
+        service, store, _ = await _store_with_turns(4, max_events=5)
+        await store.enforce_limits('client')
+        # 8 events over a budget of 5: the kept history starts on a user turn
+        assert await _stored(service) == [['question', '2'], ['answer', '2'], ['question', '3'], ['answer', '3']]
+        assert store.trimmed_events == 4
+    asyncio.run(main())
+
+
+def test_enforce_limits_trims_by_bytes():
+    async def main():
+        service, store, entry = await _store_with_turns(3, text='x' * 1000, max_bytes=3000)
+        await store.enforce_limits('client')
+        assert await _stored(service) == [['question', '2'], ['answer', '2']]
+        assert 0 < entry['bytes'] <= 3000
+    asyncio.run(main())
+
+
+def test_unknown_session_service_layout_fails_loudly():
+    class OpaqueService:
+        """A session service that keeps its sessions somewhere SessionStore can't see."""
+
+        async def create_session(self, **kwargs):
+            return None
+
+    async def main():
+        store = SessionStore(OpaqueService(), APP)
+        await store.create('client', 'user', 'session')
+        with pytest.raises(TypeError, match="budgets can't be enforced"):
+            await store.enforce_limits('client')
+    asyncio.run(main())
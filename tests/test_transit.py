@@ -0,0 +1,93 @@
+import os
+import shutil
+from datetime import date
+
+import pytest
+
+from agents import transit
+
+FEED = os.path.join(os.path.dirname(__file__), 'data', 'gtfs')
+MONDAY = date(2026, 12, 21).toordinal()
+
+
+@pytest.fixture(scope='module')
+def index(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('transit') / 'transit.idx')
+    transit.build([FEED], path)
+    return transit.TransitIndex(path)
+
+
+def _options(index, origin, destination, day):
+    return index.journeys(index.stops_for(origin), index.stops_for(destination), day)
+
+
+def test_build_counts(tmp_path):
+    counts = transit.build([FEED], str(tmp_path / 'transit.idx'))
+    assert counts['stops'] == 6
+    assert counts['trips'] == 5
+    assert counts['connections'] == 7
+
+
+def test_build_from_zip_matches_directory(tmp_path):
+    archive = shutil.make_archive(str(tmp_path / 'feed'), 'zip', FEED)
+    assert transit.build([archive], str(tmp_path / 'zip.idx')) == transit.build([FEED], str(tmp_path / 'dir.idx'))
+
+
+def test_direct_trip(index):
+    options = _options(index, 'Ashford', 'Carlow', MONDAY)
+    assert [(o.depart, o.arrive, o.changes) for o in options] == [('08:00', '10:00', 0), ('14:00', '16:00', 0)]
+    first = options[0]
+    assert first.mode == 'train' and first.operator == 'Test Rail'
+    assert first.legs == "101 Intercity: Ashford 08:00 → Carlow Station 10:00"
+
+
+def test_trip_with_transfer(index):
+    option, overnight = _options(index, 'Ashford', 'Dunmore', MONDAY)
+    assert (option.depart, option.arrive, option.changes) == ('08:00', '11:30', 1)
+    assert option.mode == 'train+bus'
+    assert option.operator == 'Test Rail, Test Coaches'
+    assert "Carlow Coach Stop 10:20 → Dunmore 11:30" in option.legs
+    # The afternoon train waits for the next day's coach
+    assert (overnight.depart, overnight.arrive) == ('14:00', '11:30 +1d')
+
+
+def test_transfer_respects_walking_time(index, monkeypatch):
+    # With a 25 minute walk between the stops, the 10:20 coach is missed and the next one is a day later
+    monkeypatch.setattr(index, 'foot_secs', [1500] * len(index.foot_secs))
+    options = _options(index, 'Ashford', 'Dunmore', MONDAY)
+    assert [(o.depart, o.arrive) for o in options] == [('14:00', '11:30 +1d')]
+
+
+def test_trip_past_midnight(index):
+    options = _options(index, 'Bexley', 'Eastwick', MONDAY)
+    assert [(o.depart, o.arrive, o.duration) for o in options] == [('23:00', '01:30 +1d', '2h 30m')]
+
+
+def test_service_removed_in_calendar_dates(index):
+    christmas = date(2026, 12, 25).toordinal()
+    assert _options(index, 'Ashford', 'Carlow', christmas) == []
+    assert len(_options(index, 'Ashford', 'Carlow', christmas - 1)) == 2
+
+
+def test_service_added_in_calendar_dates(index):
+    sunday = date(2026, 12, 27).toordinal()
+    options = _options(index, 'Ashford', 'Carlow', sunday)
+    assert [(o.depart, o.arrive) for o in options] == [('12:00', '13:30')]
+    assert _options(index, 'Ashford', 'Carlow', sunday - 7) == []
+
+
+def test_fare_lookup(index):
+    direct, _ = _options(index, 'Ashford', 'Carlow', MONDAY)
+    assert (direct.fare, direct.currency) == (12.5, 'EUR')
+    [partial] = index.journeys(index.stops_for('Ashford'), index.stops_for('Bexley'), MONDAY, limit=1)
+    assert (partial.fare, partial.currency) == (6.0, 'EUR')
+    combined = _options(index, 'Ashford', 'Dunmore', MONDAY)[0]
+    assert (combined.fare, combined.currency) == (16.5, 'EUR')
+
+
+def test_find_journeys(index, monkeypatch):
+    monkeypatch.setattr(transit, '_index', index)
+    result = transit.find_journeys('Ashford', 'Dunmore', '2026-12-21')
+    assert result['origin'] == 'Ashford' and len(result['rows']) == 2
+    assert 'error' in transit.find_journeys('Ashford', 'Nowhere', '2026-12-21')
+    assert 'error' in transit.find_journeys('Ashford', 'Dunmore', '21/12/2026')